@@ -1,38 +1,111 @@
 """
 Database configuration and connection management for MongoDB.
 Uses Motor for async MongoDB operations.
+
+Pool sizes and timeouts come from config. When both URLs point at the same
+server (same scheme, credentials, hosts and options) a single client and
+connection pool serves both databases.
 """
-import os
 from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo import ReadPreference
 from typing import Optional
+from urllib.parse import urlsplit
 
-# MongoDB connection URLs from environment
-MONGODB_SYSTEM_URL = os.getenv("MONGODB_SYSTEM_URL", "mongodb://localhost:27017/call_of_cthulhu_system")
-MONGODB_GAMERECORDS_URL = os.getenv("MONGODB_URL", "mongodb://localhost:27017/call_of_cthulhu_gamerecords")
+from .config import (
+    MONGODB_SYSTEM_URL,
+    MONGODB_GAMERECORDS_URL,
+    MONGODB_MAX_POOL_SIZE,
+    MONGODB_MIN_POOL_SIZE,
+    MONGODB_MAX_IDLE_TIME_MS,
+    MONGODB_SERVER_SELECTION_TIMEOUT_MS,
+    MONGODB_CONNECT_TIMEOUT_MS,
+    MONGODB_SOCKET_TIMEOUT_MS,
+    MONGODB_LIST_READ_PREFERENCE,
+    MONGODB_LIST_MAX_STALENESS_SECONDS
+)
+from .db_profiler import query_profiler
+from .metrics import MONGO_POOL_MAX_SIZE, mongo_command_listener, mongo_pool_listener
 
-# Global clients
+# Global clients (the same object when the servers match)
 system_client: Optional[AsyncIOMotorClient] = None
 gamerecords_client: Optional[AsyncIOMotorClient] = None
 
+# Database names from the URLs; None means the client's default database
+system_db_name: Optional[str] = None
+gamerecords_db_name: Optional[str] = None
+
+READ_PREFERENCES = {
+    "primary": ReadPreference.PRIMARY,
+    "primaryPreferred": ReadPreference.PRIMARY_PREFERRED,
+    "secondary": ReadPreference.SECONDARY,
+    "secondaryPreferred": ReadPreference.SECONDARY_PREFERRED,
+    "nearest": ReadPreference.NEAREST,
+}
+
+
+def _client_key(url: str) -> tuple:
+    """Everything in a MongoDB URL except the database name."""
+    parts = urlsplit(url)
+    return parts.scheme, parts.netloc, parts.query
+
+
+def _database_name(url: str) -> Optional[str]:
+    return urlsplit(url).path.lstrip("/") or None
+
+
+def _create_client(url: str) -> AsyncIOMotorClient:
+    """Client with the configured pool, timeouts and metrics listeners."""
+    return AsyncIOMotorClient(
+        url,
+        maxPoolSize=MONGODB_MAX_POOL_SIZE,
+        minPoolSize=MONGODB_MIN_POOL_SIZE,
+        maxIdleTimeMS=MONGODB_MAX_IDLE_TIME_MS,
+        serverSelectionTimeoutMS=MONGODB_SERVER_SELECTION_TIMEOUT_MS,
+        connectTimeoutMS=MONGODB_CONNECT_TIMEOUT_MS,
+        socketTimeoutMS=MONGODB_SOCKET_TIMEOUT_MS or None,
+        event_listeners=[mongo_command_listener, mongo_pool_listener]
+    )
+
+
+def _list_read_preference():
+    """Read preference for listing endpoints, from config."""
+    mode = READ_PREFERENCES.get(MONGODB_LIST_READ_PREFERENCE)
+    if mode is None:
+        print(f"Unknown MONGODB_LIST_READ_PREFERENCE {MONGODB_LIST_READ_PREFERENCE!r}, using primary")
+        return ReadPreference.PRIMARY
+    if MONGODB_LIST_MAX_STALENESS_SECONDS > 0 and mode != ReadPreference.PRIMARY:
+        return type(mode)(max_staleness=MONGODB_LIST_MAX_STALENESS_SECONDS)
+    return mode
+
+
+LIST_READ_PREFERENCE = _list_read_preference()
+
 
 async def connect_to_mongo():
     """Establish connections to both MongoDB databases."""
-    global system_client, gamerecords_client
+    global system_client, gamerecords_client, system_db_name, gamerecords_db_name
 
-    # Connect to system database (AI knowledge base)
-    system_client = AsyncIOMotorClient(MONGODB_SYSTEM_URL)
+    MONGO_POOL_MAX_SIZE.set(MONGODB_MAX_POOL_SIZE)
+    system_db_name = _database_name(MONGODB_SYSTEM_URL)
+    gamerecords_db_name = _database_name(MONGODB_GAMERECORDS_URL)
 
     # Connect to gamerecords database (player data)
-    gamerecords_client = AsyncIOMotorClient(MONGODB_GAMERECORDS_URL)
+    gamerecords_client = _create_client(MONGODB_GAMERECORDS_URL)
 
-    print("Connected to MongoDB databases")
+    # Connect to system database (AI knowledge base), sharing the pool if possible
+    if _client_key(MONGODB_SYSTEM_URL) == _client_key(MONGODB_GAMERECORDS_URL):
+        system_client = gamerecords_client
+        print("Connected to MongoDB databases (shared client)")
+    else:
+        system_client = _create_client(MONGODB_SYSTEM_URL)
+        print("Connected to MongoDB databases")
 
 
 async def close_mongo_connection():
     """Close all MongoDB connections."""
     global system_client, gamerecords_client
 
-    if system_client:
+    if system_client and system_client is not gamerecords_client:
         system_client.close()
     if gamerecords_client:
         gamerecords_client.close()
@@ -42,9 +115,31 @@ async def close_mongo_connection():
 
 def get_system_db():
     """Get system database instance."""
+    if system_db_name:
+        return system_client.get_database(system_db_name)
     return system_client.get_default_database()
 
 
 def get_gamerecords_db():
-    """Get gamerecords database instance."""
-    return gamerecords_client.get_default_database()
+    """Get gamerecords database instance (profiled, see db_profiler)."""
+    if gamerecords_db_name:
+        db = gamerecords_client.get_database(gamerecords_db_name)
+    else:
+        db = gamerecords_client.get_default_database()
+    return query_profiler.wrap(db)
+
+
+def get_gamerecords_read_db():
+    """
+    Gamerecords database for read-only listing endpoints.
+
+    Uses MONGODB_LIST_READ_PREFERENCE, so with secondaryPreferred listings
+    are served by replicas and may lag slightly behind writes.
+    """
+    if LIST_READ_PREFERENCE == ReadPreference.PRIMARY:
+        return get_gamerecords_db()
+    if gamerecords_db_name:
+        db = gamerecords_client.get_database(gamerecords_db_name, read_preference=LIST_READ_PREFERENCE)
+    else:
+        db = gamerecords_client.get_default_database().with_options(read_preference=LIST_READ_PREFERENCE)
+    return query_profiler.wrap(db)
@@ -0,0 +1,502 @@
+"""
+Slow-query log and index advisor for Motor calls.
+
+With DB_PROFILING_ENABLED (off by default), get_gamerecords_db() returns the
+database wrapped in a ProfiledDatabase. Reads, writes and aggregates on its
+collections are timed per query shape: the filter with every value replaced
+by 1, so {"id": "turn-1a2b"} and {"id": "turn-3c4d"} are the same shape. The
+profiler keeps:
+
+- per-shape statistics (count, total and max latency)
+- a ring buffer of the most recent operations slower than DB_SLOW_QUERY_MS
+- the query plan of each shape, from an explain run in the background the
+  first time a shape is seen (and again after DB_EXPLAIN_INTERVAL), so
+  shapes answered by a COLLSCAN are flagged without slowing requests down
+
+Shapes that ran a COLLSCAN get an index suggestion: equality fields, then
+sort fields, then range fields. Exposed at GET /api/v1/admin/db/slow.
+
+Only shapes are reported; the filter values themselves are kept just long
+enough to run the explain.
+"""
+import asyncio
+import json
+import logging
+import time
+from collections import deque
+from datetime import datetime
+from typing import Any, Deque, Dict, List, Optional, Tuple
+
+from .config import (
+    DB_PROFILING_ENABLED,
+    DB_SLOW_QUERY_MS,
+    DB_SLOW_QUERY_BUFFER,
+    DB_EXPLAIN_INTERVAL
+)
+
+logger = logging.getLogger(__name__)
+
+
+# Operators that take a list of sub-filters
+LOGICAL_OPERATORS = {"$and", "$or", "$nor"}
+
+# Operators that match one value; fields using them lead an index
+EQUALITY_OPERATORS = {"$eq", "$in"}
+
+# Pending explains; when full, new shapes wait for their next occurrence
+EXPLAIN_QUEUE_SIZE = 100
+
+
+def query_shape(value: Any) -> Any:
+    """Replace every value in a filter (or pipeline) with 1, keeping keys and operators."""
+    if isinstance(value, dict):
+        return {
+            key: (
+                [query_shape(item) for item in sub] if key in LOGICAL_OPERATORS and isinstance(sub, list)
+                else query_shape(sub)
+            )
+            for key, sub in value.items()
+        }
+    if isinstance(value, list) and value and all(isinstance(item, dict) for item in value):
+        return [query_shape(item) for item in value]
+    return 1
+
+
+def suggest_index(shape: Dict[str, Any], sort: Optional[List[Tuple[str, int]]] = None) -> List[Tuple[str, int]]:
+    """
+    Suggest index keys for a filter shape (equality, sort, range).
+
+    Args:
+        shape: Filter shape from query_shape()
+        sort: Sort keys of the query
+
+    Returns:
+        List of (field, direction); empty when no field qualifies
+    """
+    equality, ranges = [], []
+    for field, condition in shape.items():
+        if field.startswith("$"):
+            continue
+        operators = set(condition) if isinstance(condition, dict) else set()
+        if not operators or not any(op.startswith("$") for op in operators) or operators <= EQUALITY_OPERATORS:
+            equality.append(field)
+        else:
+            ranges.append(field)
+
+    keys: List[Tuple[str, int]] = [(field, 1) for field in equality]
+    for field, direction in sort or []:
+        if field not in equality:
+            keys.append((field, direction))
+    for field in ranges:
+        if field not in [key for key, _ in keys]:
+            keys.append((field, 1))
+    return keys
+
+
+def _normalize_sort(sort: Any) -> Optional[List[Tuple[str, int]]]:
+    """Motor accepts a key, a (key, direction) list or a dict."""
+    if not sort:
+        return None
+    if isinstance(sort, str):
+        return [(sort, 1)]
+    if isinstance(sort, dict):
+        return list(sort.items())
+    return [(key, direction) for key, direction in sort]
+
+
+def _plan_stages(explain: Dict[str, Any]) -> Tuple[List[str], List[str]]:
+    """Stage names and index names of the winning plan in an explain result."""
+    stages, indexes = [], []
+
+    def walk(node: Any):
+        if isinstance(node, dict):
+            if isinstance(node.get("stage"), str):
+                stages.append(node["stage"])
+            if isinstance(node.get("indexName"), str):
+                indexes.append(node["indexName"])
+            for key, child in node.items():
+                if key != "rejectedPlans":
+                    walk(child)
+        elif isinstance(node, list):
+            for child in node:
+                walk(child)
+
+    walk(explain)
+    return stages, indexes
+
+
+# ============== Profiler ==============
+
+class QueryProfiler:
+    """Collects timings per query shape and explains new shapes in the background."""
+
+    def __init__(self):
+        """Initialize the profiler from config."""
+        self.enabled = DB_PROFILING_ENABLED
+        self.slow_ms = DB_SLOW_QUERY_MS
+        self.explain_interval = DB_EXPLAIN_INTERVAL
+        self.shapes: Dict[str, Dict[str, Any]] = {}
+        self.slow_ops: Deque[Dict[str, Any]] = deque(maxlen=DB_SLOW_QUERY_BUFFER)
+        self._explain_queue: Optional[asyncio.Queue] = None
+        self.started_at = datetime.utcnow()
+
+    def wrap(self, db):
+        """Wrap a Motor database so its collection calls are profiled."""
+        if not self.enabled or db is None:
+            return db
+        return ProfiledDatabase(db, self)
+
+    def reset(self):
+        """Forget all statistics, slow operations and plans."""
+        self.shapes.clear()
+        self.slow_ops.clear()
+        self.started_at = datetime.utcnow()
+
+    def record(
+        self,
+        collection,
+        operation: str,
+        query: Any,
+        duration_ms: float,
+        sort: Any = None,
+        error: Optional[str] = None
+    ):
+        """
+        Record one timed call.
+
+        Args:
+            collection: Motor collection the call ran on
+            operation: Method name (find, update_one, aggregate, ...)
+            query: Filter, or pipeline for aggregate
+            duration_ms: Wall time of the call
+            sort: Sort specification, if any
+            error: Error message if the call raised
+        """
+        shape = query_shape(query or {})
+        sort = _normalize_sort(sort)
+        key = json.dumps(
+            [collection.name, operation, shape, sort], sort_keys=True, default=str
+        )
+        now = datetime.utcnow()
+
+        stats = self.shapes.get(key)
+        if stats is None:
+            stats = self.shapes[key] = {
+                "collection": collection.name,
+                "operation": operation,
+                "shape": shape,
+                "sort": sort,
+                "count": 0,
+                "errors": 0,
+                "total_ms": 0.0,
+                "max_ms": 0.0,
+                "last_seen": now,
+                "plan": None,
+                "explained_at": None
+            }
+        stats["count"] += 1
+        stats["total_ms"] += duration_ms
+        stats["max_ms"] = max(stats["max_ms"], duration_ms)
+        stats["last_seen"] = now
+        if error:
+            stats["errors"] += 1
+
+        if duration_ms >= self.slow_ms:
+            self.slow_ops.append({
+                "at": now,
+                "collection": collection.name,
+                "operation": operation,
+                "shape": shape,
+                "sort": sort,
+                "duration_ms": round(duration_ms, 3),
+                "error": error
+            })
+
+        if error is None:
+            self._maybe_explain(stats, collection, operation, query, sort)
+
+    def _maybe_explain(self, stats: Dict[str, Any], collection, operation: str, query: Any, sort):
+        """Queue an explain if the shape was never explained or its plan is stale."""
+        if self._explain_queue is None or stats.get("explain_pending"):
+            return
+        explained_at = stats.get("explained_at")
+        if explained_at and (datetime.utcnow() - explained_at).total_seconds() < self.explain_interval:
+            return
+        try:
+            self._explain_queue.put_nowait((stats, collection, operation, query, sort))
+            stats["explain_pending"] = True
+        except asyncio.QueueFull:
+            pass
+
+    async def run_explainer(self):
+        """Explain queued query shapes until cancelled."""
+        self._explain_queue = asyncio.Queue(maxsize=EXPLAIN_QUEUE_SIZE)
+        try:
+            while True:
+                stats, collection, operation, query, sort = await self._explain_queue.get()
+                try:
+                    await self._explain(stats, collection, operation, query, sort)
+                except asyncio.CancelledError:
+                    raise
+                except Exception as e:
+                    # e.g. servers or mocks without explain support
+                    logger.debug(f"Explain failed for {stats['collection']}.{operation}: {e}")
+                    stats["plan"] = {"error": str(e)}
+                finally:
+                    stats["explain_pending"] = False
+                    stats["explained_at"] = datetime.utcnow()
+        finally:
+            self._explain_queue = None
+
+    async def _explain(self, stats: Dict[str, Any], collection, operation: str, query: Any, sort):
+        """Run explain (queryPlanner verbosity: plans only, nothing executed)."""
+        if operation == "aggregate":
+            command = {"aggregate": collection.name, "pipeline": query or [], "cursor": {}}
+        else:
+            # Writes and counts use the same plan as a find on their filter
+            command = {"find": collection.name, "filter": query or {}}
+            if sort:
+                command["sort"] = dict(sort)
+            if operation in ("find_one", "find_one_and_update", "update_one", "delete_one", "replace_one"):
+                command["limit"] = 1
+
+        result = await collection.database.command(
+            {"explain": command, "verbosity": "queryPlanner"}
+        )
+        stages, indexes = _plan_stages(result)
+        stats["plan"] = {
+            "stages": stages,
+            "indexes": sorted(set(indexes)),
+            "collscan": "COLLSCAN" in stages
+        }
+
+    def report(self, limit: int = 50) -> Dict[str, Any]:
+        """
+        Findings for the admin endpoint.
+
+        Returns:
+            Slowest recent operations, the shapes with the most total time,
+            shapes that ran a COLLSCAN and the indexes that would avoid them
+        """
+        shapes = []
+        for stats in self.shapes.values():
+            entry = {k: v for k, v in stats.items() if k != "explain_pending"}
+            entry["total_ms"] = round(stats["total_ms"], 3)
+            entry["max_ms"] = round(stats["max_ms"], 3)
+            entry["mean_ms"] = round(stats["total_ms"] / stats["count"], 3) if stats["count"] else 0.0
+            shapes.append(entry)
+        shapes.sort(key=lambda entry: entry["total_ms"], reverse=True)
+
+        collscans = [entry for entry in shapes if (entry.get("plan") or {}).get("collscan")]
+
+        suggestions: Dict[str, Dict[str, Any]] = {}
+        for entry in collscans:
+            shape = entry["shape"]
+            if entry["operation"] == "aggregate":
+                # Only a leading $match can use an index
+                first = shape[0] if isinstance(shape, list) and shape else {}
+                shape = first.get("$match", {}) if isinstance(first, dict) else {}
+            keys = suggest_index(shape if isinstance(shape, dict) else {}, entry.get("sort"))
+            if not keys:
+                continue
+            suggestion_key = json.dumps([entry["collection"], keys])
+            suggestion = suggestions.setdefault(suggestion_key, {
+                "collection": entry["collection"],
+                "keys": keys,
+                "total_ms": 0.0,
+                "count": 0
+            })
+            suggestion["total_ms"] = round(suggestion["total_ms"] + entry["total_ms"], 3)
+            suggestion["count"] += entry["count"]
+
+        return {
+            "enabled": self.enabled,
+            "since": self.started_at,
+            "slow_threshold_ms": self.slow_ms,
+            "slow_ops": sorted(self.slow_ops, key=lambda op: op["duration_ms"], reverse=True)[:limit],
+            "shapes": shapes[:limit],
+            "collscans": collscans[:limit],
+            "index_suggestions": sorted(
+                suggestions.values(), key=lambda s: s["total_ms"], reverse=True
+            )[:limit]
+        }
+
+
+# ============== Motor Proxies ==============
+
+class ProfiledCursor:
+    """
+    Cursor proxy timing the fetch (to_list or iteration) of a find/aggregate.
+
+    An iteration is recorded once, when it ends, fails, or stops early (the
+    cursor is closed or dropped).
+    """
+
+    # Cursor methods returning the cursor, so calls can be chained on the proxy
+    CHAINABLE = {
+        "limit", "skip", "batch_size", "hint", "collation", "comment", "max_time_ms",
+        "max_await_time_ms", "allow_disk_use", "where", "max", "min", "max_scan",
+        "add_option", "remove_option"
+    }
+
+    def __init__(self, cursor, collection, operation: str, query: Any, profiler: QueryProfiler, sort: Any = None):
+        self._cursor = cursor
+        self._collection = collection
+        self._operation = operation
+        self._query = query
+        self._profiler = profiler
+        self._sort = sort
+        self._elapsed = 0.0
+        self._started = False
+        self._recorded = False
+
+    def sort(self, key_or_list, direction=None):
+        self._sort = [(key_or_list, direction)] if direction is not None else key_or_list
+        self._cursor = self._cursor.sort(key_or_list, direction) if direction is not None \
+            else self._cursor.sort(key_or_list)
+        return self
+
+    def _record_iteration(self, error: Optional[str] = None):
+        if self._recorded:
+            return
+        self._recorded = True
+        self._profiler.record(
+            self._collection, self._operation, self._query,
+            self._elapsed * 1000, sort=self._sort, error=error
+        )
+
+    async def to_list(self, *args, **kwargs):
+        start = time.perf_counter()
+        error = None
+        try:
+            return await self._cursor.to_list(*args, **kwargs)
+        except Exception as e:
+            error = str(e)
+            raise
+        finally:
+            self._recorded = True
+            self._profiler.record(
+                self._collection, self._operation, self._query,
+                (time.perf_counter() - start) * 1000, sort=self._sort, error=error
+            )
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        self._started = True
+        start = time.perf_counter()
+        try:
+            document = await self._cursor.__anext__()
+        except StopAsyncIteration:
+            self._elapsed += time.perf_counter() - start
+            self._record_iteration()
+            raise
+        except Exception as e:
+            self._elapsed += time.perf_counter() - start
+            self._record_iteration(error=str(e))
+            raise
+        self._elapsed += time.perf_counter() - start
+        return document
+
+    async def close(self):
+        if self._started:
+            self._record_iteration()
+        result = self._cursor.close()
+        if asyncio.iscoroutine(result):
+            await result
+
+    def __del__(self):
+        # A loop that breaks early never reaches StopAsyncIteration
+        if getattr(self, "_started", False) and not self._recorded:
+            try:
+                self._record_iteration()
+            except Exception:
+                pass
+
+    def __getattr__(self, name):
+        attr = getattr(self._cursor, name)
+        if name not in self.CHAINABLE:
+            return attr
+
+        def chained(*args, **kwargs):
+            self._cursor = attr(*args, **kwargs)
+            return self
+
+        return chained
+
+
+class ProfiledCollection:
+    """Collection proxy timing reads, writes and aggregates per query shape."""
+
+    # Methods whose first argument (or filter=) is the query
+    TIMED = {
+        "find_one", "count_documents", "update_one", "update_many", "replace_one",
+        "delete_one", "delete_many", "find_one_and_update", "find_one_and_delete",
+        "find_one_and_replace", "distinct"
+    }
+
+    def __init__(self, collection, profiler: QueryProfiler):
+        self._collection = collection
+        self._profiler = profiler
+
+    def find(self, filter=None, *args, **kwargs):
+        cursor = self._collection.find(filter, *args, **kwargs)
+        return ProfiledCursor(
+            cursor, self._collection, "find", filter, self._profiler, sort=kwargs.get("sort")
+        )
+
+    def aggregate(self, pipeline, *args, **kwargs):
+        cursor = self._collection.aggregate(pipeline, *args, **kwargs)
+        return ProfiledCursor(cursor, self._collection, "aggregate", pipeline, self._profiler)
+
+    def __getattr__(self, name):
+        attr = getattr(self._collection, name)
+        if name not in self.TIMED:
+            return attr
+
+        async def timed(*args, **kwargs):
+            # distinct(key, filter); everything else takes the filter first
+            if name == "distinct":
+                query = args[1] if len(args) > 1 else kwargs.get("filter")
+            else:
+                query = args[0] if args else kwargs.get("filter")
+            start = time.perf_counter()
+            error = None
+            try:
+                return await attr(*args, **kwargs)
+            except Exception as e:
+                error = str(e)
+                raise
+            finally:
+                self._profiler.record(
+                    self._collection, name, query,
+                    (time.perf_counter() - start) * 1000, sort=kwargs.get("sort"), error=error
+                )
+
+        return timed
+
+
+class ProfiledDatabase:
+    """Database proxy handing out profiled collections."""
+
+    def __init__(self, db, profiler: QueryProfiler):
+        self._db = db
+        self._profiler = profiler
+
+    @staticmethod
+    def _is_collection(value) -> bool:
+        return hasattr(value, "find_one") and hasattr(value, "insert_one")
+
+    def __getitem__(self, name: str):
+        return ProfiledCollection(self._db[name], self._profiler)
+
+    def __getattr__(self, name: str):
+        attr = getattr(self._db, name)
+        if self._is_collection(attr):
+            return ProfiledCollection(attr, self._profiler)
+        return attr
+
+
+# Singleton instance
+query_profiler = QueryProfiler()
@@ -0,0 +1,243 @@
+"""
+Declarative index registry for the gamerecords database.
+
+INDEXES lists, per collection, the indexes the queries in routes and services
+rely on. ensure_indexes() runs at startup: indexes that already exist (same
+name) are left alone, missing ones are created and those listed in
+OBSOLETE_INDEXES are dropped, so it is safe to run on every start.
+Collections listed in CAPPED_COLLECTIONS are created capped first (an
+existing uncapped one is converted). Every
+entity is looked up by its custom `id`, which gets a unique index.
+
+An index that cannot be built (duplicate ids in existing data, or an index
+of the same name with different options) is reported and skipped; it never
+prevents the API from starting. The report of the last run is served at
+GET /api/v1/admin/db/indexes.
+"""
+import logging
+from datetime import datetime
+from typing import Any, Dict, List
+
+from pymongo import ASCENDING, DESCENDING
+
+from .config import SESSION_EVENT_LOG_MONGO_BYTES, SESSION_EVENT_LOG_STORE, TURN_TRACE_RETENTION_DAYS
+from .database import get_gamerecords_db
+
+logger = logging.getLogger(__name__)
+
+
+def _index(*keys, **options) -> Dict[str, Any]:
+    """Index spec: keys as (field, direction) pairs, options as for create_index."""
+    return {"keys": list(keys), **options}
+
+
+UNIQUE_ID = _index(("id", ASCENDING), unique=True)
+
+# Lease-based job queues (see services.job_queue)
+JOB_QUEUE_INDEXES = [
+    UNIQUE_ID,
+    # enqueue() is idempotent per dedup_key; jobs without a key are not indexed
+    _index(("dedup_key", ASCENDING), unique=True,
+           partialFilterExpression={"dedup_key": {"$type": "string"}}),
+    # claim(): pending jobs by availability, running jobs by expired lease
+    _index(("status", ASCENDING), ("available_at", ASCENDING)),
+    _index(("status", ASCENDING), ("lease_expires_at", ASCENDING)),
+]
+
+INDEXES: Dict[str, List[Dict[str, Any]]] = {
+    "players": [
+        UNIQUE_ID,
+        _index(("name", ASCENDING)),  # list_players sorts by name
+    ],
+    "worlds": [UNIQUE_ID],
+    "realms": [
+        UNIQUE_ID,
+        _index(("world_id", ASCENDING)),
+    ],
+    "campaigns": [
+        UNIQUE_ID,
+        _index(("realm_id", ASCENDING)),
+    ],
+    "chapters": [
+        UNIQUE_ID,
+        _index(("campaign_id", ASCENDING), ("meta.created_at", ASCENDING), ("id", ASCENDING)),
+    ],
+    "scenes": [
+        UNIQUE_ID,
+        _index(("chapter_id", ASCENDING), ("meta.created_at", ASCENDING), ("id", ASCENDING)),
+    ],
+    "sessions": [
+        UNIQUE_ID,
+        # get_latest_session and list_sessions (realm, or realm + campaign)
+        _index(("realm_id", ASCENDING), ("campaign_id", ASCENDING), ("session_number", DESCENDING),
+               ("id", DESCENDING)),
+        # Latest session per campaign, for turns without a stored session_id
+        _index(("campaign_id", ASCENDING), ("session_number", DESCENDING), ("id", DESCENDING)),
+    ],
+    "turns": [
+        UNIQUE_ID,
+        # list_turns, previous turns for context, completed-turn counts
+        _index(("scene_id", ASCENDING), ("order", ASCENDING), ("id", ASCENDING)),
+        # Reaper: turns stuck in processing
+        _index(("status", ASCENDING), ("processing_started_at", ASCENDING)),
+    ],
+    "action_drafts": [
+        UNIQUE_ID,
+        _index(("session_id", ASCENDING), ("order", ASCENDING), ("id", ASCENDING)),
+    ],
+    # PCs and NPCs; characters by realm, NPCs by campaign and status
+    "entities": [
+        UNIQUE_ID,
+        _index(("kind", ASCENDING), ("realm_id", ASCENDING), ("meta.created_at", ASCENDING), ("id", ASCENDING)),
+        _index(("kind", ASCENDING), ("campaign_id", ASCENDING), ("status", ASCENDING)),
+    ],
+    "characters": [UNIQUE_ID],
+    "turn_jobs": JOB_QUEUE_INDEXES + [
+        # Reaper and fail_turn look up a turn's jobs
+        _index(("payload.turn_id", ASCENDING), ("created_at", ASCENDING)),
+    ],
+    "summary_jobs": JOB_QUEUE_INDEXES + [
+        # Chapter jobs wait for the summary jobs of their scenes
+        _index(("payload.scene_id", ASCENDING), ("status", ASCENDING)),
+    ],
+    # Shared Socket.IO presence (PRESENCE_STORE=mongo)
+    "presence": [
+        # One entry per client (tab) of a player
+        _index(("session_id", ASCENDING), ("player_id", ASCENDING), ("sid", ASCENDING), unique=True),
+        _index(("sid", ASCENDING)),  # disconnect and heartbeat
+        _index(("expires_at", ASCENDING), expireAfterSeconds=0),
+    ],
+    # Session event log (SESSION_EVENT_LOG_STORE=mongo)
+    "session_event_seqs": [
+        _index(("session_id", ASCENDING), unique=True),
+    ],
+    "session_events": [
+        _index(("session_id", ASCENDING), ("seq", ASCENDING)),  # replay on reconnect
+    ],
+    "turn_traces": [
+        _index(("trace_id", ASCENDING), ("start", ASCENDING)),
+    ] + ([
+        _index(("created_at", ASCENDING), expireAfterSeconds=int(TURN_TRACE_RETENTION_DAYS * 86400)),
+    ] if TURN_TRACE_RETENTION_DAYS > 0 else []),
+}
+
+# Indexes replaced by registry entries; dropped when found
+OBSOLETE_INDEXES: Dict[str, List[str]] = {
+    # Presence used to allow a single client per player
+    "presence": ["session_id_1_player_id_1"],
+    # List pages are sorted by a unique key ending in id (see pagination)
+    "chapters": ["campaign_id_1_meta.created_at_1"],
+    "scenes": ["chapter_id_1_meta.created_at_1"],
+    "sessions": ["realm_id_1_campaign_id_1_session_number_-1", "campaign_id_1_session_number_-1"],
+    "turns": ["scene_id_1_order_1"],
+    "action_drafts": ["session_id_1_order_1"],
+    "entities": ["kind_1_realm_id_1"],
+}
+
+# Collections that must be capped, with their size in bytes
+CAPPED_COLLECTIONS: Dict[str, int] = {
+    "session_events": SESSION_EVENT_LOG_MONGO_BYTES,
+} if SESSION_EVENT_LOG_STORE == "mongo" else {}
+
+# Report of the last ensure_indexes() run
+last_report: Dict[str, Any] = {}
+
+
+def index_name(keys: List[Any]) -> str:
+    """Default MongoDB index name for the keys, e.g. scene_id_1_order_1."""
+    return "_".join(f"{field}_{direction}" for field, direction in keys)
+
+
+async def ensure_capped_collections(db):
+    """Create (or convert) the collections of CAPPED_COLLECTIONS as capped."""
+    if not CAPPED_COLLECTIONS:
+        return
+    existing = await db.list_collection_names()
+    for collection_name, size in CAPPED_COLLECTIONS.items():
+        try:
+            if collection_name not in existing:
+                await db.create_collection(collection_name, capped=True, size=size)
+                logger.info(f"Created capped collection {collection_name} ({size} bytes)")
+            elif not (await db[collection_name].options()).get("capped"):
+                await db.command("convertToCapped", collection_name, size=size)
+                logger.info(f"Converted {collection_name} to a capped collection ({size} bytes)")
+        except Exception as e:
+            logger.error(f"Failed to create capped collection {collection_name}: {e}")
+
+
+async def ensure_indexes() -> Dict[str, Any]:
+    """
+    Create the registry's missing indexes.
+
+    Returns:
+        Report with one entry per index: status "exists", "created",
+        "dropped" (obsolete) or "failed" (with the error), plus counts per status
+    """
+    db = get_gamerecords_db()
+    # Before create_index, which would create them uncapped
+    await ensure_capped_collections(db)
+    entries = []
+
+    for collection_name, specs in INDEXES.items():
+        collection = db[collection_name]
+        try:
+            existing = await collection.index_information()
+        except Exception as e:
+            logger.error(f"Failed to list indexes of {collection_name}: {e}")
+            existing = {}
+
+        for spec in specs:
+            options = {k: v for k, v in spec.items() if k != "keys"}
+            name = options.setdefault("name", index_name(spec["keys"]))
+            entry = {
+                "collection": collection_name,
+                "name": name,
+                "keys": spec["keys"],
+                "options": {k: v for k, v in options.items() if k != "name"},
+                "status": "exists",
+                "error": None
+            }
+            if name not in existing:
+                try:
+                    await collection.create_index(spec["keys"], **options)
+                    entry["status"] = "created"
+                    logger.info(f"Created index {collection_name}.{name}")
+                except Exception as e:
+                    # e.g. duplicate values for a unique index, or same name with other options
+                    entry["status"] = "failed"
+                    entry["error"] = str(e)
+                    logger.error(f"Failed to create index {collection_name}.{name}: {e}")
+            entries.append(entry)
+
+        for name in OBSOLETE_INDEXES.get(collection_name, []):
+            if name not in existing:
+                continue
+            entry = {
+                "collection": collection_name,
+                "name": name,
+                "keys": existing[name].get("key"),
+                "options": {},
+                "status": "dropped",
+                "error": None
+            }
+            try:
+                await collection.drop_index(name)
+                logger.info(f"Dropped obsolete index {collection_name}.{name}")
+            except Exception as e:
+                entry["status"] = "failed"
+                entry["error"] = str(e)
+                logger.error(f"Failed to drop index {collection_name}.{name}: {e}")
+            entries.append(entry)
+
+    counts = {
+        status: sum(1 for e in entries if e["status"] == status)
+        for status in ("exists", "created", "dropped", "failed")
+    }
+    logger.info(
+        f"Index bootstrap: {counts['created']} created, {counts['exists']} existing, "
+        f"{counts['dropped']} dropped, {counts['failed']} failed"
+    )
+
+    last_report.clear()
+    last_report.update({"ran_at": datetime.utcnow(), **counts, "indexes": entries})
+    return last_report
@@ -0,0 +1,437 @@
+"""
+In-process metrics with Prometheus text exposition.
+
+Counters, gauges and histograms with labels, rendered at GET /metrics in the
+Prometheus text format (version 0.0.4). No external dependencies.
+
+Covered:
+- HTTP requests per route template and status
+- MongoDB commands per collection and operation (pymongo command listener)
+- MongoDB connection pool usage per server (pymongo pool listener)
+- n8n and Ollama call latency
+- Socket.IO emits per event, active sessions and connected sids
+- Turn status transitions
+"""
+import logging
+import math
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+from pymongo import monitoring
+
+logger = logging.getLogger(__name__)
+
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0)
+
+# pymongo invokes listeners from Motor's executor threads
+_lock = threading.Lock()
+
+
+# ============== Metric Types ==============
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_value(value: float) -> str:
+    if value == math.inf:
+        return "+Inf"
+    if value == int(value):
+        return str(int(value))
+    return repr(float(value))
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+class _Metric:
+    """Base class: a named family of time series keyed by label values."""
+
+    type_name = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._children: Dict[Tuple[str, ...], object] = {}
+        REGISTRY.append(self)
+
+    def labels(self, *values: str):
+        """Get (or create) the series for these label values."""
+        key = tuple(str(v) for v in values)
+        if len(key) != len(self.labelnames):
+            raise ValueError(f"{self.name} expects labels {self.labelnames}, got {key}")
+        child = self._children.get(key)
+        if child is None:
+            with _lock:
+                child = self._children.setdefault(key, self._new_child())
+        return child
+
+    def _new_child(self):
+        raise NotImplementedError
+
+    def _samples(self) -> List[str]:
+        raise NotImplementedError
+
+    def render(self) -> str:
+        lines = [
+            f"# HELP {self.name} {self.documentation}",
+            f"# TYPE {self.name} {self.type_name}",
+        ]
+        lines.extend(self._samples())
+        return "\n".join(lines)
+
+
+class _Value:
+    def __init__(self):
+        self.value = 0.0
+
+    def inc(self, amount: float = 1.0):
+        with _lock:
+            self.value += amount
+
+    def dec(self, amount: float = 1.0):
+        with _lock:
+            self.value -= amount
+
+    def set(self, value: float):
+        self.value = value
+
+
+class Counter(_Metric):
+    """Monotonically increasing count."""
+
+    type_name = "counter"
+
+    def _new_child(self):
+        return _Value()
+
+    def inc(self, amount: float = 1.0):
+        """Increment the unlabelled series."""
+        self.labels().inc(amount)
+
+    def _samples(self) -> List[str]:
+        return [
+            f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(child.value)}"
+            for key, child in sorted(self._children.items())
+        ]
+
+
+class Gauge(_Metric):
+    """Value that goes up and down, optionally computed at scrape time."""
+
+    type_name = "gauge"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, documentation, labelnames)
+        self._function: Optional[Callable[[], float]] = None
+
+    def _new_child(self):
+        return _Value()
+
+    def set(self, value: float):
+        self.labels().set(value)
+
+    def set_function(self, function: Callable[[], float]):
+        """Compute the (unlabelled) value by calling function at every scrape."""
+        self._function = function
+
+    def _samples(self) -> List[str]:
+        if self._function is not None:
+            try:
+                return [f"{self.name} {_format_value(self._function())}"]
+            except Exception as e:
+                logger.warning(f"Gauge {self.name} callback failed: {e}")
+                return []
+        return [
+            f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(child.value)}"
+            for key, child in sorted(self._children.items())
+        ]
+
+
+class _HistogramValue:
+    def __init__(self, buckets: Tuple[float, ...]):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float):
+        with _lock:
+            self.sum += value
+            self.count += 1
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    self.counts[i] += 1
+                    break
+
+
+class Histogram(_Metric):
+    """Distribution of observed values (e.g. durations in seconds)."""
+
+    type_name = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_BUCKETS
+    ):
+        self.buckets = tuple(sorted(buckets)) + (math.inf,)
+        super().__init__(name, documentation, labelnames)
+
+    def _new_child(self):
+        return _HistogramValue(self.buckets)
+
+    def observe(self, value: float):
+        """Observe a value on the unlabelled series."""
+        self.labels().observe(value)
+
+    def _samples(self) -> List[str]:
+        lines = []
+        for key, child in sorted(self._children.items()):
+            cumulative = 0
+            for bound, count in zip(child.buckets, child.counts):
+                cumulative += count
+                le = f'le="{_format_value(bound)}"'
+                lines.append(f"{self.name}_bucket{_format_labels(self.labelnames, key, le)} {cumulative}")
+            labels = _format_labels(self.labelnames, key)
+            lines.append(f"{self.name}_sum{labels} {_format_value(child.sum)}")
+            lines.append(f"{self.name}_count{labels} {child.count}")
+        return lines
+
+
+REGISTRY: List[_Metric] = []
+
+
+def render() -> str:
+    """Render all metrics in Prometheus text format."""
+    return "\n".join(metric.render() for metric in REGISTRY) + "\n"
+
+
+# ============== Metrics ==============
+
+HTTP_REQUESTS = Counter(
+    "http_requests_total", "HTTP requests handled", ["method", "route", "status"]
+)
+HTTP_REQUEST_DURATION = Histogram(
+    "http_request_duration_seconds", "HTTP request latency", ["method", "route"]
+)
+
+MONGO_OPERATIONS = Counter(
+    "mongo_operations_total", "MongoDB commands", ["collection", "operation", "outcome"]
+)
+MONGO_OPERATION_DURATION = Histogram(
+    "mongo_operation_duration_seconds", "MongoDB command latency", ["collection", "operation"],
+    buckets=(0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 5.0)
+)
+
+MONGO_POOL_CONNECTIONS = Gauge(
+    "mongo_pool_connections", "Open MongoDB connections per server", ["address"]
+)
+MONGO_POOL_CHECKED_OUT = Gauge(
+    "mongo_pool_checked_out_connections", "MongoDB connections in use per server", ["address"]
+)
+MONGO_POOL_MAX_SIZE = Gauge("mongo_pool_max_size", "Configured maxPoolSize per server")
+MONGO_POOL_CHECKOUT_WAIT = Histogram(
+    "mongo_pool_checkout_wait_seconds", "Time spent waiting for a pooled MongoDB connection", ["address"],
+    buckets=(0.0001, 0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0)
+)
+MONGO_POOL_CHECKOUT_FAILURES = Counter(
+    "mongo_pool_checkout_failures_total", "Failed MongoDB connection checkouts", ["address", "reason"]
+)
+MONGO_POOL_CLEARED = Counter(
+    "mongo_pool_cleared_total", "MongoDB pools cleared after errors", ["address"]
+)
+
+UPSTREAM_REQUESTS = Counter(
+    "upstream_requests_total", "Calls to n8n and Ollama", ["service", "endpoint", "status"]
+)
+UPSTREAM_DURATION = Histogram(
+    "upstream_request_duration_seconds", "Latency of calls to n8n and Ollama", ["service", "endpoint"]
+)
+
+DOMAIN_EVENTS_PUBLISHED = Counter("domain_events_published_total", "Domain events published on the event bus", ["event"])
+SOCKETIO_EMITS = Counter("socketio_emits_total", "Socket.IO events emitted", ["event"])
+SOCKETIO_ACTIVE_SESSIONS = Gauge("socketio_active_sessions", "Session rooms with at least one client on this worker")
+SOCKETIO_CONNECTED_SIDS = Gauge("socketio_connected_sids", "Connected Socket.IO clients")
+SOCKETIO_MSGPACK_CLIENTS = Gauge("socketio_msgpack_clients", "Connected Socket.IO clients using msgpack")
+SOCKETIO_REPLAYS = Counter(
+    "socketio_replays_total", "Reconnects catching up from the session event log", ["result"]
+)
+SOCKETIO_EVENTS_REJECTED = Counter(
+    "socketio_events_rejected_total", "Incoming Socket.IO events dropped by limits", ["event", "reason"]
+)
+SOCKETIO_PACKETS_DROPPED = Counter(
+    "socketio_packets_dropped_total", "Outgoing Socket.IO packets dropped for lagging clients", ["event", "reason"]
+)
+
+# queued vs flushed shows how many action draft updates were coalesced away
+ACTION_DRAFT_UPDATES_QUEUED = Counter(
+    "action_draft_updates_queued_total", "Action draft updates handed to the batcher", ["kind"]
+)
+ACTION_DRAFT_UPDATES_FLUSHED = Counter(
+    "action_draft_updates_flushed_total", "Action draft updates written or broadcast after coalescing", ["kind"]
+)
+
+TURN_TRANSITIONS = Counter(
+    "turn_status_transitions_total", "Turn status changes", ["from_status", "to_status"]
+)
+
+
+# ============== Helpers ==============
+
+def record_turn_transition(from_status: Optional[str], to_status: str):
+    """Count a turn status change."""
+    TURN_TRANSITIONS.labels(from_status or "unknown", to_status).inc()
+
+
+class _UpstreamCall:
+    """Handle yielded by track_upstream; set status to the HTTP status code."""
+
+    def __init__(self):
+        self.status: Optional[int] = None
+
+
+@contextmanager
+def track_upstream(service: str, endpoint: str):
+    """
+    Time a call to n8n or Ollama.
+
+    Example:
+        with track_upstream("ollama", "chat") as call:
+            response = await client.post(...)
+            call.status = response.status_code
+    """
+    call = _UpstreamCall()
+    start = time.perf_counter()
+    status = "error"
+    try:
+        yield call
+        status = str(call.status) if call.status is not None else "ok"
+    except GeneratorExit:
+        # Consumer stopped reading a stream early
+        status = str(call.status) if call.status is not None else "closed"
+        raise
+    finally:
+        UPSTREAM_DURATION.labels(service, endpoint).observe(time.perf_counter() - start)
+        UPSTREAM_REQUESTS.labels(service, endpoint, status).inc()
+
+
+def _route_template(scope) -> str:
+    """Full path template of the matched route, or "unmatched"."""
+    # Newer FastAPI resolves included routers lazily: the matched route keeps
+    # its router-relative path and the prefixed one lives in this context
+    context = (scope.get("fastapi") or {}).get("effective_route_context")
+    if getattr(context, "path", None):
+        return context.path
+    return getattr(scope.get("route"), "path", "unmatched")
+
+
+async def http_metrics_middleware(request, call_next):
+    """Record count and latency of every HTTP request by route template."""
+    start = time.perf_counter()
+    status = 500
+    try:
+        response = await call_next(request)
+        status = response.status_code
+        return response
+    finally:
+        # Route template (/api/v1/turns/{turn_id}) keeps label cardinality bounded
+        path = _route_template(request.scope)
+        HTTP_REQUEST_DURATION.labels(request.method, path).observe(time.perf_counter() - start)
+        HTTP_REQUESTS.labels(request.method, path, status).inc()
+
+
+class MongoCommandListener(monitoring.CommandListener):
+    """Times MongoDB commands per collection and operation."""
+
+    # Commands that don't target a collection
+    IGNORED = {"hello", "ismaster", "isMaster", "ping", "buildInfo", "endSessions", "saslStart", "saslContinue"}
+
+    def __init__(self):
+        self._pending: Dict[Tuple[object, int], Tuple[str, str]] = {}
+
+    def started(self, event):
+        if event.command_name in self.IGNORED:
+            return
+        target = event.command.get(event.command_name)
+        if event.command_name == "getMore":
+            target = event.command.get("collection")
+        collection = target if isinstance(target, str) else "-"
+        self._pending[(event.connection_id, event.request_id)] = (collection, event.command_name)
+
+    def succeeded(self, event):
+        self._finish(event, "ok")
+
+    def failed(self, event):
+        self._finish(event, "error")
+
+    def _finish(self, event, outcome: str):
+        labels = self._pending.pop((event.connection_id, event.request_id), None)
+        if labels is None:
+            return
+        MONGO_OPERATIONS.labels(labels[0], labels[1], outcome).inc()
+        MONGO_OPERATION_DURATION.labels(*labels).observe(event.duration_micros / 1e6)
+
+
+mongo_command_listener = MongoCommandListener()
+
+
+def _address(event) -> str:
+    host, port = event.address
+    return f"{host}:{port}"
+
+
+class MongoPoolListener(monitoring.ConnectionPoolListener):
+    """Tracks MongoDB connection pool usage per server."""
+
+    def pool_created(self, event):
+        MONGO_POOL_CONNECTIONS.labels(_address(event)).set(0)
+        MONGO_POOL_CHECKED_OUT.labels(_address(event)).set(0)
+
+    def pool_ready(self, event):
+        pass
+
+    def pool_cleared(self, event):
+        MONGO_POOL_CLEARED.labels(_address(event)).inc()
+
+    def pool_closed(self, event):
+        pass
+
+    def connection_created(self, event):
+        MONGO_POOL_CONNECTIONS.labels(_address(event)).inc()
+
+    def connection_ready(self, event):
+        pass
+
+    def connection_closed(self, event):
+        MONGO_POOL_CONNECTIONS.labels(_address(event)).dec()
+
+    def connection_check_out_started(self, event):
+        pass
+
+    def connection_check_out_failed(self, event):
+        MONGO_POOL_CHECKOUT_FAILURES.labels(_address(event), event.reason).inc()
+        if getattr(event, "duration", None) is not None:
+            MONGO_POOL_CHECKOUT_WAIT.labels(_address(event)).observe(event.duration)
+
+    def connection_checked_out(self, event):
+        MONGO_POOL_CHECKED_OUT.labels(_address(event)).inc()
+        # Checkout duration is reported by pymongo >= 4.7
+        if getattr(event, "duration", None) is not None:
+            MONGO_POOL_CHECKOUT_WAIT.labels(_address(event)).observe(event.duration)
+
+    def connection_checked_in(self, event):
+        MONGO_POOL_CHECKED_OUT.labels(_address(event)).dec()
+
+
+mongo_pool_listener = MongoPoolListener()
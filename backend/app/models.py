@@ -316,6 +316,9 @@ class Chapter(BaseModel):
     name: str
     description: Optional[str] = None
     summary: Optional[str] = None  # AI-generated summary
+    summary_status: Optional[str] = None  # pending, ready (background summarization)
+    digest: Optional[str] = None  # Running summary, updated as each scene closes
+    digest_scene_ids: List[str] = Field(default_factory=list)  # Scenes merged into digest
     scenes: List[str] = Field(default_factory=list)  # Scene IDs
     status: str = "active"  # active, completed
     meta: Optional[Meta] = None
@@ -334,6 +337,7 @@ class Scene(BaseModel):
     name: str
     description: Optional[str] = None
     summary: Optional[str] = None  # AI-generated summary
+    summary_status: Optional[str] = None  # pending, ready (background summarization)
     turns: List[str] = Field(default_factory=list)  # Turn IDs
     participants: List[str] = Field(default_factory=list)  # Character IDs in scene
     npcs_present: List[str] = Field(default_factory=list)  # NPC IDs in scene
@@ -368,6 +372,7 @@ class Turn(BaseModel):
     id: Optional[str] = None
     kind: EntityKind = EntityKind.TURN
     scene_id: str
+    session_id: Optional[str] = None  # Session the turn was played in (Socket.IO room)
     order: int  # Turn number in scene
     actions: List[Action] = Field(default_factory=list)
     reaction: Optional[Reaction] = None  # Keeper's narrative response
@@ -392,6 +397,7 @@ class ActionDraft(BaseModel):
     ooc: Optional[str] = None
     order: int = 0
     ready: bool = False
+    version: int = 0  # Incremented on every change (optimistic concurrency)
     updated_at: datetime = Field(default_factory=datetime.utcnow)
 
 
@@ -483,6 +489,12 @@ class SessionCreate(BaseModel):
     created_by: str
 
 
+class MasterTransfer(BaseModel):
+    """Request model for handing a session's master role to another player."""
+    new_master_id: str
+    transferred_by: str
+
+
 class ChapterCreate(BaseModel):
     """Request model for creating a chapter (AI-managed)."""
     campaign_id: str
@@ -502,6 +514,7 @@ class SceneCreate(BaseModel):
 class TurnCreate(BaseModel):
     """Request model for creating a turn."""
     scene_id: str
+    session_id: Optional[str] = None
     order: int
     actions: List[Action] = Field(default_factory=list)
     created_by: str
@@ -519,3 +532,52 @@ class ActionDraftCreate(BaseModel):
     ooc: Optional[str] = None
     order: int = 0
     ready: bool = False
+
+
+class ActionDraftPatch(BaseModel):
+    """
+    Request model for changing some fields of an action draft.
+
+    Only the fields present in the request are changed; they cannot be
+    null. version is the draft version the client edited; the patch is
+    rejected when the draft has changed since.
+    """
+    version: int
+    speak: Optional[str] = None
+    act: Optional[str] = None
+    appearance: Optional[str] = None
+    emotion: Optional[str] = None
+    ooc: Optional[str] = None
+    order: Optional[int] = None
+    ready: Optional[bool] = None
+
+
+class ActionDraftDelta(BaseModel):
+    """Changed fields of an action draft and its version after the change."""
+    draft_id: str
+    session_id: str
+    version: int
+    changes: Dict[str, Any]
+
+
+class SessionSnapshot(BaseModel):
+    """
+    Everything the game view shows for a session, in one response.
+
+    current_chapter_id and current_scene_id point into chapters and scenes
+    (None when the campaign has none yet); turns are those of the current
+    scene. Audit trails (changes) are left out. seq is the last session event
+    already reflected: send it as last_seq with join_session to be sent only
+    the events after it.
+    """
+    session: Session
+    campaign: Optional[Campaign] = None
+    chapters: List[Chapter] = Field(default_factory=list)
+    current_chapter_id: Optional[str] = None
+    scenes: List[Scene] = Field(default_factory=list)
+    current_scene_id: Optional[str] = None
+    turns: List[Turn] = Field(default_factory=list)
+    action_drafts: List[ActionDraft] = Field(default_factory=list)
+    characters: List[Character] = Field(default_factory=list)
+    npcs: List[NPC] = Field(default_factory=list)
+    seq: int = 0
@@ -0,0 +1,195 @@
+"""
+Keyset pagination, field projections and streamed JSON for list endpoints.
+
+List endpoints take three query parameters (see page_params()):
+
+- limit: page size (the endpoint's old fixed list size by default)
+- after: cursor of the page to fetch, from the previous page's X-Next-Cursor
+- fields: comma-separated fields to return, e.g. fields=id,name
+
+Pages are ordered by a fixed sort per endpoint that ends in `id`, so every
+document has a unique position. A cursor encodes the sort values of the last
+document of a page, and the next page starts right after it (keyset
+pagination): pages stay stable while documents are added and cost the same
+however deep they are. When there are more documents, the response has an
+X-Next-Cursor header; its absence means the list is complete.
+
+Without fields, documents are returned as their API model serializes them.
+With fields, only those fields (plus `id` and the sort fields) are read from
+MongoDB and returned as stored, so a list of names does not ship each
+document's audit trail.
+
+Documents are validated and converted before the response starts; the JSON
+text of the array is then streamed in chunks instead of being built in memory
+as one response body.
+"""
+import base64
+import json
+import re
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple, Type
+
+from bson import json_util
+from fastapi import HTTPException, Query
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel
+from pymongo import ASCENDING
+
+# Largest page a client may ask for
+MAX_PAGE_SIZE = 1000
+
+# Documents encoded per streamed chunk
+STREAM_CHUNK_SIZE = 100
+
+# Header carrying the cursor of the next page
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+_FIELD_PATTERN = re.compile(r"^[A-Za-z_][\w.]*$")
+
+Sort = List[Tuple[str, int]]
+
+
+class PageParams:
+    """Pagination and projection parameters of a list request."""
+
+    def __init__(self, limit: int, after: Optional[str], fields: Optional[str]):
+        self.limit = limit
+        self.after = after
+        self.fields = fields
+
+
+def page_params(default_limit: int = 100):
+    """
+    FastAPI dependency for the limit, after and fields query parameters.
+
+    Args:
+        default_limit: Page size when the request does not set limit
+
+    Returns:
+        A dependency returning PageParams
+    """
+    def dependency(
+        limit: int = Query(default_limit, ge=1, le=MAX_PAGE_SIZE, description="Page size"),
+        after: Optional[str] = Query(None, description=f"Cursor from the previous page's {NEXT_CURSOR_HEADER}"),
+        fields: Optional[str] = Query(None, description="Comma-separated fields to return")
+    ) -> PageParams:
+        return PageParams(limit, after, fields)
+
+    return dependency
+
+
+def _value(document: Dict[str, Any], key: str) -> Any:
+    """Value of a dotted field of a document (None if missing)."""
+    for part in key.split("."):
+        if not isinstance(document, dict):
+            return None
+        document = document.get(part)
+    return document
+
+
+def encode_cursor(document: Dict[str, Any], sort: Sort) -> str:
+    """Cursor pointing right after a document."""
+    values = [_value(document, key) for key, _ in sort]
+    return base64.urlsafe_b64encode(json_util.dumps(values).encode()).decode()
+
+
+def decode_cursor(cursor: str, sort: Sort) -> Dict[str, Any]:
+    """
+    MongoDB filter for the documents after a cursor.
+
+    Raises:
+        HTTPException: 400 if the cursor is malformed or from another sort
+    """
+    try:
+        values = json_util.loads(base64.urlsafe_b64decode(cursor.encode()).decode())
+    except Exception:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    if not isinstance(values, list) or len(values) != len(sort):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+    # (k1 > v1) or (k1 = v1 and k2 > v2) or ... in sort direction. Missing
+    # values (null) sort first, so they come before anything in ascending
+    # order and after anything in descending order.
+    clauses = []
+    for i, ((key, direction), value) in enumerate(zip(sort, values)):
+        equal = {k: v for (k, _), v in zip(sort[:i], values[:i])}
+        if direction == ASCENDING:
+            clauses.append({**equal, key: {"$ne": None} if value is None else {"$gt": value}})
+        elif value is not None:
+            clauses.append({**equal, key: {"$lt": value}})
+            clauses.append({**equal, key: None})
+    return {"$or": clauses} if clauses else {"_id": {"$exists": False}}
+
+
+def projection(fields: Optional[str], sort: Sort) -> Optional[Dict[str, int]]:
+    """
+    MongoDB projection for a fields parameter (None: whole documents).
+
+    Raises:
+        HTTPException: 400 for a field name that is not a (dotted) identifier
+    """
+    if not fields:
+        return None
+    names = [name.strip() for name in fields.split(",") if name.strip()]
+    for name in names:
+        if not _FIELD_PATTERN.match(name):
+            raise HTTPException(status_code=400, detail=f"Invalid field: {name}")
+    # id and the sort fields are needed for the cursor. A path inside another
+    # requested path (meta.created_at with meta) would be a path collision.
+    paths = []
+    for path in sorted({"id", *(key for key, _ in sort), *names}):
+        if not any(path.startswith(f"{parent}.") for parent in paths):
+            paths.append(path)
+    return {"_id": 0, **{path: 1 for path in paths}}
+
+
+async def _stream_json(documents: List[Any]) -> AsyncIterator[bytes]:
+    """Dump JSON-compatible documents as a JSON array, a chunk at a time."""
+    yield b"["
+    for start in range(0, len(documents), STREAM_CHUNK_SIZE):
+        chunk = ",".join(
+            json.dumps(document, separators=(",", ":"))
+            for document in documents[start:start + STREAM_CHUNK_SIZE]
+        )
+        yield (("," if start else "") + chunk).encode()
+    yield b"]"
+
+
+async def paginate(
+    collection,
+    query: Dict[str, Any],
+    sort: Sort,
+    model: Type[BaseModel],
+    page: PageParams
+) -> StreamingResponse:
+    """
+    One page of a list endpoint as a streamed JSON array.
+
+    Args:
+        collection: Motor collection to read
+        query: Filter of the list
+        sort: Sort of the list; must end with ("id", direction)
+        model: API model documents are serialized with (without fields)
+        page: The request's pagination parameters
+
+    Returns:
+        StreamingResponse with X-Next-Cursor when there are more documents
+    """
+    if page.after:
+        query = {"$and": [query, decode_cursor(page.after, sort)]}
+    fields = projection(page.fields, sort)
+
+    # One more than the page, to know whether there is a next page
+    documents = await collection.find(query, fields or {"_id": 0}).sort(sort).to_list(length=page.limit + 1)
+    headers = {}
+    if len(documents) > page.limit:
+        documents = documents[:page.limit]
+        headers[NEXT_CURSOR_HEADER] = encode_cursor(documents[-1], sort)
+
+    # Validate before the response starts, so a bad document is a clean 500
+    # rather than a body cut off after the 200 status was sent
+    if fields:
+        documents = jsonable_encoder(documents)
+    else:
+        documents = [jsonable_encoder(model(**document)) for document in documents]
+    return StreamingResponse(_stream_json(documents), media_type="application/json", headers=headers)
@@ -1,23 +1,38 @@
 """
 API routes for ActionDraft entities.
 ActionDrafts are temporary UI state for current turn (cleared after submission).
+
+Edits go through PATCH with the changed fields and the draft version the
+client started from; they are applied with $set and rejected with 409 when
+the draft changed in between. Ready and order changes are not checked
+against a version. Every change bumps the draft version and is broadcast as
+a delta with the new version (batched, see services.draft_batcher), so
+clients keep their versions current.
 """
-from fastapi import APIRouter, HTTPException, Query
-from typing import List, Optional
-from .models import ActionDraft, ActionDraftCreate
+from fastapi import APIRouter, HTTPException, Query, Depends
+from fastapi.encoders import jsonable_encoder
+from typing import Any, Dict, List, Optional
+from .models import ActionDraft, ActionDraftCreate, ActionDraftPatch, ActionDraftDelta
 from .database import get_gamerecords_db
+from .pagination import PageParams, page_params, paginate
+from .services.draft_batcher import action_draft_batcher
 from datetime import datetime
+from pymongo import ASCENDING, ReturnDocument
 import uuid
 
 router = APIRouter(prefix="/action-drafts", tags=["action-drafts"])
 
+# Drafts are listed in their queue order
+LIST_SORT = [("order", ASCENDING), ("id", ASCENDING)]
+
 
 @router.get("", response_model=List[ActionDraft])
 async def list_action_drafts(
     session_id: Optional[str] = Query(None),
-    player_id: Optional[str] = Query(None)
+    player_id: Optional[str] = Query(None),
+    page: PageParams = Depends(page_params(1000))
 ):
-    """List action drafts, optionally filtered by session or player."""
+    """List action drafts, optionally filtered by session or player, a page at a time."""
     db = get_gamerecords_db()
 
     query = {}
@@ -26,8 +41,7 @@ async def list_action_drafts(
     if player_id:
         query["player_id"] = player_id
 
-    drafts = await db.action_drafts.find(query).sort("order", 1).to_list(length=1000)
-    return drafts
+    return await paginate(db.action_drafts, query, LIST_SORT, ActionDraft, page)
 
 
 @router.get("/{draft_id}", response_model=ActionDraft)
@@ -66,70 +80,120 @@ async def create_action_draft(draft_data: ActionDraftCreate):
     return draft
 
 
-@router.put("/{draft_id}", response_model=ActionDraft)
-async def update_action_draft(draft_id: str, draft_data: ActionDraftCreate):
-    """Update an existing action draft."""
-    db = get_gamerecords_db()
+async def _apply_changes(
+    draft_id: str,
+    changes: Dict[str, Any],
+    version_filter: Any = None
+) -> Optional[ActionDraftDelta]:
+    """
+    Write changed fields of a draft, bump its version and broadcast the delta.
 
-    existing = await db.action_drafts.find_one({"id": draft_id})
-    if not existing:
-        raise HTTPException(status_code=404, detail="Action draft not found")
+    Args:
+        draft_id: Draft to change
+        changes: Fields to $set
+        version_filter: Version the draft must be at (None: any version)
 
-    # Update all fields
-    existing["speak"] = draft_data.speak
-    existing["act"] = draft_data.act
-    existing["appearance"] = draft_data.appearance
-    existing["emotion"] = draft_data.emotion
-    existing["ooc"] = draft_data.ooc
-    existing["order"] = draft_data.order
-    existing["ready"] = draft_data.ready
-    existing["updated_at"] = datetime.utcnow()
-
-    await db.action_drafts.replace_one({"id": draft_id}, existing)
+    Returns:
+        The applied delta, or None if no draft matched
+    """
+    db = get_gamerecords_db()
 
-    return ActionDraft(**existing)
+    query = {"id": draft_id}
+    if version_filter is not None:
+        query["version"] = version_filter
+    draft = await db.action_drafts.find_one_and_update(
+        query,
+        {
+            "$set": {**changes, "updated_at": datetime.utcnow()},
+            "$inc": {"version": 1}
+        },
+        projection={"_id": 0, "session_id": 1, "version": 1},
+        return_document=ReturnDocument.BEFORE
+    )
+    if not draft:
+        return None
 
+    version = (draft.get("version") or 0) + 1
 
-@router.patch("/{draft_id}/ready")
-async def toggle_ready(draft_id: str, ready: bool):
-    """Toggle ready state for action draft."""
-    db = get_gamerecords_db()
+    action_draft_batcher.queue_delta(draft["session_id"], draft_id, version, changes)
 
-    result = await db.action_drafts.update_one(
-        {"id": draft_id},
-        {
-            "$set": {
-                "ready": ready,
-                "updated_at": datetime.utcnow()
-            }
-        }
+    return ActionDraftDelta(
+        draft_id=draft_id,
+        session_id=draft["session_id"],
+        version=version,
+        changes=changes
     )
 
-    if result.modified_count == 0:
-        raise HTTPException(status_code=404, detail="Action draft not found")
 
-    return {"message": f"Ready state updated to {ready}"}
+@router.patch("/{draft_id}", response_model=ActionDraftDelta)
+async def patch_action_draft(draft_id: str, patch: ActionDraftPatch):
+    """
+    Change some fields of an action draft.
 
+    Only the fields in the request body are written. The change is
+    broadcast to the session as a delta with the new version. A body with
+    only the version changes nothing and returns the current version.
 
-@router.patch("/{draft_id}/order")
-async def update_order(draft_id: str, order: int):
-    """Update order/position of action draft."""
+    Raises:
+        404 if the draft does not exist
+        422 if a field is null
+        409 if the draft is no longer at patch.version; the detail carries
+        the current draft so the client can reapply its edit
+    """
     db = get_gamerecords_db()
 
-    result = await db.action_drafts.update_one(
-        {"id": draft_id},
-        {
-            "$set": {
-                "order": order,
-                "updated_at": datetime.utcnow()
-            }
-        }
-    )
-
-    if result.modified_count == 0:
+    changes = patch.dict(exclude_unset=True)
+    expected_version = changes.pop("version")
+
+    # The draft fields are not nullable; an empty text field is ""
+    null_fields = [field for field, value in changes.items() if value is None]
+    if null_fields:
+        raise HTTPException(status_code=422, detail=f"Fields cannot be null: {', '.join(null_fields)}")
+
+    if not changes:
+        # Nothing to change: report the current version without bumping it
+        draft = await db.action_drafts.find_one({"id": draft_id}, {"_id": 0, "session_id": 1, "version": 1})
+        if not draft:
+            raise HTTPException(status_code=404, detail="Action draft not found")
+        return ActionDraftDelta(
+            draft_id=draft_id,
+            session_id=draft["session_id"],
+            version=draft.get("version") or 0,
+            changes={}
+        )
+
+    # Drafts created before versioning have no version field (null matches missing)
+    version_filter = expected_version if expected_version else {"$in": [0, None]}
+    delta = await _apply_changes(draft_id, changes, version_filter)
+
+    if not delta:
+        current = await db.action_drafts.find_one({"id": draft_id}, {"_id": 0})
+        if not current:
+            raise HTTPException(status_code=404, detail="Action draft not found")
+        raise HTTPException(status_code=409, detail={
+            "message": "Action draft was changed by someone else",
+            "draft": jsonable_encoder(ActionDraft(**current))
+        })
+
+    return delta
+
+
+@router.patch("/{draft_id}/ready", response_model=ActionDraftDelta)
+async def toggle_ready(draft_id: str, ready: bool):
+    """Toggle ready state for action draft."""
+    delta = await _apply_changes(draft_id, {"ready": ready})
+    if not delta:
         raise HTTPException(status_code=404, detail="Action draft not found")
+    return delta
 
-    return {"message": "Order updated successfully"}
+
+@router.patch("/{draft_id}/order", response_model=ActionDraftDelta)
+async def update_order(draft_id: str, order: int):
+    """Update order/position of action draft."""
+    delta = await _apply_changes(draft_id, {"order": order})
+    if not delta:
+        raise HTTPException(status_code=404, detail="Action draft not found")
+    return delta
 
 
 @router.delete("/{draft_id}")
@@ -137,11 +201,13 @@ async def delete_action_draft(draft_id: str):
     """Delete an action draft."""
     db = get_gamerecords_db()
 
-    result = await db.action_drafts.delete_one({"id": draft_id})
+    draft = await db.action_drafts.find_one_and_delete({"id": draft_id}, {"session_id": 1})
 
-    if result.deleted_count == 0:
+    if not draft:
         raise HTTPException(status_code=404, detail="Action draft not found")
 
+    action_draft_batcher.discard_draft(draft["session_id"], draft_id)
+
     return {"message": "Action draft deleted successfully"}
 
 
@@ -150,6 +216,7 @@ async def clear_session_drafts(session_id: str):
     """Clear all action drafts for a session (after turn submission)."""
     db = get_gamerecords_db()
 
+    action_draft_batcher.discard_session(session_id)
     result = await db.action_drafts.delete_many({"session_id": session_id})
 
     return {
@@ -0,0 +1,34 @@
+"""
+API routes for operational diagnostics.
+Database profiling findings (slow queries, collection scans, index
+suggestions) and the startup index bootstrap report.
+"""
+from fastapi import APIRouter, Query
+from .db_profiler import query_profiler
+from . import indexes
+
+router = APIRouter(prefix="/admin", tags=["admin"])
+
+
+@router.get("/db/slow")
+async def get_slow_queries(limit: int = Query(50, ge=1, le=500)):
+    """
+    Slow-query log and index advisor.
+
+    Returns the slowest recent calls, query shapes by total time, shapes
+    whose plan is a COLLSCAN and the indexes that would avoid them.
+    """
+    return query_profiler.report(limit)
+
+
+@router.delete("/db/slow")
+async def reset_slow_queries():
+    """Clear collected statistics (e.g. after adding indexes)."""
+    query_profiler.reset()
+    return {"message": "Query statistics cleared"}
+
+
+@router.get("/db/indexes")
+async def get_index_report():
+    """Report of the startup index bootstrap (created, existing and failed indexes)."""
+    return indexes.last_report
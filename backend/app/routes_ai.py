@@ -3,20 +3,24 @@ Mock AI endpoints for Keeper AI and Rules AI.
 These will be replaced with n8n workflows later.
 """
 from fastapi import APIRouter, HTTPException
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
 from typing import List, Optional
 from datetime import datetime
+import json
 import random
 import httpx
 import logging
+from .config import N8N_PROPHET_WEBHOOK, N8N_DUNGEONMASTER_WEBHOOK
+from .metrics import track_upstream
 
 logger = logging.getLogger(__name__)
 
 router = APIRouter(prefix="/ai", tags=["ai"])
 
-# n8n webhook URLs (from docker-compose network)
-N8N_PROPHET_WEBHOOK_URL = "http://n8n:5678/webhook/coc_prophet"
-N8N_DUNGEONMASTER_WEBHOOK_URL = "http://n8n:5678/webhook/coc_dungeonmaster"
+# n8n webhook URLs (N8N_BASE_URL defaults to the docker-compose network)
+N8N_PROPHET_WEBHOOK_URL = N8N_PROPHET_WEBHOOK
+N8N_DUNGEONMASTER_WEBHOOK_URL = N8N_DUNGEONMASTER_WEBHOOK
 
 
 class KeeperRequest(BaseModel):
@@ -247,11 +251,13 @@ async def ask_prophet_question(request: ProphetRequest):
         
         # Call n8n prophet webhook
         async with httpx.AsyncClient(timeout=30.0) as client:
-            response = await client.post(
-                N8N_PROPHET_WEBHOOK_URL,
-                json=payload,
-                headers={"Content-Type": "application/json"}
-            )
+            with track_upstream("n8n", "prophet") as call:
+                response = await client.post(
+                    N8N_PROPHET_WEBHOOK_URL,
+                    json=payload,
+                    headers={"Content-Type": "application/json"}
+                )
+                call.status = response.status_code
             
             if response.status_code != 200:
                 raise HTTPException(
@@ -316,11 +322,13 @@ async def process_dungeonmaster_turn(request: DungeonMasterRequest):
         
         # Call n8n dungeonmaster webhook
         async with httpx.AsyncClient(timeout=60.0) as client:  # Longer timeout for scene generation
-            response = await client.post(
-                N8N_DUNGEONMASTER_WEBHOOK_URL,
-                json=payload,
-                headers={"Content-Type": "application/json"}
-            )
+            with track_upstream("n8n", "dungeonmaster") as call:
+                response = await client.post(
+                    N8N_DUNGEONMASTER_WEBHOOK_URL,
+                    json=payload,
+                    headers={"Content-Type": "application/json"}
+                )
+                call.status = response.status_code
             
             if response.status_code != 200:
                 raise HTTPException(
@@ -395,19 +403,14 @@ class GenerateActionResponse(BaseModel):
     ooc: str = ""
 
 
-@router.post("/generate-action", response_model=GenerateActionResponse)
-async def generate_ai_character_action(request: GenerateActionRequest):
+async def _prepare_action_generation(request: GenerateActionRequest) -> dict:
     """
-    Generate an action for an AI-controlled character.
+    Load character and scene for AI action generation.
 
-    This endpoint:
-    1. Fetches character data (personality, skills, backstory)
-    2. Fetches scene context (location, previous turns)
-    3. Calls LLMService to generate contextual action
-    4. Returns action draft ready to be added to turn
+    Returns keyword arguments for LLMService.generate_character_action.
+    Raises HTTPException if the character/scene is missing or not AI-controlled.
     """
     from .database import get_gamerecords_db
-    from .services.llm import llm_service
 
     db = get_gamerecords_db()
 
@@ -458,14 +461,33 @@ async def generate_ai_character_action(request: GenerateActionRequest):
             "act": action.get("act", "")
         })
 
+    return {
+        "character_name": character_name,
+        "character_data": llm_character_data,
+        "scene_context": scene_context,
+        "existing_actions": formatted_actions
+    }
+
+
+@router.post("/generate-action", response_model=GenerateActionResponse)
+async def generate_ai_character_action(request: GenerateActionRequest):
+    """
+    Generate an action for an AI-controlled character.
+
+    This endpoint:
+    1. Fetches character data (personality, skills, backstory)
+    2. Fetches scene context (location, previous turns)
+    3. Calls LLMService to generate contextual action
+    4. Returns action draft ready to be added to turn
+    """
+    from .services.llm import llm_service
+
+    generation = await _prepare_action_generation(request)
+    character_name = generation["character_name"]
+
     # Generate action using LLM
     try:
-        action_data = await llm_service.generate_character_action(
-            character_name=character_name,
-            character_data=llm_character_data,
-            scene_context=scene_context,
-            existing_actions=formatted_actions
-        )
+        action_data = await llm_service.generate_character_action(**generation)
 
         return GenerateActionResponse(
             character_id=request.character_id,
@@ -485,6 +507,37 @@ async def generate_ai_character_action(request: GenerateActionRequest):
         )
 
 
+@router.post("/generate-action/stream")
+async def stream_ai_character_action(request: GenerateActionRequest):
+    """
+    Generate an action for an AI-controlled character, streamed field by field.
+
+    Returns newline-delimited JSON so the UI can fill the draft progressively:
+    - {"type": "field", "field": "speak", "value": "..."} as each field completes
+    - {"type": "action", "character_id": ..., "character_name": ..., "action": {...}} at the end
+    """
+    from .services.llm import llm_service
+
+    generation = await _prepare_action_generation(request)
+    character_name = generation["character_name"]
+
+    async def event_stream():
+        try:
+            async for event in llm_service.stream_character_action(**generation):
+                if event["type"] == "action":
+                    event = {
+                        **event,
+                        "character_id": request.character_id,
+                        "character_name": character_name
+                    }
+                yield json.dumps(event) + "\n"
+        except Exception as e:
+            logger.error(f"Error streaming AI action for {character_name}: {e}")
+            yield json.dumps({"type": "error", "detail": f"Failed to generate action: {str(e)}"}) + "\n"
+
+    return StreamingResponse(event_stream(), media_type="application/x-ndjson")
+
+
 # ============== AI STATUS ENDPOINTS ==============
 
 @router.get("/status")
@@ -5,7 +5,7 @@ Campaigns are stored in the gamerecords database.
 from fastapi import APIRouter, HTTPException, Query
 from typing import List, Optional
 from .models import Campaign, CampaignCreate, Change, Meta, EntityKind, StoryArc
-from .database import get_gamerecords_db
+from .database import get_gamerecords_db, get_gamerecords_read_db
 from .services.llm import llm_service
 from datetime import datetime
 import uuid
@@ -19,7 +19,7 @@ router = APIRouter(prefix="/campaigns", tags=["campaigns"])
 @router.get("", response_model=List[Campaign])
 async def list_campaigns(realm_id: Optional[str] = Query(None)):
     """List campaigns, optionally filtered by realm_id."""
-    db = get_gamerecords_db()
+    db = get_gamerecords_read_db()
 
     query = {}
     if realm_id:
@@ -2,27 +2,34 @@
 API routes for Chapter entities.
 Chapters are AI-managed narrative arcs within campaigns.
 """
-from fastapi import APIRouter, HTTPException, Query
+from fastapi import APIRouter, HTTPException, Query, Depends
 from typing import List, Optional
 from .models import Chapter, ChapterCreate, Change, Meta
-from .database import get_gamerecords_db
+from .database import get_gamerecords_db, get_gamerecords_read_db
+from .pagination import PageParams, page_params, paginate
 from datetime import datetime
+from pymongo import ASCENDING
 import uuid
 
 router = APIRouter(prefix="/chapters", tags=["chapters"])
 
+# Chapters are listed oldest first
+LIST_SORT = [("meta.created_at", ASCENDING), ("id", ASCENDING)]
+
 
 @router.get("", response_model=List[Chapter])
-async def list_chapters(campaign_id: Optional[str] = Query(None)):
-    """List all chapters, optionally filtered by campaign."""
-    db = get_gamerecords_db()
+async def list_chapters(
+    campaign_id: Optional[str] = Query(None),
+    page: PageParams = Depends(page_params())
+):
+    """List chapters, optionally filtered by campaign, a page at a time."""
+    db = get_gamerecords_read_db()
 
     query = {}
     if campaign_id:
         query["campaign_id"] = campaign_id
 
-    chapters = await db.chapters.find(query).sort("meta.created_at", 1).to_list(length=100)
-    return chapters
+    return await paginate(db.chapters, query, LIST_SORT, Chapter, page)
 
 
 @router.get("/{chapter_id}", response_model=Chapter)
@@ -2,23 +2,29 @@
 API routes for Character entities (PCs).
 Characters are stored in the gamerecords database in the entities collection.
 """
-from fastapi import APIRouter, HTTPException, Query
+from fastapi import APIRouter, HTTPException, Query, Depends
 from typing import List, Optional
 from .models import Character, CharacterCreate, Change, Meta, EntityKind, Controller
-from .database import get_gamerecords_db
+from .database import get_gamerecords_db, get_gamerecords_read_db
+from .pagination import PageParams, page_params, paginate
 from datetime import datetime
+from pymongo import ASCENDING
 import uuid
 
 router = APIRouter(prefix="/characters", tags=["characters"])
 
+# Listed in creation order
+LIST_SORT = [("meta.created_at", ASCENDING), ("id", ASCENDING)]
+
 
 @router.get("", response_model=List[Character])
 async def list_characters(
     realm_id: Optional[str] = Query(None),
-    player: Optional[str] = Query(None)
+    player: Optional[str] = Query(None),
+    page: PageParams = Depends(page_params())
 ):
-    """List characters, optionally filtered by realm_id and/or player name."""
-    db = get_gamerecords_db()
+    """List characters, optionally filtered by realm_id and/or player name, a page at a time."""
+    db = get_gamerecords_read_db()
 
     query = {"kind": EntityKind.PC.value}
     if realm_id:
@@ -26,8 +32,7 @@ async def list_characters(
     if player:
         query["controller.owner"] = player
 
-    characters = await db.entities.find(query).to_list(length=100)
-    return characters
+    return await paginate(db.entities, query, LIST_SORT, Character, page)
 
 
 @router.get("/{character_id}", response_model=Character)
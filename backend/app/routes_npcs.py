@@ -2,23 +2,29 @@
 API routes for NPC entities.
 NPCs are stored in the gamerecords database in the entities collection.
 """
-from fastapi import APIRouter, HTTPException, Query
+from fastapi import APIRouter, HTTPException, Query, Depends
 from typing import List, Optional
 from .models import NPC, NPCCreate, Change, Meta, EntityKind
-from .database import get_gamerecords_db
+from .database import get_gamerecords_db, get_gamerecords_read_db
+from .pagination import PageParams, page_params, paginate
 from datetime import datetime
+from pymongo import ASCENDING
 import uuid
 
 router = APIRouter(prefix="/npcs", tags=["npcs"])
 
+# Listed in creation order
+LIST_SORT = [("meta.created_at", ASCENDING), ("id", ASCENDING)]
+
 
 @router.get("", response_model=List[NPC])
 async def list_npcs(
     campaign_id: Optional[str] = Query(None),
-    status: Optional[str] = Query(None)
+    status: Optional[str] = Query(None),
+    page: PageParams = Depends(page_params())
 ):
-    """List NPCs, optionally filtered by campaign_id and/or status."""
-    db = get_gamerecords_db()
+    """List NPCs, optionally filtered by campaign_id and/or status, a page at a time."""
+    db = get_gamerecords_read_db()
 
     query = {"kind": EntityKind.NPC.value}
     if campaign_id:
@@ -26,8 +32,7 @@ async def list_npcs(
     if status:
         query["status"] = status
 
-    npcs = await db.entities.find(query).to_list(length=100)
-    return npcs
+    return await paginate(db.entities, query, LIST_SORT, NPC, page)
 
 
 @router.get("/{npc_id}", response_model=NPC)
@@ -5,7 +5,7 @@ Players are stored in the gamerecords database.
 from fastapi import APIRouter, HTTPException, Query
 from typing import List, Optional
 from .models import Change
-from .database import get_gamerecords_db
+from .database import get_gamerecords_db, get_gamerecords_read_db
 from datetime import datetime
 import uuid
 from pydantic import BaseModel
@@ -42,7 +42,7 @@ class PlayerResponse(BaseModel):
 @router.get("", response_model=List[PlayerResponse])
 async def list_players(search: Optional[str] = Query(None)):
     """List all players, optionally filtered by name search."""
-    db = get_gamerecords_db()
+    db = get_gamerecords_read_db()
 
     query = {}
     if search:
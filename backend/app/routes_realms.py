@@ -5,7 +5,7 @@ Realms are stored in the gamerecords database.
 from fastapi import APIRouter, HTTPException, Query
 from typing import List, Optional
 from .models import Realm, RealmCreate, Change, Meta, EntityKind, Player
-from .database import get_gamerecords_db
+from .database import get_gamerecords_db, get_gamerecords_read_db
 from datetime import datetime
 import uuid
 
@@ -15,7 +15,7 @@ router = APIRouter(prefix="/realms", tags=["realms"])
 @router.get("", response_model=List[Realm])
 async def list_realms(world_id: Optional[str] = Query(None)):
     """List realms, optionally filtered by world_id."""
-    db = get_gamerecords_db()
+    db = get_gamerecords_read_db()
 
     query = {}
     if world_id:
@@ -2,27 +2,34 @@
 API routes for Scene entities.
 Scenes are AI-managed story segments within chapters.
 """
-from fastapi import APIRouter, HTTPException, Query
+from fastapi import APIRouter, HTTPException, Query, Depends
 from typing import List, Optional
 from .models import Scene, SceneCreate, Change, Meta
-from .database import get_gamerecords_db
+from .database import get_gamerecords_db, get_gamerecords_read_db
+from .pagination import PageParams, page_params, paginate
 from datetime import datetime
+from pymongo import ASCENDING
 import uuid
 
 router = APIRouter(prefix="/scenes", tags=["scenes"])
 
+# Scenes are listed oldest first
+LIST_SORT = [("meta.created_at", ASCENDING), ("id", ASCENDING)]
+
 
 @router.get("", response_model=List[Scene])
-async def list_scenes(chapter_id: Optional[str] = Query(None)):
-    """List all scenes, optionally filtered by chapter."""
-    db = get_gamerecords_db()
+async def list_scenes(
+    chapter_id: Optional[str] = Query(None),
+    page: PageParams = Depends(page_params())
+):
+    """List scenes, optionally filtered by chapter, a page at a time."""
+    db = get_gamerecords_read_db()
 
     query = {}
     if chapter_id:
         query["chapter_id"] = chapter_id
 
-    scenes = await db.scenes.find(query).sort("meta.created_at", 1).to_list(length=100)
-    return scenes
+    return await paginate(db.scenes, query, LIST_SORT, Scene, page)
 
 
 @router.get("/{scene_id}", response_model=Scene)
@@ -2,23 +2,40 @@
 API routes for Session entities.
 Sessions are stored in the gamerecords database.
 """
-from fastapi import APIRouter, HTTPException, Query
+from fastapi import APIRouter, HTTPException, Query, Header, Response, Depends
+from fastapi.encoders import jsonable_encoder
 from typing import List, Optional
-from .models import Session, SessionCreate, Change, Meta, EntityKind, Attendance
-from .database import get_gamerecords_db
+from .models import (
+    Session, SessionCreate, SessionSnapshot, MasterTransfer, Change, Meta, EntityKind, Attendance
+)
+from .database import get_gamerecords_db, get_gamerecords_read_db
+from .pagination import PageParams, page_params, paginate
+from .services.event_bus import event_bus
+from .services.session_event_log import session_event_log
 from datetime import datetime
+from pymongo import DESCENDING, ReturnDocument
+import asyncio
+import hashlib
+import json
 import uuid
 
 router = APIRouter(prefix="/sessions", tags=["sessions"])
 
+# Snapshot documents leave out the audit trail, which only grows
+SNAPSHOT_PROJECTION = {"_id": 0, "changes": 0}
+
+# Sessions are listed newest first
+LIST_SORT = [("session_number", DESCENDING), ("id", DESCENDING)]
+
 
 @router.get("", response_model=List[Session])
 async def list_sessions(
     realm_id: Optional[str] = Query(None),
-    campaign_id: Optional[str] = Query(None)
+    campaign_id: Optional[str] = Query(None),
+    page: PageParams = Depends(page_params())
 ):
-    """List sessions, optionally filtered by realm_id and/or campaign_id."""
-    db = get_gamerecords_db()
+    """List sessions, optionally filtered by realm_id and/or campaign_id, a page at a time."""
+    db = get_gamerecords_read_db()
 
     query = {}
     if realm_id:
@@ -26,8 +43,7 @@ async def list_sessions(
     if campaign_id:
         query["campaign_id"] = campaign_id
 
-    sessions = await db.sessions.find(query).sort("session_number", -1).to_list(length=100)
-    return sessions
+    return await paginate(db.sessions, query, LIST_SORT, Session, page)
 
 
 @router.get("/latest", response_model=Optional[Session])
@@ -56,6 +72,81 @@ async def get_session(session_id: str):
     return session
 
 
+@router.get("/{session_id}/snapshot", response_model=SessionSnapshot)
+async def get_session_snapshot(session_id: str, if_none_match: Optional[str] = Header(None)):
+    """
+    Get everything the game view shows for a session in one request.
+
+    Collections that do not depend on each other are queried concurrently.
+    The response carries an ETag of its content; a request whose
+    If-None-Match matches gets 304 Not Modified without a body.
+    """
+    db = get_gamerecords_db()
+
+    # seq is read first: events after it may already be reflected, never missing
+    seq, session = await asyncio.gather(
+        session_event_log.current_seq(session_id),
+        db.sessions.find_one({"id": session_id}, SNAPSHOT_PROJECTION)
+    )
+    if not session:
+        raise HTTPException(status_code=404, detail="Session not found")
+
+    campaign_id = session.get("campaign_id")
+    campaign, chapters, drafts, characters, npcs = await asyncio.gather(
+        db.campaigns.find_one({"id": campaign_id}, SNAPSHOT_PROJECTION),
+        db.chapters.find({"campaign_id": campaign_id}, SNAPSHOT_PROJECTION)
+        .sort("meta.created_at", 1).to_list(length=100),
+        db.action_drafts.find({"session_id": session_id}, SNAPSHOT_PROJECTION)
+        .sort("order", 1).to_list(length=1000),
+        db.entities.find(
+            {"kind": EntityKind.PC.value, "realm_id": session.get("realm_id")}, SNAPSHOT_PROJECTION
+        ).to_list(length=100),
+        db.entities.find(
+            {"kind": EntityKind.NPC.value, "campaign_id": campaign_id}, SNAPSHOT_PROJECTION
+        ).to_list(length=100)
+    )
+
+    # Current chapter and scene: the newest still being played
+    chapter = next((c for c in reversed(chapters) if c.get("status") == "active"), None)
+    scenes = []
+    if chapter:
+        scenes = await db.scenes.find(
+            {"chapter_id": chapter["id"]}, SNAPSHOT_PROJECTION
+        ).sort("meta.created_at", 1).to_list(length=100)
+    scene = next((s for s in reversed(scenes) if s.get("status") in ("active", "in_progress")), None)
+    turns = []
+    if scene:
+        turns = await db.turns.find({"scene_id": scene["id"]}, SNAPSHOT_PROJECTION).sort("order", 1).to_list(length=1000)
+
+    snapshot = SessionSnapshot(
+        session=session,
+        campaign=campaign,
+        chapters=chapters,
+        current_chapter_id=chapter["id"] if chapter else None,
+        scenes=scenes,
+        current_scene_id=scene["id"] if scene else None,
+        turns=turns,
+        action_drafts=drafts,
+        characters=characters,
+        npcs=npcs,
+        seq=seq
+    )
+    body = json.dumps(jsonable_encoder(snapshot), separators=(",", ":")).encode()
+    etag = f'"{hashlib.sha1(body).hexdigest()}"'
+    # no-cache: browsers keep the response but revalidate it with If-None-Match
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+
+    if if_none_match and _etag_matches(if_none_match, etag):
+        return Response(status_code=304, headers=headers)
+    return Response(content=body, media_type="application/json", headers=headers)
+
+
+def _etag_matches(if_none_match: str, etag: str) -> bool:
+    """Whether an If-None-Match header matches an ETag (weak comparison)."""
+    tags = [tag.strip() for tag in if_none_match.split(",")]
+    return "*" in tags or any(tag.removeprefix("W/") == etag for tag in tags)
+
+
 @router.post("", response_model=Session)
 async def create_session(session_data: SessionCreate):
     """Create a new session."""
@@ -113,6 +204,33 @@ async def update_session(session_id: str, session_data: SessionCreate):
     return Session(**existing)
 
 
+@router.put("/{session_id}/master", response_model=Session)
+async def transfer_master(session_id: str, transfer: MasterTransfer):
+    """Make another player the session's master and notify the session."""
+    db = get_gamerecords_db()
+
+    session = await db.sessions.find_one_and_update(
+        {"id": session_id},
+        {
+            "$set": {"master_player_id": transfer.new_master_id},
+            "$push": {
+                "changes": Change(by=transfer.transferred_by, at=datetime.utcnow(), type="master_transferred").dict()
+            }
+        },
+        return_document=ReturnDocument.AFTER
+    )
+    if not session:
+        raise HTTPException(status_code=404, detail="Session not found")
+
+    player = await db.players.find_one({"id": transfer.new_master_id}, {"name": 1})
+    await event_bus.publish("master_transferred", session_id, {
+        "session": session,
+        "new_master_name": player.get("name") if player else None
+    })
+
+    return session
+
+
 @router.delete("/{session_id}")
 async def delete_session(session_id: str):
     """Delete a session."""
@@ -2,24 +2,29 @@
 API routes for Turn entities.
 Turns represent player actions + Keeper responses.
 """
-from fastapi import APIRouter, HTTPException, Query, Body
+from fastapi import APIRouter, HTTPException, Query, Body, Header, Depends
 from typing import List, Optional
 from pydantic import BaseModel
 from .models import Turn, TurnCreate, Change, Meta, Reaction
 from .database import get_gamerecords_db
+from .metrics import record_turn_transition, track_upstream
+from .pagination import PageParams, page_params, paginate
 from .config import (
     USE_ASYNC_TURN_PROCESSING,
     N8N_DUNGEONMASTER_WEBHOOK,
-    N8N_DUNGEONMASTER_V2_WEBHOOK,
     BACKEND_BASE_URL
 )
 from .services import (
     ContextAssemblyService,
     SkillCheckService,
-    TransitionService,
-    ContextBundle
+    TransitionService
 )
+from .services.context_assembly import SkillCheckContext
+from .services.event_bus import event_bus
+from .services.tracing import TraceContext, new_span_id, turn_trace_service
+from .services.turn_dispatch import turn_dispatch_service
 from datetime import datetime
+from pymongo import ASCENDING, ReturnDocument
 import uuid
 import httpx
 import logging
@@ -31,18 +36,23 @@ router = APIRouter(prefix="/turns", tags=["turns"])
 # Legacy webhook URL for backwards compatibility
 N8N_DUNGEONMASTER_WEBHOOK_URL = N8N_DUNGEONMASTER_WEBHOOK
 
+# Turns are listed in play order
+LIST_SORT = [("order", ASCENDING), ("id", ASCENDING)]
+
 
 @router.get("", response_model=List[Turn])
-async def list_turns(scene_id: Optional[str] = Query(None)):
-    """List all turns, optionally filtered by scene."""
+async def list_turns(
+    scene_id: Optional[str] = Query(None),
+    page: PageParams = Depends(page_params(1000))
+):
+    """List turns, optionally filtered by scene, a page at a time."""
     db = get_gamerecords_db()
 
     query = {}
     if scene_id:
         query["scene_id"] = scene_id
 
-    turns = await db.turns.find(query).sort("order", 1).to_list(length=1000)
-    return turns
+    return await paginate(db.turns, query, LIST_SORT, Turn, page)
 
 
 @router.get("/{turn_id}", response_model=Turn)
@@ -65,6 +75,7 @@ async def create_turn(turn_data: TurnCreate):
     turn = Turn(
         id=turn_id,
         scene_id=turn_data.scene_id,
+        session_id=turn_data.session_id,
         order=turn_data.order,
         actions=turn_data.actions,
         status="draft",
@@ -88,6 +99,8 @@ async def create_turn(turn_data: TurnCreate):
 class TurnSubmitRequest(BaseModel):
     """Request model for turn submission."""
     session_id: str
+    # Same key on a retried request = same submission (also accepted as Idempotency-Key header)
+    idempotency_key: Optional[str] = None
 
 
 class CallbackPayload(BaseModel):
@@ -97,6 +110,15 @@ class CallbackPayload(BaseModel):
     result: Optional[dict] = None
     error: Optional[str] = None
     metadata: Optional[dict] = None
+    # Submission key from the context bundle; stale or replayed callbacks are ignored
+    idempotency_key: Optional[str] = None
+
+
+# Turn statuses that can be (re)submitted for processing
+SUBMITTABLE_STATUSES = ["draft", "ready_for_agents", "failed"]
+
+# Turn fields a failure callback needs after applying the result
+CALLBACK_PROJECTION = {"scene_id": 1, "session_id": 1, "trace": 1, "processing_started_at": 1}
 
 
 # ============== TURN SUBMISSION ENDPOINTS ==============
@@ -105,154 +127,270 @@ class CallbackPayload(BaseModel):
 async def submit_turn(
     turn_id: str,
     request: TurnSubmitRequest = Body(...),
-    submitted_by: str = "player"
+    submitted_by: str = "player",
+    idempotency_key: Optional[str] = Header(None, alias="Idempotency-Key")
 ):
     """
     Submit turn for AI processing via DungeonMaster.
 
     Uses feature flag to switch between sync (old) and async (new) processing.
+    Repeating a submission with the same idempotency key is a no-op that
+    returns the outcome of the first one; a new key for a turn that is
+    processing or completed is rejected with 409.
     """
+    submission_key = request.idempotency_key or idempotency_key or uuid.uuid4().hex
+
     if USE_ASYNC_TURN_PROCESSING:
-        return await submit_turn_async(turn_id, request.session_id, submitted_by)
+        return await submit_turn_async(turn_id, request.session_id, submitted_by, submission_key)
     else:
-        return await submit_turn_sync(turn_id, submitted_by)
+        return await submit_turn_sync(turn_id, submitted_by, submission_key, request.session_id)
 
 
-async def submit_turn_sync(turn_id: str, submitted_by: str):
+async def _claim_turn_for_submission(
+    turn_id: str,
+    submitted_by: str,
+    submission_key: str,
+    session_id: Optional[str] = None
+):
     """
-    Original synchronous turn submission (legacy mode).
-    Blocks until n8n completes LLM processing.
+    Atomically move a submittable turn to processing.
+
+    Records the submitting session on the turn, so the callback knows which
+    Socket.IO room to notify without further lookups, and starts a new trace
+    for this submission (turn.trace).
+
+    Returns (turn, None) when this request claimed the turn (the claimed
+    document; changes and submission_count as before the claim), or
+    (None, response) for a repeated submission (same key), where response
+    describes that submission's outcome.
+
+    Raises:
+        HTTPException: 404 if the turn does not exist, 409 if it was submitted
+            with another key and is not submittable
     """
     db = get_gamerecords_db()
+    now = datetime.utcnow()
 
-    # Get the turn first
-    turn = await db.turns.find_one({"id": turn_id})
-    if not turn:
-        raise HTTPException(status_code=404, detail="Turn not found")
+    claim = {
+        "status": "processing",
+        "processing_started_at": now,
+        "submission_key": submission_key,
+        "trace": TraceContext.new().dict(),
+        "error": None
+    }
+    if session_id:
+        claim["session_id"] = session_id
 
-    # Update status to processing
-    await db.turns.update_one(
-        {"id": turn_id},
+    turn = await db.turns.find_one_and_update(
+        {
+            "id": turn_id,
+            "status": {"$in": SUBMITTABLE_STATUSES},
+            # A failed submission is not re-run by a retry of itself
+            "submission_key": {"$ne": submission_key}
+        },
         {
-            "$set": {"status": "processing"},
+            "$set": claim,
+            "$inc": {"submission_count": 1},
             "$push": {
                 "changes": {
                     "by": submitted_by,
-                    "at": datetime.utcnow(),
+                    "at": now,
                     "type": "submitted"
                 }
             }
-        }
+        },
+        return_document=ReturnDocument.BEFORE
     )
+    if turn:
+        record_turn_transition(turn.get("status"), "processing")
+        return {**turn, **claim}, None
 
-    # Call DungeonMaster AI via n8n webhook
-    try:
-        payload = {"DungeonMaster": turn["actions"]}
+    existing = await db.turns.find_one(
+        {"id": turn_id},
+        {"status": 1, "submission_key": 1, "reaction": 1, "error": 1}
+    )
+    if not existing:
+        raise HTTPException(status_code=404, detail="Turn not found")
 
-        async with httpx.AsyncClient(timeout=60.0) as client:
-            response = await client.post(
-                N8N_DUNGEONMASTER_WEBHOOK_URL,
-                json=payload,
-                headers={"Content-Type": "application/json"}
-            )
+    if existing.get("submission_key") != submission_key:
+        raise HTTPException(
+            status_code=409,
+            detail=f"Turn was already submitted (status {existing.get('status')})"
+        )
+
+    logger.info(f"Ignoring repeated submission of turn {turn_id} (status={existing.get('status')})")
+    response = {
+        "turn_id": turn_id,
+        "status": existing.get("status"),
+        "message": "Turn already submitted",
+        "duplicate": True
+    }
+    if existing.get("status") == "completed":
+        response["reaction"] = existing.get("reaction")
+    elif existing.get("status") == "failed":
+        response["error"] = existing.get("error")
+    return None, response
+
+
+async def submit_turn_sync(
+    turn_id: str,
+    submitted_by: str,
+    submission_key: str,
+    session_id: Optional[str] = None
+):
+    """
+    Original synchronous turn submission (legacy mode).
+    Blocks until n8n completes LLM processing.
+    """
+    db = get_gamerecords_db()
+
+    # Move to processing (no-op for duplicate submissions)
+    turn, duplicate = await _claim_turn_for_submission(turn_id, submitted_by, submission_key, session_id)
+    if duplicate:
+        return duplicate
+    session_id = session_id or turn.get("session_id")
+    await event_bus.publish("turn_processing", session_id, {"turn": turn})
+
+    trace = turn_trace_service.start(turn_id, TraceContext.parse(turn["trace"]))
+    outcome = "failed"
+    error = None
+
+    try:
+        # Call DungeonMaster AI via n8n webhook
+        try:
+            payload = {"DungeonMaster": turn["actions"]}
+
+            async with httpx.AsyncClient(timeout=60.0) as client:
+                with track_upstream("n8n", "dungeonmaster") as call, trace.span("n8n", mode="sync"):
+                    response = await client.post(
+                        N8N_DUNGEONMASTER_WEBHOOK_URL,
+                        json=payload,
+                        headers={"Content-Type": "application/json"}
+                    )
+                    call.status = response.status_code
             
-            if response.status_code == 200:
-                n8n_data = response.json()
+                if response.status_code == 200:
+                    n8n_data = response.json()
                 
-                # Extract description from n8n response
-                description = n8n_data.get("output", n8n_data.get("body", ""))
+                    # Extract description from n8n response
+                    description = n8n_data.get("output", n8n_data.get("body", ""))
                 
-                if not description and isinstance(n8n_data, dict):
-                    description = (
-                        n8n_data.get("text") or 
-                        n8n_data.get("response") or 
-                        n8n_data.get("description") or
-                        "The Keeper observes in silence..."
-                    )
+                    if not description and isinstance(n8n_data, dict):
+                        description = (
+                            n8n_data.get("text") or 
+                            n8n_data.get("response") or 
+                            n8n_data.get("description") or
+                            "The Keeper observes in silence..."
+                        )
                 
-                # Try to extract a summary
-                summary = None
-                if description:
-                    sentences = description.split('. ')
-                    if len(sentences) > 1:
-                        summary = sentences[0] + '.'
-                    elif len(description) > 100:
-                        summary = description[:97] + '...'
+                    # Try to extract a summary
+                    summary = None
+                    if description:
+                        sentences = description.split('. ')
+                        if len(sentences) > 1:
+                            summary = sentences[0] + '.'
+                        elif len(description) > 100:
+                            summary = description[:97] + '...'
                 
-                # Add reaction to turn
-                reaction = Reaction(description=description, summary=summary)
+                    # Add reaction to turn
+                    reaction = Reaction(description=description, summary=summary)
                 
-                await db.turns.update_one(
-                    {"id": turn_id},
-                    {
-                        "$set": {
-                            "reaction": reaction.dict(),
-                            "status": "completed"
-                        },
-                        "$push": {
-                            "changes": {
-                                "by": "DungeonMasterAI",
-                                "at": datetime.utcnow(),
-                                "type": "reaction_added"
+                    await db.turns.update_one(
+                        {"id": turn_id},
+                        {
+                            "$set": {
+                                "reaction": reaction.dict(),
+                                "status": "completed"
+                            },
+                            "$push": {
+                                "changes": {
+                                    "by": "DungeonMasterAI",
+                                    "at": datetime.utcnow(),
+                                    "type": "reaction_added"
+                                }
                             }
                         }
-                    }
-                )
+                    )
+                    record_turn_transition("processing", "completed")
+                    outcome = "completed"
+                    await event_bus.publish("turn_completed", session_id, {
+                        "turn": {**turn, "reaction": reaction.dict(), "status": "completed"}
+                    })
                 
-                return {
-                    "message": "Turn processed successfully",
-                    "turn_id": turn_id,
-                    "reaction": reaction.dict()
-                }
-            else:
-                # If n8n fails, mark as failed
-                await db.turns.update_one(
-                    {"id": turn_id},
-                    {"$set": {"status": "failed"}}
-                )
-                raise HTTPException(
-                    status_code=500,
-                    detail=f"DungeonMaster AI returned status {response.status_code}"
-                )
+                    return {
+                        "message": "Turn processed successfully",
+                        "turn_id": turn_id,
+                        "reaction": reaction.dict()
+                    }
+                else:
+                    # If n8n fails, mark as failed
+                    await db.turns.update_one(
+                        {"id": turn_id},
+                        {"$set": {"status": "failed"}}
+                    )
+                    record_turn_transition("processing", "failed")
+                    raise HTTPException(
+                        status_code=500,
+                        detail=f"DungeonMaster AI returned status {response.status_code}"
+                    )
                 
-    except httpx.TimeoutException:
-        await db.turns.update_one(
-            {"id": turn_id},
-            {"$set": {"status": "failed"}}
-        )
-        raise HTTPException(
-            status_code=504,
-            detail="Request to DungeonMaster AI timed out"
-        )
-    except httpx.RequestError as e:
-        await db.turns.update_one(
-            {"id": turn_id},
-            {"$set": {"status": "failed"}}
-        )
-        raise HTTPException(
-            status_code=503,
-            detail=f"Could not connect to DungeonMaster AI: {str(e)}"
-        )
-    except Exception as e:
-        await db.turns.update_one(
-            {"id": turn_id},
-            {"$set": {"status": "failed"}}
-        )
-        raise HTTPException(
-            status_code=500,
-            detail=f"Error processing turn: {str(e)}"
-        )
+        except httpx.TimeoutException:
+            await db.turns.update_one(
+                {"id": turn_id},
+                {"$set": {"status": "failed"}}
+            )
+            record_turn_transition("processing", "failed")
+            raise HTTPException(
+                status_code=504,
+                detail="Request to DungeonMaster AI timed out"
+            )
+        except httpx.RequestError as e:
+            await db.turns.update_one(
+                {"id": turn_id},
+                {"$set": {"status": "failed"}}
+            )
+            record_turn_transition("processing", "failed")
+            raise HTTPException(
+                status_code=503,
+                detail=f"Could not connect to DungeonMaster AI: {str(e)}"
+            )
+        except HTTPException:
+            # Already marked failed and counted above
+            raise
+        except Exception as e:
+            await db.turns.update_one(
+                {"id": turn_id},
+                {"$set": {"status": "failed"}}
+            )
+            record_turn_transition("processing", "failed")
+            raise HTTPException(
+                status_code=500,
+                detail=f"Error processing turn: {str(e)}"
+            )
+    except HTTPException as e:
+        error = e.detail
+        raise
+    finally:
+        trace.end_turn(turn["processing_started_at"], outcome)
+        await trace.flush()
+        if outcome == "failed":
+            await event_bus.publish("turn_failed", session_id, {"turn_id": turn_id, "error": error or "Processing failed"})
 
 
-async def submit_turn_async(turn_id: str, session_id: str, submitted_by: str = "player"):
+async def submit_turn_async(
+    turn_id: str,
+    session_id: str,
+    submitted_by: str = "player",
+    submission_key: Optional[str] = None
+):
     """
     New async turn submission with callback pattern.
 
     Steps:
-    1. Validate turn and update status
+    1. Validate turn and claim it for processing (duplicates stop here)
     2. Assemble context bundle
     3. Detect and roll skill checks
-    4. Call n8n webhook (fire-and-forget)
+    4. Queue the context bundle for dispatch to n8n
     5. Return immediately with 202 Accepted
     """
     db = get_gamerecords_db()
@@ -262,70 +400,87 @@ async def submit_turn_async(turn_id: str, session_id: str, submitted_by: str = "
     if not turn:
         raise HTTPException(status_code=404, detail="Turn not found")
 
-    # Get scene to find session_id
+    # Validate the turn's scene exists
     scene_id = turn.get("scene_id")
-    scene = await db.scenes.find_one({"id": scene_id})
+    scene = await db.scenes.find_one({"id": scene_id}, {"id": 1})
     if not scene:
         raise HTTPException(status_code=400, detail="Turn's scene not found")
 
-    # Update status to processing
-    await db.turns.update_one(
-        {"id": turn_id},
-        {
-            "$set": {"status": "processing"},
-            "$push": {
-                "changes": {
-                    "by": submitted_by,
-                    "at": datetime.utcnow(),
-                    "type": "submitted"
-                }
-            }
-        }
-    )
+    # Move to processing (no-op for duplicate submissions)
+    submission_key = submission_key or uuid.uuid4().hex
+    turn, duplicate = await _claim_turn_for_submission(turn_id, submitted_by, submission_key, session_id)
+    if duplicate:
+        return duplicate
 
-    # Emit Socket.IO event
-    from .socketio_manager import emit_turn_processing
-    await emit_turn_processing(session_id, turn_id)
+    trace = turn_trace_service.start(turn_id, TraceContext.parse(turn["trace"]))
+    submit_span_id = new_span_id()
+    submit_error = None
 
-    # Assemble context bundle
     try:
-        context_service = ContextAssemblyService()
-        skill_service = SkillCheckService()
-
-        # Detect and roll skill checks
-        characters_data = await _fetch_turn_characters(turn)
-        skill_checks = skill_service.detect_skill_checks(
-            turn.get("actions", []),
-            characters_data
-        )
-        skill_results = await skill_service.roll_skill_checks(
-            skill_checks,
-            characters_data
-        )
+        # Notify the session (Socket.IO)
+        await event_bus.publish("turn_processing", session_id, {"turn": turn})
+
+        # Assemble context bundle
+        try:
+            context_service = ContextAssemblyService()
+            skill_service = SkillCheckService()
+
+            # Detect and roll skill checks
+            with trace.span("skill_checks", parent_span_id=submit_span_id) as attributes:
+                characters_data = await _fetch_turn_characters(turn)
+                skill_checks = skill_service.detect_skill_checks(
+                    turn.get("actions", []),
+                    characters_data
+                )
+                skill_results = await skill_service.roll_skill_checks(
+                    skill_checks,
+                    characters_data
+                )
+                attributes["checks"] = len(skill_results)
 
-        # Build callback URL - must match the actual endpoint path
-        callback_url = f"{BACKEND_BASE_URL}/api/v1/turns/internal/{turn_id}/complete"
+            # Build callback URL - must match the actual endpoint path
+            callback_url = f"{BACKEND_BASE_URL}/api/v1/turns/internal/{turn_id}/complete"
 
-        # Assemble full context
-        context_bundle = await context_service.assemble_context(
-            turn_id=turn_id,
-            callback_url=callback_url,
-            skill_checks=skill_results
-        )
+            # Assemble full context
+            with trace.span("assemble_context", parent_span_id=submit_span_id):
+                context_bundle = await context_service.assemble_context(
+                    turn_id=turn_id,
+                    callback_url=callback_url,
+                    skill_checks=[SkillCheckContext(**result.dict()) for result in skill_results],
+                    idempotency_key=submission_key,
+                    session_id=session_id,
+                    trace=trace.context
+                )
 
-        # Call n8n webhook (fire-and-forget)
-        await _call_n8n_async(context_bundle)
+            # Queue for dispatch to n8n (workers retry; reaper fails stuck turns)
+            with trace.span("enqueue", parent_span_id=submit_span_id) as attributes:
+                job = await turn_dispatch_service.enqueue_turn(
+                    turn_id, session_id, context_bundle, submission_key
+                )
+                attributes["job_id"] = job.get("id")
 
-        logger.info(f"Turn {turn_id} submitted for async processing")
+            logger.info(f"Turn {turn_id} queued for async processing")
 
-    except Exception as e:
-        logger.error(f"Error assembling context for turn {turn_id}: {e}")
-        # Mark turn as failed
-        await db.turns.update_one(
-            {"id": turn_id},
-            {"$set": {"status": "failed", "error": str(e)}}
+        except Exception as e:
+            logger.error(f"Error assembling context for turn {turn_id}: {e}")
+            submit_error = str(e)
+            # Mark turn as failed (only if it still belongs to this submission)
+            result = await db.turns.update_one(
+                {"id": turn_id, "status": "processing", "submission_key": submission_key},
+                {"$set": {"status": "failed", "error": str(e)}}
+            )
+            if result.modified_count:
+                record_turn_transition("processing", "failed")
+                trace.end_turn(turn["processing_started_at"], "failed", submit_error)
+            raise HTTPException(status_code=500, detail=f"Failed to process turn: {str(e)}")
+    finally:
+        trace.add_span(
+            "submit", turn["processing_started_at"], datetime.utcnow(),
+            span_id=submit_span_id,
+            status="error" if submit_error else "ok",
+            error=submit_error
         )
-        raise HTTPException(status_code=500, detail=f"Failed to process turn: {str(e)}")
+        await trace.flush()
 
     # Return immediately with 202 Accepted
     return {
@@ -387,76 +542,59 @@ async def _fetch_turn_characters(turn: dict):
     return characters
 
 
-async def _call_n8n_async(context_bundle: ContextBundle):
-    """Fire-and-forget call to n8n webhook."""
-    try:
-        async with httpx.AsyncClient(timeout=5.0) as client:
-            # Use model_dump with mode='json' to serialize datetime objects
-            await client.post(
-                N8N_DUNGEONMASTER_V2_WEBHOOK,
-                json=context_bundle.model_dump(mode='json'),
-                headers={"Content-Type": "application/json"}
-            )
-    except Exception as e:
-        logger.error(f"Failed to call n8n webhook: {e}")
-        # Don't raise - n8n will retry via callback
-
-
 # ============== CALLBACK ENDPOINT ==============
 
 @router.post("/internal/{turn_id}/complete")
-async def complete_turn_callback(turn_id: str, payload: CallbackPayload):
+async def complete_turn_callback(
+    turn_id: str,
+    payload: CallbackPayload,
+    idempotency_key: Optional[str] = Header(None, alias="Idempotency-Key")
+):
     """
     Callback endpoint for n8n to deliver LLM results.
 
-    Called by n8n after narrative generation completes.
+    Called by n8n after narrative generation completes. Idempotent: only the
+    first callback for a processing turn is applied; retries, replays and
+    callbacks from an earlier submission return the current status unchanged.
     """
     db = get_gamerecords_db()
+    received_at = datetime.utcnow()
 
     logger.info(f"Received callback for turn {turn_id}, success={payload.success}")
 
-    # Get turn
-    turn = await db.turns.find_one({"id": turn_id})
-    if not turn:
-        raise HTTPException(status_code=404, detail="Turn not found")
-
-    # Validate turn is in processing state
-    if turn.get("status") != "processing":
-        logger.warning(f"Turn {turn_id} not in processing state (status={turn.get('status')})")
-        # Allow anyway, but log warning
-
-    # Get scene to find session_id
-    scene_id = turn.get("scene_id")
-    scene = await db.scenes.find_one({"id": scene_id})
-    session_id = None
-
-    # Find session_id from scene/chapter/campaign
-    if scene:
-        chapter_id = scene.get("chapter_id")
-        if chapter_id:
-            chapter = await db.chapters.find_one({"id": chapter_id})
-            if chapter:
-                campaign_id = chapter.get("campaign_id")
-                # Get session from campaign (simplified - in production, get active session)
-                sessions = await db.sessions.find({"campaign_id": campaign_id}).to_list(length=1)
-                if sessions:
-                    session_id = sessions[0].get("id")
+    # Only a processing turn of the matching submission can be completed
+    metadata = payload.metadata or {}
+    callback_key = payload.idempotency_key or idempotency_key or metadata.get("idempotency_key")
+    claim_filter = {"id": turn_id, "status": "processing"}
+    if callback_key:
+        claim_filter["submission_key"] = callback_key
 
     if not payload.success:
-        # Mark turn as failed
-        await db.turns.update_one(
-            {"id": turn_id},
+        turn = await db.turns.find_one_and_update(
+            claim_filter,
             {
                 "$set": {
                     "status": "failed",
                     "error": payload.error or "Unknown error from n8n"
                 }
-            }
+            },
+            projection=CALLBACK_PROJECTION
         )
-
-        if session_id:
-            from .socketio_manager import emit_turn_failed
-            await emit_turn_failed(session_id, turn_id, payload.error or "Processing failed")
+        if not turn:
+            return await _duplicate_callback_response(turn_id)
+        record_turn_transition("processing", "failed")
+        trace, callback_span_id = await _start_callback_trace(turn_id, turn, metadata, received_at)
+
+        session_id = turn.get("session_id") or metadata.get("session_id") or await _find_session_id(turn)
+        with trace.span("emit", parent_span_id=callback_span_id, event="turn_failed"):
+            await event_bus.publish("turn_failed", session_id, {
+                "turn_id": turn_id,
+                "error": payload.error or "Processing failed"
+            })
+
+        trace.add_span("callback", received_at, datetime.utcnow(), span_id=callback_span_id, success=False)
+        trace.end_turn(turn.get("processing_started_at"), "failed", payload.error)
+        await trace.flush()
 
         return {"status": "failed", "turn_id": turn_id}
 
@@ -468,77 +606,86 @@ async def complete_turn_callback(turn_id: str, payload: CallbackPayload):
 
     # Write reaction to turn
     reaction = Reaction(description=narrative, summary=summary)
+    completion = {
+        "reaction": reaction.dict(),
+        "status": "completed"
+    }
+    change = {
+        "by": "DungeonMasterAI",
+        "at": datetime.utcnow(),
+        "type": "reaction_added"
+    }
 
-    await db.turns.update_one(
-        {"id": turn_id},
-        {
-            "$set": {
-                "reaction": reaction.dict(),
-                "status": "completed"
-            },
-            "$push": {
-                "changes": {
-                    "by": "DungeonMasterAI",
-                    "at": datetime.utcnow(),
-                    "type": "reaction_added"
-                }
-            }
-        }
+    # The whole turn (as before the update) goes out with turn_completed
+    turn = await db.turns.find_one_and_update(
+        claim_filter,
+        {"$set": completion, "$push": {"changes": change}}
     )
+    if not turn:
+        return await _duplicate_callback_response(turn_id)
+    turn = {**turn, **completion, "changes": turn.get("changes", []) + [change]}
+    record_turn_transition("processing", "completed")
+    trace, callback_span_id = await _start_callback_trace(turn_id, turn, metadata, received_at)
+
+    # session_id is stored on the turn at submission; older turns fall back to a lookup
+    session_id = turn.get("session_id") or metadata.get("session_id") or await _find_session_id(turn)
 
     # Process transition if present
+    scene_id = turn.get("scene_id")
+    scene = await db.scenes.find_one({"id": scene_id}, {"_id": 0, "id": 1, "chapter_id": 1})
     new_scene_id = scene_id
     new_chapter_id = scene.get("chapter_id") if scene else None
 
     if transition_data and transition_data.get("type") != "none":
         try:
-            transition_service = TransitionService()
-            transition_info = transition_service.parse_transition_from_llm({"transition": transition_data})
-
-            if scene and scene.get("chapter_id"):
-                chapter = await db.chapters.find_one({"id": scene["chapter_id"]})
-                campaign_id = chapter.get("campaign_id") if chapter else None
-
-                transition_result = await transition_service.process_transition(
-                    transition_info=transition_info,
-                    turn_id=turn_id,
-                    current_scene_id=scene_id,
-                    current_chapter_id=scene["chapter_id"],
-                    campaign_id=campaign_id,
-                    created_by="DungeonMasterAI"
-                )
+            with trace.span("transition", parent_span_id=callback_span_id, type=transition_data.get("type")):
+                transition_service = TransitionService()
+                transition_info = transition_service.parse_transition_from_llm({"transition": transition_data})
+
+                if scene and scene.get("chapter_id"):
+                    chapter = await db.chapters.find_one({"id": scene["chapter_id"]})
+                    campaign_id = chapter.get("campaign_id") if chapter else None
+
+                    transition_result = await transition_service.process_transition(
+                        transition_info=transition_info,
+                        turn_id=turn_id,
+                        current_scene_id=scene_id,
+                        current_chapter_id=scene["chapter_id"],
+                        campaign_id=campaign_id,
+                        created_by="DungeonMasterAI",
+                        session_id=session_id
+                    )
 
-                if transition_result.transition_occurred:
-                    new_scene_id = transition_result.new_scene_id or scene_id
-                    new_chapter_id = transition_result.new_chapter_id or scene.get("chapter_id")
+                    if transition_result.transition_occurred:
+                        new_scene_id = transition_result.new_scene_id or scene_id
+                        new_chapter_id = transition_result.new_chapter_id or scene.get("chapter_id")
 
-                    # Emit transition events
-                    if session_id:
+                        # Publish transition events
                         if transition_result.transition_type == "scene":
-                            from .socketio_manager import emit_scene_created
-                            await emit_scene_created(session_id, {
+                            await event_bus.publish("scene_created", session_id, {
                                 "scene_id": new_scene_id,
                                 "name": transition_result.scene_name,
                                 "chapter_id": new_chapter_id
                             })
                         elif transition_result.transition_type == "chapter":
-                            from .socketio_manager import emit_chapter_created
-                            await emit_chapter_created(session_id, {
+                            await event_bus.publish("chapter_created", session_id, {
                                 "chapter_id": new_chapter_id,
-                                "name": transition_result.chapter_name
-                            }, {
+                                "name": transition_result.chapter_name,
                                 "scene_id": new_scene_id,
-                                "name": transition_result.scene_name
+                                "scene_name": transition_result.scene_name
                             })
 
         except Exception as e:
             logger.error(f"Error processing transition for turn {turn_id}: {e}")
             # Continue anyway - narrative was saved
 
-    # Emit completion event
-    if session_id:
-        from .socketio_manager import emit_turn_completed
-        await emit_turn_completed(session_id, turn_id, reaction.dict(), new_scene_id)
+    # Publish completion event
+    with trace.span("emit", parent_span_id=callback_span_id, event="turn_completed"):
+        await event_bus.publish("turn_completed", session_id, {"turn": turn, "scene_id": new_scene_id})
+
+    trace.add_span("callback", received_at, datetime.utcnow(), span_id=callback_span_id, success=True)
+    trace.end_turn(turn.get("processing_started_at"), "completed")
+    await trace.flush()
 
     logger.info(f"Turn {turn_id} completed successfully")
 
@@ -550,6 +697,73 @@ async def complete_turn_callback(turn_id: str, payload: CallbackPayload):
     }
 
 
+async def _start_callback_trace(turn_id: str, turn: dict, metadata: dict, received_at: datetime):
+    """
+    Continue a turn's trace in its callback.
+
+    Records the n8n span (last successful dispatch -> callback received) and
+    any spans the workflow reported in metadata.spans.
+
+    Returns (trace, callback_span_id).
+    """
+    context = TraceContext.parse(turn.get("trace")) or TraceContext.parse(metadata.get("trace"))
+    trace = turn_trace_service.start(turn_id, context)
+    callback_span_id = new_span_id()
+    if context is None:
+        return trace, callback_span_id
+
+    try:
+        dispatch = await turn_trace_service.last_span(context.trace_id, "dispatch")
+    except Exception as e:
+        logger.warning(f"Failed to load dispatch span of turn {turn_id}: {e}")
+        dispatch = None
+    if dispatch and dispatch.get("status") == "ok":
+        n8n_span = trace.add_span("n8n", dispatch["end"], received_at)
+        trace.add_reported_spans(metadata.get("spans"), n8n_span["span_id"])
+
+    return trace, callback_span_id
+
+
+async def _find_session_id(turn: dict) -> Optional[str]:
+    """
+    Find the session of a turn submitted before session_id was stored on turns.
+
+    Walks scene -> chapter and picks the campaign's latest (active) session.
+    """
+    db = get_gamerecords_db()
+
+    scene = await db.scenes.find_one({"id": turn.get("scene_id")}, {"chapter_id": 1})
+    if not scene or not scene.get("chapter_id"):
+        return None
+
+    chapter = await db.chapters.find_one({"id": scene["chapter_id"]}, {"campaign_id": 1})
+    if not chapter:
+        return None
+
+    session = await db.sessions.find_one(
+        {"campaign_id": chapter.get("campaign_id")},
+        {"id": 1},
+        sort=[("session_number", -1)]
+    )
+    return session.get("id") if session else None
+
+
+async def _duplicate_callback_response(turn_id: str) -> dict:
+    """Response for a callback that was already applied or is stale."""
+    db = get_gamerecords_db()
+    turn = await db.turns.find_one({"id": turn_id}, {"status": 1})
+    if not turn:
+        raise HTTPException(status_code=404, detail="Turn not found")
+    status = turn.get("status")
+
+    logger.info(f"Ignoring duplicate callback for turn {turn_id} (status={status})")
+    return {
+        "status": status,
+        "turn_id": turn_id,
+        "duplicate": True
+    }
+
+
 # ============== STATUS ENDPOINT ==============
 
 @router.get("/{turn_id}/status")
@@ -569,6 +783,29 @@ async def get_turn_status(turn_id: str):
     }
 
 
+# ============== TRACE ENDPOINT ==============
+
+@router.get("/{turn_id}/trace")
+async def get_turn_trace(turn_id: str, trace_id: Optional[str] = Query(None)):
+    """
+    Get the latency waterfall of a turn's processing.
+
+    Spans cover submit, queueing, dispatch to n8n, the time n8n took and the
+    callback (transition and emits). Defaults to the latest submission;
+    pass trace_id for an earlier one.
+    """
+    db = get_gamerecords_db()
+
+    turn = await db.turns.find_one({"id": turn_id}, {"id": 1, "status": 1, "trace": 1})
+    if not turn:
+        raise HTTPException(status_code=404, detail="Turn not found")
+
+    waterfall = await turn_trace_service.get_waterfall(turn, trace_id)
+    if not waterfall["trace_id"]:
+        raise HTTPException(status_code=404, detail="Turn has no trace")
+    return waterfall
+
+
 # ============== LEGACY ENDPOINTS ==============
 
 @router.patch("/{turn_id}/reaction")
@@ -578,7 +815,7 @@ async def add_reaction(turn_id: str, description: str, summary: Optional[str] =
 
     reaction = Reaction(description=description, summary=summary)
 
-    result = await db.turns.update_one(
+    turn = await db.turns.find_one_and_update(
         {"id": turn_id},
         {
             "$set": {
@@ -592,12 +829,15 @@ async def add_reaction(turn_id: str, description: str, summary: Optional[str] =
                     "type": "reaction_added"
                 }
             }
-        }
+        },
+        return_document=ReturnDocument.AFTER
     )
 
-    if result.modified_count == 0:
+    if not turn:
         raise HTTPException(status_code=404, detail="Turn not found")
 
+    await event_bus.publish("turn_completed", turn.get("session_id"), {"turn": turn})
+
     return {"message": "Reaction added successfully"}
 
 
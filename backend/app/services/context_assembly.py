@@ -14,6 +14,7 @@ from pydantic import BaseModel, Field
 from datetime import datetime
 
 from ..database import get_gamerecords_db
+from .tracing import TraceContext
 
 logger = logging.getLogger(__name__)
 
@@ -154,7 +155,10 @@ class ContextBundle(BaseModel):
     Matches the schema expected by DungeonMaster_Main workflow.
     """
     turn_id: str
+    session_id: Optional[str] = None  # Socket.IO room notified on completion
     callback_url: str
+    idempotency_key: Optional[str] = None  # Echoed back by n8n in the callback
+    trace: Optional[TraceContext] = None  # Echoed back by n8n in the callback metadata
     timestamp: datetime = Field(default_factory=datetime.utcnow)
     context: ContextData
     actions: List[Dict[str, Any]] = Field(default_factory=list)  # Top-level for n8n workflow
@@ -175,7 +179,10 @@ class ContextAssemblyService:
         self,
         turn_id: str,
         callback_url: str,
-        skill_checks: Optional[List[SkillCheckContext]] = None
+        skill_checks: Optional[List[SkillCheckContext]] = None,
+        idempotency_key: Optional[str] = None,
+        session_id: Optional[str] = None,
+        trace: Optional[TraceContext] = None
     ) -> ContextBundle:
         """
         Assemble complete context bundle for a turn.
@@ -184,6 +191,9 @@ class ContextAssemblyService:
             turn_id: ID of the turn being processed
             callback_url: Backend callback URL for n8n
             skill_checks: Pre-rolled skill check results (optional)
+            idempotency_key: Submission key n8n must echo in its callback
+            session_id: Session to notify when the turn completes
+            trace: Trace context of the submission
 
         Returns:
             Complete ContextBundle ready for n8n
@@ -256,7 +266,10 @@ class ContextAssemblyService:
 
         bundle = ContextBundle(
             turn_id=turn_id,
+            session_id=session_id,
             callback_url=callback_url,
+            idempotency_key=idempotency_key,
+            trace=trace,
             context=context_data,
             actions=turn_actions  # Top-level for n8n workflow compatibility
         )
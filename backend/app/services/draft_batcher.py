@@ -0,0 +1,187 @@
+"""
+Coalescing of action draft edits.
+
+While players draft their actions the frontend saves on almost every
+keystroke and relays each save and ready toggle over Socket.IO. Instead of
+one room emit per save, broadcasts are collected per session for
+ACTION_DRAFT_BATCH_WINDOW_MS and then flushed together: relayed drafts, ready
+states and the field deltas of PATCH /action-drafts/{id} are sent to the
+session room as one action_drafts_batch event, keeping the last update per
+draft and per character; consecutive deltas of a draft are merged.
+
+Saves themselves are written to MongoDB when they arrive, so every worker
+reads the same drafts and a crash loses nothing that was acknowledged.
+
+action_drafts_batch payload:
+{
+    "session_id": str,
+    "drafts": [ActionDraft, ...],
+    "ready_states": [{"player_id", "character_id", "ready"}, ...],
+    "deltas": [{"draft_id", "base_version", "version", "changes"}, ...],
+    "sources": {draft_id or character_id: sid}   # who sent each entry
+}
+
+Clients skip entries whose source is their own sid, so a batch never
+overwrites newer local edits. A delta turns version base_version - 1 of a
+draft into version `version`; clients already at `version` skip it and
+clients older than base_version - 1 reload the draft.
+
+On shutdown flush_all() sends whatever is left.
+"""
+import asyncio
+import logging
+from typing import Any, Dict, List, Optional
+
+from .. import metrics
+from ..config import ACTION_DRAFT_BATCH_WINDOW_MS
+
+logger = logging.getLogger(__name__)
+
+
+class _SessionBatch:
+    """Updates of one session waiting for the next flush."""
+
+    def __init__(self):
+        self.drafts: Dict[str, Dict[str, Any]] = {}
+        self.ready_states: Dict[str, Dict[str, Any]] = {}
+        self.deltas: Dict[str, Dict[str, Any]] = {}
+        self.sources: Dict[str, str] = {}
+        self.task: Optional[asyncio.Task] = None
+
+
+class ActionDraftBatcher:
+    """Batches action draft broadcasts per session."""
+
+    def __init__(self, window_ms: float = ACTION_DRAFT_BATCH_WINDOW_MS):
+        """
+        Initialize the batcher.
+
+        Args:
+            window_ms: How long updates of a session are collected before a flush
+        """
+        self.window = window_ms / 1000
+        self.batches: Dict[str, _SessionBatch] = {}
+
+    def _batch(self, session_id: str) -> _SessionBatch:
+        """Batch of a session, scheduling its flush on first use."""
+        batch = self.batches.get(session_id)
+        if batch is None:
+            batch = self.batches[session_id] = _SessionBatch()
+        if batch.task is None:
+            batch.task = asyncio.create_task(self._flush_later(session_id))
+        return batch
+
+    async def _flush_later(self, session_id: str):
+        await asyncio.sleep(self.window)
+        await self.flush(session_id)
+
+    def queue_draft(self, session_id: str, draft: Dict[str, Any], sid: Optional[str] = None):
+        """
+        Broadcast a draft with the session's next flush.
+
+        Args:
+            session_id: Session room to broadcast to
+            draft: Full draft; replaces an earlier pending version
+            sid: Client that sent the update
+        """
+        draft_id = draft.get('id')
+        if not draft_id:
+            return
+        metrics.ACTION_DRAFT_UPDATES_QUEUED.labels("draft").inc()
+        batch = self._batch(session_id)
+        batch.drafts[draft_id] = draft
+        if sid:
+            batch.sources[draft_id] = sid
+
+    def queue_ready_state(self, session_id: str, ready_state: Dict[str, Any], sid: Optional[str] = None):
+        """
+        Broadcast a ready state with the session's next flush.
+
+        Args:
+            session_id: Session room to broadcast to
+            ready_state: {player_id, character_id, ready}; last one per character wins
+            sid: Client that sent the update
+        """
+        character_id = ready_state.get('character_id')
+        if not character_id:
+            return
+        metrics.ACTION_DRAFT_UPDATES_QUEUED.labels("ready_state").inc()
+        batch = self._batch(session_id)
+        batch.ready_states[character_id] = ready_state
+        if sid:
+            batch.sources[character_id] = sid
+
+    def queue_delta(self, session_id: str, draft_id: str, version: int, changes: Dict[str, Any]):
+        """
+        Broadcast changed fields of a draft with the session's next flush.
+
+        Args:
+            session_id: Session room to broadcast to
+            draft_id: Changed draft
+            version: Draft version after the change
+            changes: Changed fields; merged into an earlier pending delta
+        """
+        metrics.ACTION_DRAFT_UPDATES_QUEUED.labels("delta").inc()
+        batch = self._batch(session_id)
+        delta = batch.deltas.get(draft_id)
+        if delta is None:
+            batch.deltas[draft_id] = {
+                'draft_id': draft_id,
+                'base_version': version,
+                'version': version,
+                'changes': dict(changes)
+            }
+            return
+        delta['changes'].update(changes)
+        delta['base_version'] = min(delta['base_version'], version)
+        delta['version'] = max(delta['version'], version)
+
+    def discard_draft(self, session_id: str, draft_id: str):
+        """Drop pending updates of a deleted draft so it is not broadcast again."""
+        batch = self.batches.get(session_id)
+        if batch:
+            batch.drafts.pop(draft_id, None)
+            batch.deltas.pop(draft_id, None)
+
+    def discard_session(self, session_id: str):
+        """Drop all pending updates of a session (drafts cleared after a turn)."""
+        batch = self.batches.pop(session_id, None)
+        if batch is None:
+            return
+        if batch.task and batch.task is not asyncio.current_task():
+            batch.task.cancel()
+
+    async def flush(self, session_id: str):
+        """Broadcast everything pending for a session."""
+        batch = self.batches.pop(session_id, None)
+        if batch is None:
+            return
+
+        if batch.drafts or batch.ready_states or batch.deltas:
+            from ..socketio_manager import emit_action_drafts_batch
+            try:
+                await emit_action_drafts_batch(
+                    session_id,
+                    list(batch.drafts.values()),
+                    list(batch.ready_states.values()),
+                    list(batch.deltas.values()),
+                    batch.sources
+                )
+                metrics.ACTION_DRAFT_UPDATES_FLUSHED.labels("draft").inc(len(batch.drafts))
+                metrics.ACTION_DRAFT_UPDATES_FLUSHED.labels("ready_state").inc(len(batch.ready_states))
+                metrics.ACTION_DRAFT_UPDATES_FLUSHED.labels("delta").inc(len(batch.deltas))
+            except Exception as e:
+                logger.error(f"Failed to broadcast action drafts of session {session_id}: {e}")
+
+    async def flush_all(self):
+        """Flush every session now (shutdown)."""
+        session_ids: List[str] = list(self.batches)
+        for session_id in session_ids:
+            batch = self.batches.get(session_id)
+            if batch and batch.task and batch.task is not asyncio.current_task():
+                batch.task.cancel()
+            await self.flush(session_id)
+
+
+# Singleton instance
+action_draft_batcher = ActionDraftBatcher()
@@ -0,0 +1,78 @@
+"""
+In-process bus for domain events.
+
+REST routes and background services publish what changed (a turn moved to
+processing, a scene was created, the master changed) without knowing who
+listens. The Socket.IO layer subscribes and emits each event to the session
+room exactly once, with the full state in the payload, so clients neither
+relay state changes to each other nor re-query after a notification.
+
+Events (type: payload):
+- turn_processing:        {turn}            turn claimed for processing
+- turn_completed:         {turn}            Keeper reaction stored
+- turn_failed:            {turn_id, error}
+- scene_created:          {scene_id, name, chapter_id}
+- chapter_created:        {chapter_id, name, scene_id, scene_name}
+- scene_summary_ready:    {scene_id, summary}
+- chapter_summary_ready:  {chapter_id, summary}
+- master_transferred:     {session}         session with its new master
+
+Every event belongs to a session (None when the turn's session is unknown;
+subscribers then have nobody to notify). publish() awaits the subscribers in
+subscription order, so notifications are out before the request that caused
+them returns. A failing subscriber is logged and affects neither the
+publisher nor the other subscribers.
+"""
+import logging
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+from .. import metrics
+
+logger = logging.getLogger(__name__)
+
+Subscriber = Callable[[Optional[str], Dict[str, Any]], Awaitable[None]]
+
+
+class DomainEventBus:
+    """Delivers published domain events to their subscribers."""
+
+    def __init__(self):
+        """Initialize the event bus."""
+        self.subscribers: Dict[str, List[Subscriber]] = {}
+
+    def subscribe(self, event_type: str, subscriber: Subscriber):
+        """
+        Call a subscriber for every event of a type.
+
+        Args:
+            event_type: Event type, e.g. "turn_completed"
+            subscriber: async (session_id, payload) -> None
+        """
+        self.subscribers.setdefault(event_type, []).append(subscriber)
+
+    def on(self, event_type: str):
+        """Decorator form of subscribe()."""
+        def decorator(subscriber: Subscriber) -> Subscriber:
+            self.subscribe(event_type, subscriber)
+            return subscriber
+        return decorator
+
+    async def publish(self, event_type: str, session_id: Optional[str], payload: Dict[str, Any]):
+        """
+        Deliver an event to its subscribers.
+
+        Args:
+            event_type: Event type
+            session_id: Session the event belongs to (None if unknown)
+            payload: Event data (see module docstring)
+        """
+        metrics.DOMAIN_EVENTS_PUBLISHED.labels(event_type).inc()
+        for subscriber in self.subscribers.get(event_type, []):
+            try:
+                await subscriber(session_id, payload)
+            except Exception as e:
+                logger.error(f"Subscriber {subscriber.__name__} failed on {event_type} of session {session_id}: {e}")
+
+
+# Singleton instance
+event_bus = DomainEventBus()
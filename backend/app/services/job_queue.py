@@ -0,0 +1,234 @@
+"""
+MongoDB-backed job queue with leases.
+
+Jobs are documents in a dedicated collection. A worker claims a job by
+atomically moving it to "running" with a lease; if the worker dies, the lease
+expires and the job becomes claimable again. Failed jobs are retried with a
+delay until max_attempts is reached.
+
+Job document:
+{
+    "id": "job-xxxxxxxx",
+    "kind": "scene_summary",
+    "payload": {...},
+    "dedup_key": str | None,        # unique; duplicates return the existing job
+    "status": "pending" | "running" | "completed" | "failed" | "cancelled",
+    "attempts": 0,
+    "max_attempts": 3,
+    "available_at": datetime,       # not claimable before this
+    "lease_expires_at": datetime,   # while running
+    "worker_id": str,
+    "last_error": str,
+    "created_at": datetime,
+    "updated_at": datetime
+}
+"""
+import logging
+import uuid
+from datetime import datetime, timedelta
+from typing import Any, Dict, Optional
+
+from pymongo import ReturnDocument
+from pymongo.errors import DuplicateKeyError
+
+from ..database import get_gamerecords_db
+
+logger = logging.getLogger(__name__)
+
+
+class JobPostponed(Exception):
+    """Raised by a job handler when its job cannot run yet (see JobQueue.postpone)."""
+
+    def __init__(self, reason: str, delay_seconds: float = 5.0):
+        super().__init__(reason)
+        self.delay_seconds = delay_seconds
+
+
+class JobQueue:
+    """Lease-based job queue stored in a gamerecords collection."""
+
+    def __init__(
+        self,
+        collection_name: str,
+        lease_seconds: float = 60.0,
+        max_attempts: int = 3
+    ):
+        """
+        Args:
+            collection_name: Collection holding the jobs
+            lease_seconds: How long a claimed job stays invisible to other workers
+            max_attempts: Attempts before a job is marked failed
+        """
+        self.collection_name = collection_name
+        self.lease_seconds = lease_seconds
+        self.max_attempts = max_attempts
+
+    @property
+    def collection(self):
+        return get_gamerecords_db()[self.collection_name]
+
+    async def enqueue(
+        self,
+        kind: str,
+        payload: Dict[str, Any],
+        delay_seconds: float = 0.0,
+        dedup_key: Optional[str] = None
+    ) -> Dict[str, Any]:
+        """
+        Insert a new pending job and return it.
+
+        If dedup_key is given and a job with that key already exists, no new
+        job is created and the existing one is returned.
+        """
+        now = datetime.utcnow()
+        job = {
+            "id": f"job-{uuid.uuid4().hex[:8]}",
+            "kind": kind,
+            "payload": payload,
+            "dedup_key": dedup_key,
+            "status": "pending",
+            "attempts": 0,
+            "max_attempts": self.max_attempts,
+            "available_at": now + timedelta(seconds=delay_seconds),
+            "lease_expires_at": None,
+            "worker_id": None,
+            "last_error": None,
+            "created_at": now,
+            "updated_at": now
+        }
+        try:
+            await self.collection.insert_one(job)
+        except DuplicateKeyError:
+            logger.info(f"Duplicate {kind} job for key {dedup_key}, not enqueued")
+            return await self.collection.find_one({"dedup_key": dedup_key}, {"_id": 0})
+        job.pop("_id", None)
+        logger.info(f"Enqueued {kind} job {job['id']} in {self.collection_name}")
+        return job
+
+    async def claim(self, worker_id: str) -> Optional[Dict[str, Any]]:
+        """
+        Claim the oldest available job.
+
+        Picks pending jobs whose delay has passed, and running jobs whose
+        lease expired (their worker died or hung).
+        """
+        now = datetime.utcnow()
+        return await self.collection.find_one_and_update(
+            {
+                "$or": [
+                    {"status": "pending", "available_at": {"$lte": now}},
+                    {"status": "running", "lease_expires_at": {"$lt": now}}
+                ]
+            },
+            {
+                "$set": {
+                    "status": "running",
+                    "worker_id": worker_id,
+                    "lease_expires_at": now + timedelta(seconds=self.lease_seconds),
+                    "updated_at": now
+                },
+                "$inc": {"attempts": 1}
+            },
+            sort=[("available_at", 1), ("created_at", 1), ("_id", 1)],
+            return_document=ReturnDocument.AFTER
+        )
+
+    async def extend_lease(self, job_id: str, worker_id: str) -> bool:
+        """Extend the lease of a running job. Returns False if it was lost."""
+        now = datetime.utcnow()
+        result = await self.collection.update_one(
+            {"id": job_id, "status": "running", "worker_id": worker_id},
+            {
+                "$set": {
+                    "lease_expires_at": now + timedelta(seconds=self.lease_seconds),
+                    "updated_at": now
+                }
+            }
+        )
+        return result.modified_count == 1
+
+    async def complete(self, job_id: str, result: Optional[Dict[str, Any]] = None):
+        """Mark a job as completed."""
+        await self.collection.update_one(
+            {"id": job_id},
+            {
+                "$set": {
+                    "status": "completed",
+                    "result": result,
+                    "lease_expires_at": None,
+                    "updated_at": datetime.utcnow()
+                }
+            }
+        )
+
+    async def cancel(self, query: Dict[str, Any]) -> int:
+        """Cancel pending jobs matching query. Returns the number cancelled."""
+        result = await self.collection.update_many(
+            {**query, "status": "pending"},
+            {"$set": {"status": "cancelled", "updated_at": datetime.utcnow()}}
+        )
+        return result.modified_count
+
+    async def postpone(self, job: Dict[str, Any], delay_seconds: float, reason: str = ""):
+        """
+        Put a claimed job back until later without using up an attempt.
+
+        For jobs that wait on other jobs, not for failures.
+        """
+        now = datetime.utcnow()
+        await self.collection.update_one(
+            {"id": job["id"]},
+            {
+                "$set": {
+                    "status": "pending",
+                    "available_at": now + timedelta(seconds=delay_seconds),
+                    "lease_expires_at": None,
+                    "updated_at": now
+                },
+                "$inc": {"attempts": -1}
+            }
+        )
+        logger.info(f"Job {job['id']} ({job.get('kind')}) postponed {delay_seconds}s: {reason}")
+
+    async def fail(
+        self,
+        job: Dict[str, Any],
+        error: str,
+        retry_delay_seconds: float = 5.0,
+        permanent: bool = False
+    ) -> bool:
+        """
+        Record a failed attempt.
+
+        Reschedules the job after retry_delay_seconds, or marks it failed once
+        max_attempts is reached (or immediately if permanent).
+        Returns True if the job will be retried.
+        """
+        now = datetime.utcnow()
+        retry = (
+            not permanent
+            and job.get("attempts", 0) < job.get("max_attempts", self.max_attempts)
+        )
+
+        update = {
+            "last_error": error,
+            "lease_expires_at": None,
+            "updated_at": now
+        }
+        if retry:
+            update["status"] = "pending"
+            update["available_at"] = now + timedelta(seconds=retry_delay_seconds)
+        else:
+            update["status"] = "failed"
+
+        await self.collection.update_one({"id": job["id"]}, {"$set": update})
+
+        if retry:
+            logger.warning(
+                f"Job {job['id']} ({job.get('kind')}) failed attempt "
+                f"{job.get('attempts')}, retrying in {retry_delay_seconds}s: {error}"
+            )
+        else:
+            logger.error(f"Job {job['id']} ({job.get('kind')}) failed permanently: {error}")
+
+        return retry
@@ -0,0 +1,196 @@
+"""
+Incremental JSON object parser for streamed LLM output.
+
+Parses a single top-level JSON object as it arrives in chunks and reports each
+top-level field as soon as its value is complete. Tolerant of the usual LLM
+noise: text or Markdown fences before the object, truncated output (the last
+unfinished string value can still be recovered) and trailing garbage.
+"""
+import json
+from typing import Any, Dict, List, Optional, Tuple
+
+
+# Parser states
+_SEEK_OBJECT = "seek_object"
+_SEEK_KEY = "seek_key"
+_IN_KEY = "in_key"
+_SEEK_COLON = "seek_colon"
+_SEEK_VALUE = "seek_value"
+_IN_STRING = "in_string"
+_IN_NESTED = "in_nested"
+_IN_SCALAR = "in_scalar"
+_DONE = "done"
+
+
+def _decode_string(raw: str) -> str:
+    """Decode the raw (still escaped) body of a JSON string."""
+    try:
+        return json.loads(f'"{raw}"')
+    except json.JSONDecodeError:
+        # Drop a dangling escape from truncated output and retry
+        trimmed = raw.rstrip("\\")
+        try:
+            return json.loads(f'"{trimmed}"')
+        except json.JSONDecodeError:
+            return trimmed
+
+
+def _decode_scalar(raw: str) -> Any:
+    """Decode a number/true/false/null, falling back to the raw text."""
+    try:
+        return json.loads(raw)
+    except json.JSONDecodeError:
+        return raw
+
+
+class StreamingJSONObjectParser:
+    """
+    Feed chunks of a JSON object, get back completed top-level fields.
+
+    Example:
+        parser = StreamingJSONObjectParser()
+        for chunk in chunks:
+            for key, value in parser.feed(chunk):
+                ...
+        fields = parser.finish()
+    """
+
+    def __init__(self):
+        self.fields: Dict[str, Any] = {}
+        self._state = _SEEK_OBJECT
+        self._key = ""
+        self._buffer: List[str] = []
+        self._escape = False
+        self._depth = 0
+        self._nested_in_string = False
+
+    @property
+    def done(self) -> bool:
+        """True once the closing brace of the top-level object was seen."""
+        return self._state == _DONE
+
+    def feed(self, chunk: str) -> List[Tuple[str, Any]]:
+        """
+        Consume a chunk of text.
+
+        Returns the (key, value) pairs completed by this chunk, in order.
+        """
+        completed: List[Tuple[str, Any]] = []
+
+        for char in chunk:
+            state = self._state
+
+            if state == _DONE:
+                break
+
+            if state == _SEEK_OBJECT:
+                if char == "{":
+                    self._state = _SEEK_KEY
+
+            elif state == _SEEK_KEY:
+                if char == '"':
+                    self._buffer = []
+                    self._escape = False
+                    self._state = _IN_KEY
+                elif char == "}":
+                    self._state = _DONE
+
+            elif state == _IN_KEY:
+                if self._escape:
+                    self._buffer.append(char)
+                    self._escape = False
+                elif char == "\\":
+                    self._buffer.append(char)
+                    self._escape = True
+                elif char == '"':
+                    self._key = _decode_string("".join(self._buffer))
+                    self._state = _SEEK_COLON
+                else:
+                    self._buffer.append(char)
+
+            elif state == _SEEK_COLON:
+                if char == ":":
+                    self._state = _SEEK_VALUE
+
+            elif state == _SEEK_VALUE:
+                if char.isspace():
+                    continue
+                self._buffer = []
+                self._escape = False
+                if char == '"':
+                    self._state = _IN_STRING
+                elif char in "{[":
+                    self._buffer.append(char)
+                    self._depth = 1
+                    self._nested_in_string = False
+                    self._state = _IN_NESTED
+                else:
+                    self._buffer.append(char)
+                    self._state = _IN_SCALAR
+
+            elif state == _IN_STRING:
+                if self._escape:
+                    self._buffer.append(char)
+                    self._escape = False
+                elif char == "\\":
+                    self._buffer.append(char)
+                    self._escape = True
+                elif char == '"':
+                    completed.append(self._complete(_decode_string("".join(self._buffer))))
+                else:
+                    self._buffer.append(char)
+
+            elif state == _IN_NESTED:
+                self._buffer.append(char)
+                if self._nested_in_string:
+                    if self._escape:
+                        self._escape = False
+                    elif char == "\\":
+                        self._escape = True
+                    elif char == '"':
+                        self._nested_in_string = False
+                elif char == '"':
+                    self._nested_in_string = True
+                elif char in "{[":
+                    self._depth += 1
+                elif char in "}]":
+                    self._depth -= 1
+                    if self._depth == 0:
+                        completed.append(self._complete(_decode_scalar("".join(self._buffer))))
+
+            elif state == _IN_SCALAR:
+                if char in ",}" or char.isspace():
+                    completed.append(self._complete(_decode_scalar("".join(self._buffer))))
+                    if char == "}":
+                        self._state = _DONE
+                else:
+                    self._buffer.append(char)
+
+        return completed
+
+    def partial(self) -> Optional[Tuple[str, Any]]:
+        """Return the field currently being streamed, if it is a string value."""
+        if self._state == _IN_STRING:
+            return self._key, _decode_string("".join(self._buffer))
+        return None
+
+    def finish(self) -> Dict[str, Any]:
+        """
+        Finalize parsing and return all recovered fields.
+
+        A string value cut off by the end of the stream is kept as-is.
+        """
+        if self._state == _IN_SCALAR and self._buffer:
+            self._complete(_decode_scalar("".join(self._buffer)))
+        else:
+            pending = self.partial()
+            if pending:
+                self.fields[pending[0]] = pending[1]
+        return self.fields
+
+    def _complete(self, value: Any) -> Tuple[str, Any]:
+        """Store a completed field and go back to looking for the next key."""
+        self.fields[self._key] = value
+        self._buffer = []
+        self._state = _SEEK_KEY
+        return self._key, value
@@ -5,21 +5,71 @@ Used for:
 - Scene summarization (M4)
 - Chapter summarization (M5)
 - Campaign milestone generation (M2)
+- AI character action generation
 
 This bypasses n8n for simpler, synchronous LLM calls.
+
+Prompts are laid out as a stable prefix followed by a variable suffix so that
+Ollama can reuse the KV cache of the prefix between calls: shared instructions
+first, then per-character data, then the per-turn scene and actions.
 """
+import json
 import logging
 import httpx
-from typing import Optional, List, Dict, Any
+from typing import Optional, List, Dict, Any, AsyncIterator
 from pydantic import BaseModel
 
+from ..config import (
+    OLLAMA_BASE_URL,
+    OLLAMA_MODEL,
+    OLLAMA_KEEP_ALIVE,
+    AI_ACTION_STRUCTURED_OUTPUT
+)
+from .json_stream import StreamingJSONObjectParser
+from ..metrics import track_upstream
+
 logger = logging.getLogger(__name__)
 
 # Ollama configuration
-OLLAMA_URL = "http://host.docker.internal:11434/api/chat"
-OLLAMA_MODEL = "gpt-oss:20b"
+OLLAMA_URL = f"{OLLAMA_BASE_URL}/api/chat"
 OLLAMA_TIMEOUT = 120.0  # seconds
 
+# Fields of a character action, in the order the UI fills them.
+# The LLM answers with "demeanor", which the frontend calls "appearance".
+ACTION_FIELDS = ["speak", "act", "appearance", "emotion", "ooc"]
+
+
+# Shared instructions for every AI character. Must not contain any
+# character- or turn-specific data, otherwise the cached prefix is lost.
+CHARACTER_ACTION_SYSTEM_PROMPT = """You are roleplaying as an AI-controlled character in a Call of Cthulhu RPG.
+Your character is described in the CHARACTER PROFILE at the end of these instructions.
+
+BEHAVIOR GUIDELINES:
+- Act according to your character's personality type
+- Use your skills and occupation to inform your actions
+- Respond naturally to what other characters are doing
+- Stay in character - you are not the Keeper/narrator
+- Be concise and focused on your character's immediate actions
+- Show emotion and personality through dialogue and actions
+
+RESPONSE FORMAT:
+Return ONLY a JSON object with these fields (all optional):
+{
+  "speak": "What your character says (dialogue)",
+  "act": "What your character does (physical action)",
+  "demeanor": "Observable body language/state - what others SEE (e.g., 'tense shoulders', 'nervous glance', 'forced smile', 'trembling hands'). NOT physical description like age or clothing.",
+  "emotion": "Your character's internal emotional state",
+  "ooc": "Out-of-character notes (rarely needed)"
+}
+
+Example response:
+{
+  "speak": "We should examine that bookshelf more closely.",
+  "act": "cautiously approaches the dusty shelves, flashlight in hand",
+  "demeanor": "squinting at the shadows, jaw set with determination",
+  "emotion": "curious but wary"
+}"""
+
 
 class LLMService:
     """Direct LLM service for backend operations."""
@@ -28,48 +78,147 @@ class LLMService:
         self.url = OLLAMA_URL
         self.model = OLLAMA_MODEL
         self.timeout = OLLAMA_TIMEOUT
+        self.keep_alive = OLLAMA_KEEP_ALIVE
+        self.structured_output = AI_ACTION_STRUCTURED_OUTPUT
 
-    async def _call_llm(
+    async def _chat(
         self,
-        system_prompt: str,
-        user_prompt: str,
+        messages: List[Dict[str, str]],
         temperature: float = 0.3,
         max_tokens: int = 500
-    ) -> Optional[str]:
+    ) -> Optional[Dict[str, Any]]:
         """
-        Make a direct call to Ollama LLM.
-        
-        Returns the LLM response text, or None if call fails.
+        Make a direct call to the Ollama chat API.
+
+        Returns the raw response body (including prompt_eval_count and
+        prompt_eval_duration timings), or None if the call fails.
         """
         try:
-            async with httpx.AsyncClient(timeout=self.timeout) as client:
-                response = await client.post(
-                    self.url,
-                    json={
-                        "model": self.model,
-                        "messages": [
-                            {"role": "system", "content": system_prompt},
-                            {"role": "user", "content": user_prompt}
-                        ],
-                        "stream": False,
-                        "options": {
-                            "temperature": temperature,
-                            "num_predict": max_tokens
+            with track_upstream("ollama", "chat") as call:
+                async with httpx.AsyncClient(timeout=self.timeout) as client:
+                    response = await client.post(
+                        self.url,
+                        json={
+                            "model": self.model,
+                            "messages": messages,
+                            "stream": False,
+                            "keep_alive": self.keep_alive,
+                            "options": {
+                                "temperature": temperature,
+                                "num_predict": max_tokens
+                            }
                         }
-                    }
-                )
-                
+                    )
+                call.status = response.status_code
+
                 if response.status_code == 200:
-                    data = response.json()
-                    return data.get("message", {}).get("content", "")
+                    return response.json()
                 else:
                     logger.error(f"LLM call failed: {response.status_code} - {response.text}")
                     return None
-                    
+
         except Exception as e:
             logger.error(f"LLM call exception: {e}")
             return None
 
+    async def _chat_stream(
+        self,
+        messages: List[Dict[str, str]],
+        temperature: float = 0.3,
+        max_tokens: int = 500,
+        response_format: Optional[str] = None
+    ) -> AsyncIterator[str]:
+        """
+        Stream a chat completion from Ollama.
+
+        Yields content chunks as they arrive. Errors are logged and end the
+        stream early, so callers must cope with incomplete output.
+        """
+        payload = {
+            "model": self.model,
+            "messages": messages,
+            "stream": True,
+            "keep_alive": self.keep_alive,
+            "options": {
+                "temperature": temperature,
+                "num_predict": max_tokens
+            }
+        }
+        if response_format:
+            payload["format"] = response_format
+
+        try:
+            with track_upstream("ollama", "chat_stream") as call:
+                async with httpx.AsyncClient(timeout=self.timeout) as client:
+                    async with client.stream("POST", self.url, json=payload) as response:
+                        call.status = response.status_code
+                        if response.status_code != 200:
+                            body = await response.aread()
+                            logger.error(f"LLM stream failed: {response.status_code} - {body[:500]!r}")
+                            return
+
+                        async for line in response.aiter_lines():
+                            if not line:
+                                continue
+                            data = json.loads(line)
+                            content = data.get("message", {}).get("content", "")
+                            if content:
+                                yield content
+                            if data.get("done"):
+                                break
+
+        except Exception as e:
+            logger.error(f"LLM stream exception: {e}")
+
+    async def _call_llm(
+        self,
+        system_prompt: str,
+        user_prompt: str,
+        temperature: float = 0.3,
+        max_tokens: int = 500
+    ) -> Optional[str]:
+        """
+        Make a direct call to Ollama LLM.
+        
+        Returns the LLM response text, or None if call fails.
+        """
+        data = await self._chat(
+            [
+                {"role": "system", "content": system_prompt},
+                {"role": "user", "content": user_prompt}
+            ],
+            temperature=temperature,
+            max_tokens=max_tokens
+        )
+        if data is None:
+            return None
+        return data.get("message", {}).get("content", "")
+
+    async def warmup(self) -> bool:
+        """
+        Load the model and evaluate the shared character prompt prefix.
+
+        Called once at startup so the first player-facing call does not pay
+        for model load and full prompt evaluation.
+
+        Returns True if Ollama answered.
+        """
+        data = await self._chat(
+            [{"role": "system", "content": CHARACTER_ACTION_SYSTEM_PROMPT}],
+            temperature=0.0,
+            max_tokens=1
+        )
+        if data is None:
+            logger.warning(f"LLM warmup failed for model {self.model}")
+            return False
+
+        logger.info(
+            f"LLM warmup complete for model {self.model} "
+            f"(keep_alive={self.keep_alive}, "
+            f"prompt_eval_count={data.get('prompt_eval_count')})"
+        )
+        return True
+
     async def summarize_scene(
         self,
         scene_name: str,
@@ -187,6 +336,101 @@ Write a Markdown summary of the chapter (3-5 sentences):"""
             # Fallback to simple summary
             return f"**{chapter_name}** - {len(scenes)} scenes completed."
 
+    async def merge_chapter_digest(
+        self,
+        chapter_name: str,
+        digest: str,
+        scene_name: str,
+        scene_summary: str,
+        max_chars: int = 1500
+    ) -> str:
+        """
+        Merge one closed scene into a chapter's running digest.
+
+        The prompt only contains the current digest (bounded by max_chars) and
+        the new scene summary, so its size does not grow with chapter length.
+
+        Returns:
+            Updated digest (at most max_chars characters)
+        """
+        scene_line = f"**{scene_name}**: {scene_summary}"
+
+        if not digest:
+            # First scene of the chapter - nothing to merge yet
+            return scene_line[:max_chars]
+
+        system_prompt = """You maintain a running story digest for a Call of Cthulhu RPG chapter.
+Merge the new scene into the existing digest.
+
+Rules:
+- Use past tense
+- Keep key plot points, discoveries, and character developments
+- Drop minor details when space runs out
+- Use **bold** for important items/names
+- Plain Markdown, no headings
+- 6 sentences maximum"""
+
+        user_prompt = f"""Chapter: "{chapter_name}"
+
+Current digest:
+{digest[-max_chars:]}
+
+New scene:
+{scene_line}
+
+Write the updated digest:"""
+
+        merged = await self._call_llm(system_prompt, user_prompt, temperature=0.3, max_tokens=250)
+
+        if merged:
+            return merged.strip()[:max_chars]
+
+        # Fallback: append and keep the most recent part
+        return f"{digest}\n{scene_line}"[-max_chars:]
+
+    async def summarize_chapter_digest(
+        self,
+        chapter_name: str,
+        digest: str,
+        scene_count: int
+    ) -> str:
+        """
+        Turn a chapter's running digest into its final summary.
+
+        One short LLM call, independent of how many scenes the chapter had.
+
+        Returns:
+            Markdown-formatted summary
+        """
+        if not digest:
+            return f"**{chapter_name}** - No scenes recorded."
+
+        system_prompt = """You are a narrative summarizer for a Call of Cthulhu RPG.
+Create chapter summaries that capture the story arc in Markdown format.
+
+Rules:
+- Use past tense
+- Highlight key plot points and character developments
+- Maintain the dark, mysterious atmosphere
+- Use **bold** for chapter-defining moments
+- Use bullet points for multiple key events
+- 3-5 sentences maximum"""
+
+        user_prompt = f"""Summarize this chapter: "{chapter_name}" ({scene_count} scenes)
+
+Story so far:
+{digest}
+
+Write a Markdown summary of the chapter (3-5 sentences):"""
+
+        summary = await self._call_llm(system_prompt, user_prompt, temperature=0.4, max_tokens=300)
+
+        if summary:
+            return summary.strip()
+        else:
+            # Fallback to the digest itself
+            return f"**{chapter_name}** - {digest}"
+
     async def generate_campaign_milestones(
         self,
         campaign_name: str,
@@ -255,26 +499,17 @@ List {num_milestones} milestones:"""
             "Final resolution"
         ][:num_milestones]
 
-    async def generate_character_action(
+    def build_character_profile(
         self,
         character_name: str,
-        character_data: Dict[str, Any],
-        scene_context: Dict[str, Any],
-        existing_actions: List[Dict[str, Any]]
-    ) -> Dict[str, Any]:
+        character_data: Dict[str, Any]
+    ) -> str:
         """
-        Generate an action for an AI-controlled character.
-
-        Args:
-            character_name: Name of the character
-            character_data: Character sheet data (personality, occupation, skills, backstory)
-            scene_context: Current scene info (name, location, previous turns)
-            existing_actions: Other player actions this turn (so AI can react)
+        Build the stable per-character part of the system prompt.
 
-        Returns:
-            Action dict with {speak, act, appearance, emotion, ooc}
+        Depends only on the character sheet, so repeated calls for the same
+        character produce an identical prompt prefix.
         """
-        # Extract character details
         personality = character_data.get("ai_personality", "analytical")
         occupation = character_data.get("occupation", "Investigator")
         backstory = character_data.get("backstory", "")
@@ -304,7 +539,25 @@ List {num_milestones} milestones:"""
         # Limit to top 5 skills
         top_skills = top_skills[:5]
 
-        # Extract scene context
+        lines = [
+            "CHARACTER PROFILE:",
+            f"- Name: {character_name}",
+            f"- Occupation: {occupation}",
+            f"- Personality: {personality}",
+            f"- Top Skills: {', '.join(top_skills) if top_skills else 'General investigator skills'}",
+        ]
+        if backstory:
+            lines.append(f"- Background: {backstory[:200]}")
+
+        return "\n".join(lines)
+
+    def build_action_request(
+        self,
+        character_name: str,
+        scene_context: Dict[str, Any],
+        existing_actions: List[Dict[str, Any]]
+    ) -> str:
+        """Build the variable per-turn part of the prompt (scene and other actions)."""
         scene_name = scene_context.get("name", "Unknown Location")
         scene_location = scene_context.get("location", "")
         scene_description = scene_context.get("description", "")
@@ -321,42 +574,7 @@ List {num_milestones} milestones:"""
                     action_lines.append(f'- {char} does: {action["act"]}')
             other_actions_text = "\n".join(action_lines)
 
-        system_prompt = f"""You are roleplaying as {character_name}, an AI-controlled character in a Call of Cthulhu RPG.
-
-CHARACTER PROFILE:
-- Name: {character_name}
-- Occupation: {occupation}
-- Personality: {personality}
-- Top Skills: {', '.join(top_skills) if top_skills else 'General investigator skills'}
-{f"- Background: {backstory[:200]}" if backstory else ""}
-
-BEHAVIOR GUIDELINES:
-- Act according to your personality type: {personality}
-- Use your skills and occupation to inform your actions
-- Respond naturally to what other characters are doing
-- Stay in character - you are not the Keeper/narrator
-- Be concise and focused on your character's immediate actions
-- Show emotion and personality through dialogue and actions
-
-RESPONSE FORMAT:
-Return ONLY a JSON object with these fields (all optional):
-{{
-  "speak": "What your character says (dialogue)",
-  "act": "What your character does (physical action)",
-  "demeanor": "Observable body language/state - what others SEE (e.g., 'tense shoulders', 'nervous glance', 'forced smile', 'trembling hands'). NOT physical description like age or clothing.",
-  "emotion": "Your character's internal emotional state",
-  "ooc": "Out-of-character notes (rarely needed)"
-}}
-
-Example response:
-{{
-  "speak": "We should examine that bookshelf more closely.",
-  "act": "cautiously approaches the dusty shelves, flashlight in hand",
-  "demeanor": "squinting at the shadows, jaw set with determination",
-  "emotion": "curious but wary"
-}}"""
-
-        user_prompt = f"""CURRENT SCENE: {scene_name}
+        return f"""CURRENT SCENE: {scene_name}
 {f"Location: {scene_location}" if scene_location else ""}
 {f"Description: {scene_description[:300]}" if scene_description else ""}
 
@@ -365,6 +583,55 @@ OTHER PLAYER ACTIONS THIS TURN:
 
 As {character_name}, what do you do? Respond with JSON only:"""
 
+    def _build_action_prompts(
+        self,
+        character_name: str,
+        character_data: Dict[str, Any],
+        scene_context: Dict[str, Any],
+        existing_actions: List[Dict[str, Any]]
+    ) -> tuple[str, str]:
+        """Build (system_prompt, user_prompt) for a character action."""
+        # Stable prefix: shared instructions + character profile
+        system_prompt = (
+            f"{CHARACTER_ACTION_SYSTEM_PROMPT}\n\n"
+            f"{self.build_character_profile(character_name, character_data)}"
+        )
+
+        # Variable suffix: scene and this turn's actions
+        user_prompt = self.build_action_request(character_name, scene_context, existing_actions)
+
+        return system_prompt, user_prompt
+
+    async def generate_character_action(
+        self,
+        character_name: str,
+        character_data: Dict[str, Any],
+        scene_context: Dict[str, Any],
+        existing_actions: List[Dict[str, Any]]
+    ) -> Dict[str, Any]:
+        """
+        Generate an action for an AI-controlled character.
+
+        Args:
+            character_name: Name of the character
+            character_data: Character sheet data (personality, occupation, skills, backstory)
+            scene_context: Current scene info (name, location, previous turns)
+            existing_actions: Other player actions this turn (so AI can react)
+
+        Returns:
+            Action dict with {speak, act, appearance, emotion, ooc}
+        """
+        system_prompt, user_prompt = self._build_action_prompts(
+            character_name, character_data, scene_context, existing_actions
+        )
+
+        if self.structured_output:
+            action = None
+            async for event in self._stream_action(system_prompt, user_prompt):
+                if event["type"] == "action":
+                    action = event["action"]
+            return action or self._fallback_action()
+
         response = await self._call_llm(
             system_prompt,
             user_prompt,
@@ -373,42 +640,123 @@ As {character_name}, what do you do? Respond with JSON only:"""
         )
 
         if response:
-            # Try to parse JSON response
-            import json
-            try:
-                # Clean up potential markdown formatting
-                cleaned = response.strip()
-                if cleaned.startswith("```json"):
-                    cleaned = cleaned[7:]
-                if cleaned.startswith("```"):
-                    cleaned = cleaned[3:]
-                if cleaned.endswith("```"):
-                    cleaned = cleaned[:-3]
-                cleaned = cleaned.strip()
-
-                action_data = json.loads(cleaned)
-
-                # Validate and return
-                # Map 'demeanor' from LLM response to 'appearance' for frontend compatibility
-                return {
-                    "speak": action_data.get("speak", ""),
-                    "act": action_data.get("act", ""),
-                    "appearance": action_data.get("demeanor", action_data.get("appearance", "")),
-                    "emotion": action_data.get("emotion", ""),
-                    "ooc": action_data.get("ooc", "")
-                }
-            except json.JSONDecodeError:
-                logger.warning(f"Failed to parse LLM JSON response: {response}")
-                # Fallback: treat response as action text
-                return {
-                    "speak": "",
-                    "act": response[:200],
-                    "appearance": "",
-                    "emotion": "",
-                    "ooc": ""
-                }
+            return self._parse_action_response(response)
 
         # Fallback action if LLM fails
+        return self._fallback_action()
+
+    async def stream_character_action(
+        self,
+        character_name: str,
+        character_data: Dict[str, Any],
+        scene_context: Dict[str, Any],
+        existing_actions: List[Dict[str, Any]]
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Generate an AI character action in JSON mode, field by field.
+
+        Yields {"type": "field", "field": ..., "value": ...} as soon as each
+        field's value closes in the stream, then a final
+        {"type": "action", "action": {...}} with the complete action.
+
+        Without structured output (AI_ACTION_STRUCTURED_OUTPUT=false) the
+        action is generated in one call and its fields are yielded at once.
+        """
+        if not self.structured_output:
+            action = await self.generate_character_action(
+                character_name, character_data, scene_context, existing_actions
+            )
+            for field in ACTION_FIELDS:
+                if action.get(field):
+                    yield {"type": "field", "field": field, "value": action[field]}
+            yield {"type": "action", "action": action}
+            return
+
+        system_prompt, user_prompt = self._build_action_prompts(
+            character_name, character_data, scene_context, existing_actions
+        )
+
+        async for event in self._stream_action(system_prompt, user_prompt):
+            yield event
+
+    async def _stream_action(
+        self,
+        system_prompt: str,
+        user_prompt: str
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """Stream and incrementally parse a character action for prebuilt prompts."""
+        parser = StreamingJSONObjectParser()
+
+        chunks = self._chat_stream(
+            [
+                {"role": "system", "content": system_prompt},
+                {"role": "user", "content": user_prompt}
+            ],
+            temperature=0.8,  # Higher temperature for more varied responses
+            max_tokens=300,
+            response_format="json"
+        )
+        try:
+            async for chunk in chunks:
+                for key, value in parser.feed(chunk):
+                    field = "appearance" if key == "demeanor" else key
+                    if field in ACTION_FIELDS and isinstance(value, str):
+                        yield {"type": "field", "field": field, "value": value}
+                if parser.done:
+                    break
+        finally:
+            # Close the Ollama response now rather than when garbage collected
+            await chunks.aclose()
+
+        fields = parser.finish()
+        if not fields:
+            logger.warning("LLM stream produced no usable action fields")
+            yield {"type": "action", "action": self._fallback_action()}
+            return
+
+        if not parser.done:
+            logger.warning(f"LLM action stream ended early, recovered fields: {list(fields)}")
+
+        yield {"type": "action", "action": self._normalize_action(fields)}
+
+    def _normalize_action(self, action_data: Dict[str, Any]) -> Dict[str, Any]:
+        """Map LLM action JSON to the frontend action shape."""
+        # Map 'demeanor' from LLM response to 'appearance' for frontend compatibility
+        return {
+            "speak": action_data.get("speak", "") or "",
+            "act": action_data.get("act", "") or "",
+            "appearance": action_data.get("demeanor", action_data.get("appearance", "")) or "",
+            "emotion": action_data.get("emotion", "") or "",
+            "ooc": action_data.get("ooc", "") or ""
+        }
+
+    def _parse_action_response(self, response: str) -> Dict[str, Any]:
+        """Parse a complete (non-streamed) action response."""
+        try:
+            # Clean up potential markdown formatting
+            cleaned = response.strip()
+            if cleaned.startswith("```json"):
+                cleaned = cleaned[7:]
+            if cleaned.startswith("```"):
+                cleaned = cleaned[3:]
+            if cleaned.endswith("```"):
+                cleaned = cleaned[:-3]
+            cleaned = cleaned.strip()
+
+            return self._normalize_action(json.loads(cleaned))
+        except json.JSONDecodeError:
+            logger.warning(f"Failed to parse LLM JSON response: {response}")
+            # Fallback: treat response as action text
+            return {
+                "speak": "",
+                "act": response[:200],
+                "appearance": "",
+                "emotion": "",
+                "ooc": ""
+            }
+
+    def _fallback_action(self) -> Dict[str, Any]:
+        """Fallback action if the LLM fails."""
         return {
             "speak": "I'm observing the situation carefully.",
             "act": "stays alert and ready",
@@ -0,0 +1,262 @@
+"""
+Player presence for Socket.IO sessions.
+
+Presence is kept behind a small store interface so several backend workers
+can share it:
+
+- InMemoryPresenceStore: a dict in this process. Used for a single worker
+  and in tests.
+- MongoPresenceStore: the `presence` collection, shared by every worker.
+  Each entry expires PRESENCE_TTL_SECONDS after its last heartbeat, so
+  players connected to a worker that died disappear on their own.
+
+Presence entry (one per client and session):
+{
+    "session_id": str,
+    "player_id": str,
+    "player_name": str | None,
+    "sid": str,                     # Socket.IO client id
+    "worker": str,                  # host:pid of the worker holding the socket
+    "joined_at": datetime,
+    "expires_at": datetime          # TTL index, pushed forward by heartbeat()
+}
+
+The store is chosen by PRESENCE_STORE ("memory" or "mongo").
+"""
+import logging
+import os
+import socket
+from datetime import datetime, timedelta
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+from ..config import PRESENCE_STORE, PRESENCE_TTL_SECONDS
+from ..database import get_gamerecords_db
+
+logger = logging.getLogger(__name__)
+
+# Identifies this worker in presence entries (for debugging)
+WORKER_ID = f"{socket.gethostname()}:{os.getpid()}"
+
+
+class InMemoryPresenceStore:
+    """
+    Presence of the players connected to this process.
+
+    Kept as two indexes so that a disconnect only touches the sessions the
+    client had joined:
+
+        sids:     {sid: {(session_id, player_id), ...}}
+        sessions: {session_id: {player_id: {player_name, sids}}}
+
+    A player with several tabs open has several sids and stays online until
+    the last one leaves. Empty players and sessions are removed.
+    """
+
+    def __init__(self):
+        """Initialize the in-memory presence store."""
+        self.sids: Dict[str, Set[Tuple[str, str]]] = {}
+        self.sessions: Dict[str, Dict[str, Dict]] = {}
+
+    async def join(self, session_id: str, player_id: str, sid: str, player_name: Optional[str] = None) -> bool:
+        """
+        Record that a player joined a session from a client.
+
+        Returns:
+            True if this is the player's first client in the session
+        """
+        player = self.sessions.setdefault(session_id, {}).setdefault(
+            player_id, {'player_name': player_name, 'sids': set()}
+        )
+        if player_name:
+            player['player_name'] = player_name
+        first_client = not player['sids']
+        player['sids'].add(sid)
+        self.sids.setdefault(sid, set()).add((session_id, player_id))
+        return first_client
+
+    def _remove(self, session_id: str, player_id: str, sid: str) -> bool:
+        """Drop one client of a player; True if the player has no client left."""
+        players = self.sessions.get(session_id)
+        player = players.get(player_id) if players else None
+        if player is None or sid not in player['sids']:
+            return False
+        player['sids'].discard(sid)
+        if player['sids']:
+            return False
+        del players[player_id]
+        if not players:
+            del self.sessions[session_id]
+        return True
+
+    async def leave(self, session_id: str, player_id: str, sid: str) -> bool:
+        """
+        Remove a client of a player from a session.
+
+        Returns:
+            True if the player has no other client left in the session
+        """
+        memberships = self.sids.get(sid)
+        if memberships is not None:
+            memberships.discard((session_id, player_id))
+            if not memberships:
+                del self.sids[sid]
+        return self._remove(session_id, player_id, sid)
+
+    async def remove_sid(self, sid: str) -> List[Tuple[str, str]]:
+        """
+        Remove every presence entry of a disconnected client.
+
+        Returns:
+            (session_id, player_id) pairs of players that went offline
+        """
+        return [
+            (session_id, player_id)
+            for session_id, player_id in self.sids.pop(sid, ())
+            if self._remove(session_id, player_id, sid)
+        ]
+
+    async def list_players(self, session_id: str) -> List[Dict]:
+        """Players online in a session ({player_id, player_name})."""
+        return [
+            {'player_id': player_id, 'player_name': player['player_name']}
+            for player_id, player in self.sessions.get(session_id, {}).items()
+        ]
+
+    async def get_sids(self, session_id: str, player_id: str) -> List[str]:
+        """Client ids of a player in a session (one per open tab)."""
+        player = self.sessions.get(session_id, {}).get(player_id)
+        return list(player['sids']) if player else []
+
+    async def heartbeat(self, sids: Iterable[str]):
+        """Nothing expires in memory; entries live as long as the process."""
+
+
+class MongoPresenceStore:
+    """
+    Presence shared by all workers through the presence collection.
+
+    One entry per client and session, so a player with several tabs has
+    several entries and stays online until the last one is removed.
+    """
+
+    def __init__(self, ttl_seconds: float = PRESENCE_TTL_SECONDS):
+        """
+        Initialize the MongoDB presence store.
+
+        Args:
+            ttl_seconds: Entries without a heartbeat for this long are expired
+        """
+        self.collection_name = "presence"
+        self.ttl = timedelta(seconds=ttl_seconds)
+
+    @property
+    def collection(self):
+        return get_gamerecords_db()[self.collection_name]
+
+    async def join(self, session_id: str, player_id: str, sid: str, player_name: Optional[str] = None) -> bool:
+        """
+        Record that a player joined a session from a client.
+
+        Returns:
+            True if this is the player's first client in the session
+        """
+        first_client = not await self._is_online(session_id, player_id)
+        now = datetime.utcnow()
+        await self.collection.update_one(
+            {"session_id": session_id, "player_id": player_id, "sid": sid},
+            {
+                "$set": {
+                    "player_name": player_name,
+                    "worker": WORKER_ID,
+                    "expires_at": now + self.ttl
+                },
+                "$setOnInsert": {"joined_at": now}
+            },
+            upsert=True
+        )
+        return first_client
+
+    async def _is_online(self, session_id: str, player_id: str) -> bool:
+        entry = await self.collection.find_one(
+            {"session_id": session_id, "player_id": player_id, "expires_at": {"$gt": datetime.utcnow()}},
+            {"_id": 1}
+        )
+        return entry is not None
+
+    async def leave(self, session_id: str, player_id: str, sid: str) -> bool:
+        """
+        Remove a client of a player from a session.
+
+        Returns:
+            True if the player has no other client left in the session
+        """
+        result = await self.collection.delete_one({"session_id": session_id, "player_id": player_id, "sid": sid})
+        return bool(result.deleted_count) and not await self._is_online(session_id, player_id)
+
+    async def remove_sid(self, sid: str) -> List[Tuple[str, str]]:
+        """
+        Remove every presence entry of a disconnected client.
+
+        Returns:
+            (session_id, player_id) pairs of players that went offline
+        """
+        entries = await self.collection.find(
+            {"sid": sid}, {"_id": 0, "session_id": 1, "player_id": 1}
+        ).to_list(length=100)
+        if not entries:
+            return []
+        await self.collection.delete_many({"sid": sid})
+        return [
+            (entry["session_id"], entry["player_id"])
+            for entry in entries
+            if not await self._is_online(entry["session_id"], entry["player_id"])
+        ]
+
+    async def list_players(self, session_id: str) -> List[Dict]:
+        """Players online in a session ({player_id, player_name})."""
+        # The TTL monitor only runs once a minute; skip entries that already expired
+        entries = await self.collection.find(
+            {"session_id": session_id, "expires_at": {"$gt": datetime.utcnow()}},
+            {"_id": 0, "player_id": 1, "player_name": 1}
+        ).sort("joined_at", 1).to_list(length=500)
+        # One entry per tab; list each player once
+        players: Dict[str, Dict] = {}
+        for entry in entries:
+            players.setdefault(entry["player_id"], entry)
+        return list(players.values())
+
+    async def get_sids(self, session_id: str, player_id: str) -> List[str]:
+        """Client ids of a player in a session (one per open tab)."""
+        entries = await self.collection.find(
+            {"session_id": session_id, "player_id": player_id, "expires_at": {"$gt": datetime.utcnow()}},
+            {"_id": 0, "sid": 1}
+        ).to_list(length=50)
+        return [entry["sid"] for entry in entries]
+
+    async def heartbeat(self, sids: Iterable[str]):
+        """
+        Keep the entries of clients connected to this worker alive.
+
+        Args:
+            sids: Client ids currently connected to this worker
+        """
+        sids = list(sids)
+        if not sids:
+            return
+        await self.collection.update_many(
+            {"sid": {"$in": sids}},
+            {"$set": {"expires_at": datetime.utcnow() + self.ttl, "worker": WORKER_ID}}
+        )
+
+
+def create_presence_store():
+    """Presence store selected by PRESENCE_STORE."""
+    if PRESENCE_STORE == "mongo":
+        return MongoPresenceStore()
+    if PRESENCE_STORE != "memory":
+        logger.warning(f"Unknown PRESENCE_STORE {PRESENCE_STORE!r}, using memory")
+    return InMemoryPresenceStore()
+
+
+# Singleton instance
+presence_store = create_presence_store()
@@ -0,0 +1,221 @@
+"""
+Replayable log of the events emitted to session rooms.
+
+Every event emitted to a session room gets the next sequence number of that
+session, added to its payload as `seq`. The last SESSION_EVENT_LOG_SIZE
+events of each session are kept so that a reconnecting client can send the
+last seq it saw with join_session and be sent only the events it missed,
+instead of reloading drafts, turns and scenes over REST.
+
+Events sent to everyone but their sender (skip_sid) are logged with the
+sender's sid, so a reconnecting client can skip its own events on replay
+(its socket id changes with every connection).
+
+When the missed events are no longer all in the log (too many, evicted, or
+the sequence restarted), since() reports a gap and the client reloads
+everything as before.
+
+The log is kept behind a small store interface, like presence:
+
+- InMemorySessionEventLog: a ring buffer per session in this process. Used
+  for a single worker and in tests; sequences restart with the process.
+- MongoSessionEventLog: the capped `session_events` collection, with the
+  sequence counters in `session_event_seqs`, shared by every worker.
+
+Log entry:
+{
+    "session_id": str,
+    "seq": int,
+    "event": str,
+    "data": dict,                   # payload as emitted, including seq
+    "sender": str | None,           # sid the event was not sent to (skip_sid)
+    "created_at": datetime
+}
+
+The store is chosen by SESSION_EVENT_LOG_STORE ("memory" or "mongo").
+"""
+import logging
+from collections import OrderedDict, deque
+from datetime import datetime
+from typing import Any, Deque, Dict, List, Optional, Tuple
+
+from pymongo import ReturnDocument
+
+from ..config import SESSION_EVENT_LOG_SIZE, SESSION_EVENT_LOG_STORE
+from ..database import get_gamerecords_db
+
+logger = logging.getLogger(__name__)
+
+# Presence changes are not replayed: session_joined carries the current player list
+UNLOGGED_EVENTS = {'player_joined', 'player_left', 'player_disconnected'}
+
+
+class InMemorySessionEventLog:
+    """Ring buffer of recent events per session, in this process."""
+
+    def __init__(self, size: int = SESSION_EVENT_LOG_SIZE, max_sessions: int = 1000):
+        """
+        Initialize the in-memory event log.
+
+        Args:
+            size: Events kept per session
+            max_sessions: Sessions kept; the least recently active is dropped
+        """
+        self.size = size
+        self.max_sessions = max_sessions
+        self.seqs: Dict[str, int] = {}
+        self.events: "OrderedDict[str, Deque[Dict[str, Any]]]" = OrderedDict()
+
+    async def append(
+        self,
+        session_id: str,
+        event: str,
+        data: Dict[str, Any],
+        sender: Optional[str] = None
+    ) -> Dict[str, Any]:
+        """
+        Record an event emitted to a session room.
+
+        Args:
+            session_id: Session of the room
+            event: Event name
+            data: Event payload
+            sender: Sid of the client that sent the event and did not get it
+
+        Returns:
+            The payload to emit, with its seq added
+        """
+        seq = self.seqs.get(session_id, 0) + 1
+        self.seqs[session_id] = seq
+        data = {**data, 'seq': seq}
+
+        events = self.events.get(session_id)
+        if events is None:
+            events = self.events[session_id] = deque(maxlen=self.size)
+            if len(self.events) > self.max_sessions:
+                oldest, _ = self.events.popitem(last=False)
+                self.seqs.pop(oldest, None)
+        else:
+            self.events.move_to_end(session_id)
+        events.append({'seq': seq, 'event': event, 'data': data, 'sender': sender})
+        return data
+
+    async def since(self, session_id: str, last_seq: int) -> Tuple[int, Optional[List[Dict[str, Any]]]]:
+        """
+        Events of a session after last_seq.
+
+        Returns:
+            (current seq, [{seq, event, data, sender}, ...] oldest first), or
+            (current seq, None) if some of the missed events are gone
+        """
+        current = self.seqs.get(session_id, 0)
+        if last_seq > current or current - last_seq > self.size:
+            return current, None
+        events = [entry for entry in self.events.get(session_id, ()) if entry['seq'] > last_seq]
+        if len(events) != current - last_seq:
+            return current, None
+        return current, events
+
+    async def current_seq(self, session_id: str) -> int:
+        """Sequence number of the last event of a session (0 if none)."""
+        return self.seqs.get(session_id, 0)
+
+
+class MongoSessionEventLog:
+    """Session events in a capped collection shared by all workers."""
+
+    def __init__(self, size: int = SESSION_EVENT_LOG_SIZE):
+        """
+        Initialize the MongoDB event log.
+
+        Args:
+            size: Most events replayed to a client; older gaps need a reload
+        """
+        self.size = size
+
+    async def append(
+        self,
+        session_id: str,
+        event: str,
+        data: Dict[str, Any],
+        sender: Optional[str] = None
+    ) -> Dict[str, Any]:
+        """
+        Record an event emitted to a session room.
+
+        Args:
+            session_id: Session of the room
+            event: Event name
+            data: Event payload
+            sender: Sid of the client that sent the event and did not get it
+
+        Returns:
+            The payload to emit, with its seq added (unchanged if the log failed)
+        """
+        db = get_gamerecords_db()
+        try:
+            counter = await db.session_event_seqs.find_one_and_update(
+                {"session_id": session_id},
+                {"$inc": {"seq": 1}},
+                upsert=True,
+                return_document=ReturnDocument.AFTER
+            )
+            seq = counter["seq"]
+        except Exception as e:
+            logger.error(f"Failed to number {event} event of session {session_id}: {e}")
+            return data
+
+        data = {**data, 'seq': seq}
+        try:
+            await db.session_events.insert_one({
+                "session_id": session_id,
+                "seq": seq,
+                "event": event,
+                "data": data,
+                "sender": sender,
+                "created_at": datetime.utcnow()
+            })
+        except Exception as e:
+            # Clients missing this event get a gap and reload
+            logger.error(f"Failed to log {event} event {seq} of session {session_id}: {e}")
+        return data
+
+    async def since(self, session_id: str, last_seq: int) -> Tuple[int, Optional[List[Dict[str, Any]]]]:
+        """
+        Events of a session after last_seq.
+
+        Returns:
+            (current seq, [{seq, event, data, sender}, ...] oldest first), or
+            (current seq, None) if some of the missed events are gone
+        """
+        current = await self.current_seq(session_id)
+        if last_seq > current or current - last_seq > self.size:
+            return current, None
+        if last_seq == current:
+            return current, []
+        events = await get_gamerecords_db().session_events.find(
+            {"session_id": session_id, "seq": {"$gt": last_seq, "$lte": current}},
+            {"_id": 0, "seq": 1, "event": 1, "data": 1, "sender": 1}
+        ).sort("seq", 1).to_list(self.size)
+        if len(events) != current - last_seq:
+            # Evicted from the capped collection, or not written yet
+            return current, None
+        return current, events
+
+    async def current_seq(self, session_id: str) -> int:
+        """Sequence number of the last event of a session (0 if none)."""
+        counter = await get_gamerecords_db().session_event_seqs.find_one({"session_id": session_id})
+        return counter["seq"] if counter else 0
+
+
+def create_session_event_log():
+    """Create the event log configured by SESSION_EVENT_LOG_STORE."""
+    if SESSION_EVENT_LOG_STORE == "mongo":
+        return MongoSessionEventLog()
+    if SESSION_EVENT_LOG_STORE != "memory":
+        logger.warning(f"Unknown SESSION_EVENT_LOG_STORE {SESSION_EVENT_LOG_STORE!r}, using memory")
+    return InMemorySessionEventLog()
+
+
+# Singleton instance
+session_event_log = create_session_event_log()
@@ -0,0 +1,354 @@
+"""
+Background scene/chapter summarization.
+
+Transitions close scenes and chapters immediately with a placeholder summary
+and enqueue a summary job. A single background worker generates the LLM
+summary, patches the document and notifies the session, so a slow Ollama call
+never delays the turn narrative.
+
+Jobs are stored in the summary_jobs collection and survive restarts. Jobs
+are claimed in creation order, but scene jobs can be retried later or run on
+other workers, so a chapter job whose scenes still have summary jobs queued or
+running is postponed until they finish.
+
+Chapter summaries are incremental: every finished scene summary is merged into
+the chapter's running digest with a small bounded prompt, and closing the
+chapter only condenses that digest.
+"""
+import asyncio
+import logging
+import uuid
+from datetime import datetime
+from typing import Any, Dict, Optional
+
+from ..config import (
+    JOB_POLL_INTERVAL,
+    SUMMARY_JOB_MAX_ATTEMPTS,
+    CHAPTER_DIGEST_MAX_CHARS
+)
+from ..database import get_gamerecords_db
+from .event_bus import event_bus
+from .job_queue import JobPostponed, JobQueue
+from .llm import llm_service, OLLAMA_TIMEOUT
+
+logger = logging.getLogger(__name__)
+
+
+SCENE_SUMMARY_JOB = "scene_summary"
+CHAPTER_SUMMARY_JOB = "chapter_summary"
+
+# Seconds a chapter job waits for its scene summaries before checking again
+CHAPTER_SUMMARY_WAIT_SECONDS = 5.0
+
+
+def scene_summary_placeholder(scene_name: str) -> str:
+    """Summary shown on a closed scene until its LLM summary is ready."""
+    return f"*{scene_name}* - Summary pending..."
+
+
+def chapter_summary_placeholder(chapter_name: str) -> str:
+    """Summary shown on a closed chapter until its LLM summary is ready."""
+    return f"**{chapter_name}** - Summary pending..."
+
+
+class SummarizationService:
+    """Enqueues and processes background summary jobs."""
+
+    def __init__(self):
+        """Initialize the summarization service."""
+        # Lease must outlive a full LLM call, or another worker could steal the job
+        self.queue = JobQueue(
+            "summary_jobs",
+            lease_seconds=OLLAMA_TIMEOUT + 30,
+            max_attempts=SUMMARY_JOB_MAX_ATTEMPTS
+        )
+        self.poll_interval = JOB_POLL_INTERVAL
+        self.worker_id = f"summarizer-{uuid.uuid4().hex[:8]}"
+        self._wakeup = asyncio.Event()
+
+    async def enqueue_scene_summary(
+        self,
+        scene_id: str,
+        reason: str,
+        session_id: Optional[str] = None
+    ):
+        """Queue LLM summarization of a closed scene."""
+        await self.queue.enqueue(SCENE_SUMMARY_JOB, {
+            "scene_id": scene_id,
+            "reason": reason,
+            "session_id": session_id
+        })
+        self._wakeup.set()
+
+    async def enqueue_chapter_summary(
+        self,
+        chapter_id: str,
+        reason: str,
+        session_id: Optional[str] = None
+    ):
+        """Queue LLM summarization of a closed chapter."""
+        await self.queue.enqueue(CHAPTER_SUMMARY_JOB, {
+            "chapter_id": chapter_id,
+            "reason": reason,
+            "session_id": session_id
+        })
+        self._wakeup.set()
+
+    async def run_worker(self):
+        """
+        Process summary jobs until cancelled.
+
+        Also picks up jobs left over from a previous run (pending, or running
+        with an expired lease).
+        """
+        logger.info(f"Summary worker {self.worker_id} started")
+
+        while True:
+            try:
+                job = await self.queue.claim(self.worker_id)
+            except Exception as e:
+                logger.error(f"Summary worker failed to claim job: {e}")
+                job = None
+
+            if job is None:
+                # Sleep until a new job is enqueued or the poll interval passes
+                self._wakeup.clear()
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout=self.poll_interval)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+
+            try:
+                result = await self.process_job(job)
+                await self.queue.complete(job["id"], result)
+            except asyncio.CancelledError:
+                raise
+            except JobPostponed as e:
+                await self.queue.postpone(job, e.delay_seconds, str(e))
+            except Exception as e:
+                await self.queue.fail(job, str(e))
+
+    async def process_job(self, job: Dict[str, Any]) -> Dict[str, Any]:
+        """Run a single summary job."""
+        payload = job.get("payload", {})
+
+        if job["kind"] == SCENE_SUMMARY_JOB:
+            return await self._summarize_scene(
+                payload["scene_id"],
+                payload.get("reason", ""),
+                payload.get("session_id")
+            )
+
+        if job["kind"] == CHAPTER_SUMMARY_JOB:
+            return await self._summarize_chapter(
+                payload["chapter_id"],
+                payload.get("reason", ""),
+                payload.get("session_id")
+            )
+
+        raise ValueError(f"Unknown summary job kind '{job['kind']}'")
+
+    async def _summarize_scene(
+        self,
+        scene_id: str,
+        reason: str,
+        session_id: Optional[str]
+    ) -> Dict[str, Any]:
+        """Generate and store the LLM summary of a scene."""
+        db = get_gamerecords_db()
+
+        scene = await db.scenes.find_one({"id": scene_id})
+        if not scene:
+            logger.warning(f"Scene {scene_id} disappeared before summarization")
+            return {"skipped": True}
+
+        scene_name = scene.get("name", "Unnamed Scene")
+
+        if scene.get("summary_status") == "ready":
+            # Retry of a job whose summary was stored: only finish the digest merge
+            logger.info(f"Scene {scene_id} already summarized, not summarizing again")
+            if scene.get("chapter_id"):
+                await self._merge_into_chapter_digest(scene["chapter_id"], scene_id, scene_name, scene.get("summary", ""))
+            return {"scene_id": scene_id, "skipped": True}
+
+        turn_ids = scene.get("turns", [])
+
+        # Fetch turn documents for summarization
+        turns = []
+        if turn_ids:
+            cursor = db.turns.find({"id": {"$in": turn_ids}}).sort("order", 1)
+            turns = await cursor.to_list(length=100)
+
+        try:
+            summary = await llm_service.summarize_scene(scene_name, turns)
+            logger.info(f"Generated LLM summary for scene {scene_id}")
+        except Exception as e:
+            logger.warning(f"LLM summarization failed for scene {scene_id}: {e}")
+            # Fallback to simple summary
+            summary = f"*{scene_name}* completed. {len(turns)} turns. {reason}"
+
+        result = await db.scenes.update_one(
+            {"id": scene_id, "summary_status": {"$ne": "ready"}},
+            {
+                "$set": {
+                    "summary": summary,
+                    "summary_status": "ready"
+                },
+                "$push": {
+                    "changes": {
+                        "by": "DungeonMasterAI",
+                        "at": datetime.utcnow(),
+                        "type": "summary_added"
+                    }
+                }
+            }
+        )
+
+        if result.modified_count == 1:
+            await event_bus.publish("scene_summary_ready", session_id, {"scene_id": scene_id, "summary": summary})
+
+        if scene.get("chapter_id"):
+            await self._merge_into_chapter_digest(scene["chapter_id"], scene_id, scene_name, summary)
+
+        return {"scene_id": scene_id}
+
+    async def _merge_into_chapter_digest(
+        self,
+        chapter_id: str,
+        scene_id: str,
+        scene_name: str,
+        scene_summary: str
+    ):
+        """
+        Merge a scene summary into its chapter's running digest.
+
+        The write is conditional on the digest not having changed since it was
+        read, so concurrent workers cannot lose each other's merges. A scene is
+        merged at most once, which keeps job retries idempotent.
+        """
+        db = get_gamerecords_db()
+
+        for _ in range(3):
+            chapter = await db.chapters.find_one(
+                {"id": chapter_id},
+                {"name": 1, "digest": 1, "digest_scene_ids": 1}
+            )
+            if not chapter:
+                return
+
+            merged_ids = chapter.get("digest_scene_ids", [])
+            if scene_id in merged_ids:
+                return
+
+            digest = await llm_service.merge_chapter_digest(
+                chapter.get("name", "Unnamed Chapter"),
+                chapter.get("digest") or "",
+                scene_name,
+                scene_summary,
+                max_chars=CHAPTER_DIGEST_MAX_CHARS
+            )
+
+            # Chapters created before digests existed have no digest_scene_ids
+            expected_ids = merged_ids if "digest_scene_ids" in chapter else {"$exists": False}
+            result = await db.chapters.update_one(
+                {"id": chapter_id, "digest_scene_ids": expected_ids},
+                {
+                    "$set": {"digest": digest},
+                    "$push": {"digest_scene_ids": scene_id}
+                }
+            )
+            if result.modified_count == 1:
+                logger.info(f"Merged scene {scene_id} into digest of chapter {chapter_id}")
+                return
+
+        logger.warning(f"Gave up merging scene {scene_id} into chapter {chapter_id} digest")
+
+    async def _summarize_chapter(
+        self,
+        chapter_id: str,
+        reason: str,
+        session_id: Optional[str]
+    ) -> Dict[str, Any]:
+        """Generate and store the LLM summary of a chapter."""
+        db = get_gamerecords_db()
+
+        chapter = await db.chapters.find_one({"id": chapter_id})
+        if not chapter:
+            logger.warning(f"Chapter {chapter_id} disappeared before summarization")
+            return {"skipped": True}
+
+        if chapter.get("summary_status") == "ready":
+            logger.info(f"Chapter {chapter_id} already summarized, not summarizing again")
+            return {"chapter_id": chapter_id, "skipped": True}
+
+        chapter_name = chapter.get("name", "Unnamed Chapter")
+        scene_ids = chapter.get("scenes", [])
+        merged_ids = set(chapter.get("digest_scene_ids", []))
+
+        unmerged_ids = [scene_id for scene_id in scene_ids if scene_id not in merged_ids]
+        if unmerged_ids:
+            pending_job = await self.queue.collection.find_one(
+                {
+                    "kind": SCENE_SUMMARY_JOB,
+                    "payload.scene_id": {"$in": unmerged_ids},
+                    "status": {"$in": ["pending", "running"]}
+                },
+                {"_id": 0, "id": 1}
+            )
+            if pending_job:
+                raise JobPostponed(
+                    f"scene summaries of chapter {chapter_id} not ready",
+                    CHAPTER_SUMMARY_WAIT_SECONDS
+                )
+
+        try:
+            if set(scene_ids) <= merged_ids:
+                # Every scene is already in the digest: one short call
+                summary = await llm_service.summarize_chapter_digest(
+                    chapter_name,
+                    chapter.get("digest") or "",
+                    len(scene_ids)
+                )
+            else:
+                # Chapters closed before incremental digests existed, or
+                # scenes whose merge failed. Scenes whose summary job failed
+                # only have a placeholder and are left out.
+                scenes = []
+                if scene_ids:
+                    cursor = db.scenes.find(
+                        {"id": {"$in": scene_ids}, "summary_status": {"$ne": "pending"}}
+                    ).sort("_id", 1)
+                    scenes = await cursor.to_list(length=50)
+                summary = await llm_service.summarize_chapter(chapter_name, scenes)
+            logger.info(f"Generated LLM summary for chapter {chapter_id}")
+        except Exception as e:
+            logger.warning(f"LLM summarization failed for chapter {chapter_id}: {e}")
+            # Fallback to simple summary
+            summary = f"**{chapter_name}** completed. {len(scene_ids)} scenes. {reason}"
+
+        result = await db.chapters.update_one(
+            {"id": chapter_id, "summary_status": {"$ne": "ready"}},
+            {
+                "$set": {
+                    "summary": summary,
+                    "summary_status": "ready"
+                },
+                "$push": {
+                    "changes": {
+                        "by": "DungeonMasterAI",
+                        "at": datetime.utcnow(),
+                        "type": "summary_added"
+                    }
+                }
+            }
+        )
+
+        if result.modified_count == 1:
+            await event_bus.publish("chapter_summary_ready", session_id, {"chapter_id": chapter_id, "summary": summary})
+
+        return {"chapter_id": chapter_id}
+
+
+# Singleton instance
+summarization_service = SummarizationService()
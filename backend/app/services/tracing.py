@@ -0,0 +1,330 @@
+"""
+Per-turn distributed tracing.
+
+A trace is started when a turn is submitted: the trace id and the root span
+id are stored on the turn (turn.trace), sent to n8n in the context bundle and
+echoed back in the callback metadata. Every stage records spans into the
+turn_traces collection:
+
+    turn                submit -> completed/failed (root span)
+      submit            POST /turns/{id}/submit
+        skill_checks    detect + roll
+        assemble_context
+        enqueue
+      queue_wait        job available -> claimed by a dispatch worker
+      dispatch          POST to the n8n webhook (one span per attempt)
+      n8n               dispatch sent -> callback received
+        <n8n spans>     optional metadata.spans reported by the workflow
+      callback          POST /turns/internal/{id}/complete
+        transition
+        emit
+
+Span document:
+{
+    "trace_id": str,
+    "span_id": str,
+    "parent_span_id": str | None,
+    "turn_id": str,
+    "name": str,
+    "start": datetime,
+    "end": datetime,
+    "duration_ms": float,
+    "status": "ok" | "error",
+    "error": str | None,
+    "attributes": {...},
+    "created_at": datetime          # TTL index (TURN_TRACE_RETENTION_DAYS)
+}
+
+Spans of one request are buffered on a TurnTrace and written in one batch;
+tracing failures are logged and never fail the turn.
+"""
+import logging
+import secrets
+import time
+from contextlib import contextmanager
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, List, Optional
+
+from pydantic import BaseModel
+from pymongo import ASCENDING
+
+from ..database import get_gamerecords_db
+
+logger = logging.getLogger(__name__)
+
+
+def _new_trace_id() -> str:
+    return secrets.token_hex(16)
+
+
+def new_span_id() -> str:
+    """Random 64-bit span id (hex)."""
+    return secrets.token_hex(8)
+
+
+class TraceContext(BaseModel):
+    """Trace id and parent span propagated across backend, n8n and callback."""
+    trace_id: str
+    span_id: str
+
+    @classmethod
+    def new(cls) -> "TraceContext":
+        """Start a new trace; span_id is the root span."""
+        return cls(trace_id=_new_trace_id(), span_id=new_span_id())
+
+    @classmethod
+    def parse(cls, value: Any) -> Optional["TraceContext"]:
+        """Read a context from a stored/echoed dict; None if missing or malformed."""
+        if not isinstance(value, dict):
+            return None
+        if not value.get("trace_id") or not value.get("span_id"):
+            return None
+        return cls(trace_id=str(value["trace_id"]), span_id=str(value["span_id"]))
+
+    @property
+    def traceparent(self) -> str:
+        """W3C traceparent header value, for tools in n8n that understand it."""
+        return f"00-{self.trace_id}-{self.span_id}-01"
+
+
+class TurnTrace:
+    """
+    Spans of one turn trace recorded by a single request or worker.
+
+    Without a context (turns submitted before tracing existed) spans are
+    timed but not recorded.
+    """
+
+    def __init__(self, context: Optional[TraceContext], turn_id: str):
+        self.context = context
+        self.turn_id = turn_id
+        self.spans: List[Dict[str, Any]] = []
+
+    def add_span(
+        self,
+        name: str,
+        start: datetime,
+        end: datetime,
+        parent_span_id: Optional[str] = None,
+        span_id: Optional[str] = None,
+        status: str = "ok",
+        error: Optional[str] = None,
+        **attributes
+    ) -> Optional[Dict[str, Any]]:
+        """
+        Record a span with known start and end.
+
+        Args:
+            name: Stage name
+            start: Span start (UTC)
+            end: Span end (UTC)
+            parent_span_id: Parent span; defaults to the trace's root span
+            span_id: Use this id instead of a new one (e.g. for the root span)
+            status: "ok" or "error"
+            error: Error message when status is "error"
+            **attributes: Extra details shown in the waterfall
+
+        Returns:
+            The span document, or None when the trace has no context
+        """
+        if self.context is None:
+            return None
+        span = {
+            "trace_id": self.context.trace_id,
+            "span_id": span_id or new_span_id(),
+            "parent_span_id": parent_span_id if parent_span_id is not None else self.context.span_id,
+            "turn_id": self.turn_id,
+            "name": name,
+            "start": start,
+            "end": end,
+            "duration_ms": round(max((end - start).total_seconds(), 0.0) * 1000, 3),
+            "status": status,
+            "error": error,
+            "attributes": attributes,
+            "created_at": datetime.utcnow()
+        }
+        # The root span has no parent
+        if span["span_id"] == span["parent_span_id"]:
+            span["parent_span_id"] = None
+        self.spans.append(span)
+        return span
+
+    @contextmanager
+    def span(
+        self,
+        name: str,
+        parent_span_id: Optional[str] = None,
+        span_id: Optional[str] = None,
+        **attributes
+    ):
+        """
+        Time the enclosed block as a span.
+
+        Yields the span's attributes dict so the block can add details.
+        Exceptions mark the span as failed and propagate.
+
+        Example:
+            with trace.span("enqueue") as attrs:
+                job = await queue.enqueue(...)
+                attrs["job_id"] = job["id"]
+        """
+        start = datetime.utcnow()
+        started = time.perf_counter()
+        status, error = "ok", None
+        try:
+            yield attributes
+        except BaseException as e:
+            status, error = "error", str(e) or type(e).__name__
+            raise
+        finally:
+            # perf_counter for the duration, wall clock only for placement
+            end = start + timedelta(seconds=time.perf_counter() - started)
+            self.add_span(
+                name, start, end,
+                parent_span_id=parent_span_id,
+                span_id=span_id,
+                status=status,
+                error=error,
+                **attributes
+            )
+
+    def end_turn(self, started_at: Optional[datetime], status: str, error: Optional[str] = None):
+        """
+        Record the root span once the turn completed or failed.
+
+        Args:
+            started_at: When the turn was claimed (turn.processing_started_at)
+            status: Final turn status ("completed" or "failed")
+            error: Failure reason
+        """
+        if self.context is None or not isinstance(started_at, datetime):
+            return
+        self.add_span(
+            "turn", started_at, datetime.utcnow(),
+            span_id=self.context.span_id,
+            status="ok" if status == "completed" else "error",
+            error=error,
+            turn_status=status
+        )
+
+    def add_reported_spans(self, reported: Any, parent_span_id: str):
+        """
+        Record spans reported by the n8n workflow in the callback metadata.
+
+        Each entry is {"name", "start" (ISO 8601, UTC), "duration_ms", ...};
+        malformed entries are skipped.
+        """
+        if not isinstance(reported, list):
+            return
+        for entry in reported[:50]:
+            try:
+                start = datetime.fromisoformat(str(entry["start"]).replace("Z", "+00:00"))
+                if start.tzinfo is not None:
+                    start = start.astimezone(timezone.utc).replace(tzinfo=None)
+                end = start + timedelta(milliseconds=float(entry["duration_ms"]))
+                name = str(entry["name"])
+            except (KeyError, TypeError, ValueError):
+                continue
+            self.add_span(name, start, end, parent_span_id=parent_span_id, source="n8n")
+
+    async def flush(self):
+        """Write buffered spans to turn_traces (errors are logged, not raised)."""
+        if not self.spans:
+            return
+        spans, self.spans = self.spans, []
+        try:
+            await turn_trace_service.collection.insert_many(spans, ordered=False)
+        except Exception as e:
+            logger.warning(f"Failed to write {len(spans)} spans for turn {self.turn_id}: {e}")
+
+
+class TurnTraceService:
+    """Stores turn trace spans and builds waterfalls from them."""
+
+    def __init__(self):
+        """Initialize the turn trace service."""
+        self.collection_name = "turn_traces"
+
+    @property
+    def collection(self):
+        return get_gamerecords_db()[self.collection_name]
+
+    def start(self, turn_id: str, context: Optional[TraceContext]) -> TurnTrace:
+        """Span recorder for one request or job of a turn."""
+        return TurnTrace(context, turn_id)
+
+    async def last_span(self, trace_id: str, name: str) -> Optional[Dict[str, Any]]:
+        """Most recently started span with this name in a trace."""
+        return await self.collection.find_one(
+            {"trace_id": trace_id, "name": name},
+            {"_id": 0},
+            sort=[("start", -1)]
+        )
+
+    async def get_waterfall(self, turn: Dict[str, Any], trace_id: Optional[str] = None) -> Dict[str, Any]:
+        """
+        Build the waterfall of a turn's trace.
+
+        Args:
+            turn: Turn document (needs id, status and trace)
+            trace_id: A specific trace of the turn; defaults to the latest submission's
+
+        Returns:
+            Trace summary with spans ordered by start, each with its offset
+            from the trace start, depth in the span tree and duration
+        """
+        context = TraceContext.parse(turn.get("trace"))
+        trace_id = trace_id or (context.trace_id if context else None)
+
+        spans = []
+        if trace_id:
+            spans = await self.collection.find(
+                {"trace_id": trace_id, "turn_id": turn["id"]},
+                {"_id": 0, "created_at": 0, "turn_id": 0, "trace_id": 0}
+            ).sort("start", ASCENDING).to_list(length=1000)
+
+        waterfall = {
+            "turn_id": turn["id"],
+            "trace_id": trace_id,
+            "status": turn.get("status"),
+            "started_at": None,
+            "duration_ms": 0.0,
+            "stages": {},
+            "spans": []
+        }
+        if not spans:
+            return waterfall
+
+        trace_start = min(span["start"] for span in spans)
+        trace_end = max(span["end"] for span in spans)
+        parents = {span["span_id"]: span.get("parent_span_id") for span in spans}
+
+        def depth(span: Dict[str, Any]) -> int:
+            # The root span is only written once the turn finishes
+            level, parent = 0, span.get("parent_span_id")
+            while parent is not None and level < 10:
+                level, parent = level + 1, parents.get(parent)
+            return level
+
+        # Time per lifecycle stage (children of the root span); retries add up
+        stages: Dict[str, float] = {}
+        for span in spans:
+            span["offset_ms"] = round((span["start"] - trace_start).total_seconds() * 1000, 3)
+            span["depth"] = depth(span)
+            if span["depth"] == 1:
+                stages[span["name"]] = round(stages.get(span["name"], 0.0) + span["duration_ms"], 3)
+
+        # Parents before children that start in the same millisecond
+        spans.sort(key=lambda span: (span["start"], span["depth"]))
+
+        waterfall.update({
+            "started_at": trace_start,
+            "duration_ms": round((trace_end - trace_start).total_seconds() * 1000, 3),
+            "stages": stages,
+            "spans": spans
+        })
+        return waterfall
+
+
+# Singleton instance
+turn_trace_service = TurnTraceService()
@@ -12,7 +12,11 @@ from datetime import datetime
 
 from ..database import get_gamerecords_db
 from ..models import Scene, Chapter, Change, Meta
-from .llm import llm_service
+from .summarization import (
+    summarization_service,
+    scene_summary_placeholder,
+    chapter_summary_placeholder
+)
 
 logger = logging.getLogger(__name__)
 
@@ -87,7 +91,8 @@ class TransitionService:
         current_scene_id: str,
         current_chapter_id: str,
         campaign_id: str,
-        created_by: str = "DungeonMasterAI"
+        created_by: str = "DungeonMasterAI",
+        session_id: Optional[str] = None
     ) -> TransitionResult:
         """
         Process a transition by creating new scene/chapter if needed.
@@ -99,6 +104,7 @@ class TransitionService:
             current_chapter_id: Current chapter ID
             campaign_id: Campaign ID
             created_by: Who triggered the transition
+            session_id: Session to notify when background summaries are ready
 
         Returns:
             TransitionResult with new scene/chapter IDs if created
@@ -113,7 +119,8 @@ class TransitionService:
                 turn_id=turn_id,
                 suggested_name=transition_info.suggested_name,
                 reason=transition_info.reason,
-                created_by=created_by
+                created_by=created_by,
+                session_id=session_id
             )
 
         if transition_info.type == "chapter":
@@ -123,7 +130,8 @@ class TransitionService:
                 turn_id=turn_id,
                 suggested_name=transition_info.suggested_name,
                 reason=transition_info.reason,
-                created_by=created_by
+                created_by=created_by,
+                session_id=session_id
             )
 
         return TransitionResult(transition_occurred=False)
@@ -135,7 +143,8 @@ class TransitionService:
         turn_id: str,
         suggested_name: Optional[str],
         reason: Optional[str],
-        created_by: str
+        created_by: str,
+        session_id: Optional[str] = None
     ) -> TransitionResult:
         """
         Create a new scene in the current chapter.
@@ -162,7 +171,7 @@ class TransitionService:
             raise ValueError(f"Scene {current_scene_id} not found")
 
         # Close current scene
-        await self._close_scene(current_scene_id, reason or "Scene transition")
+        await self._close_scene(current_scene_id, reason or "Scene transition", session_id)
 
         # Get chapter to determine participants
         chapter = await db.chapters.find_one({"id": current_chapter_id})
@@ -211,7 +220,8 @@ class TransitionService:
         turn_id: str,
         suggested_name: Optional[str],
         reason: Optional[str],
-        created_by: str
+        created_by: str,
+        session_id: Optional[str] = None
     ) -> TransitionResult:
         """
         Create a new chapter (and initial scene).
@@ -241,12 +251,12 @@ class TransitionService:
             raise ValueError(f"Scene {current_scene_id} not found")
 
         # Close current scene
-        await self._close_scene(current_scene_id, reason or "Chapter transition")
+        await self._close_scene(current_scene_id, reason or "Chapter transition", session_id)
 
         # Get and close current chapter
         current_chapter_id = current_scene.get("chapter_id")
         if current_chapter_id:
-            await self._close_chapter(current_chapter_id, reason or "Chapter transition")
+            await self._close_chapter(current_chapter_id, reason or "Chapter transition", session_id)
 
         # Get campaign to determine next chapter order
         campaign = await db.campaigns.find_one({"id": campaign_id})
@@ -320,39 +330,28 @@ class TransitionService:
             scene_name="Opening Scene"
         )
 
-    async def _close_scene(self, scene_id: str, reason: str):
-        """Mark a scene as completed with LLM-generated summary."""
+    async def _close_scene(self, scene_id: str, reason: str, session_id: Optional[str] = None):
+        """
+        Mark a scene as completed and queue its LLM summary.
+
+        The scene gets a placeholder summary right away; the summary job
+        patches it and emits scene_summary_ready when done.
+        """
         db = get_gamerecords_db()
 
-        # Get scene with its turns
-        scene = await db.scenes.find_one({"id": scene_id})
+        scene = await db.scenes.find_one({"id": scene_id}, {"name": 1})
         if not scene:
             return
 
         scene_name = scene.get("name", "Unnamed Scene")
-        turn_ids = scene.get("turns", [])
-        
-        # Fetch turn documents for summarization
-        turns = []
-        if turn_ids:
-            cursor = db.turns.find({"id": {"$in": turn_ids}}).sort("order", 1)
-            turns = await cursor.to_list(length=100)
-
-        # Generate LLM summary (async, but don't block on failure)
-        try:
-            summary = await llm_service.summarize_scene(scene_name, turns)
-            logger.info(f"Generated LLM summary for scene {scene_id}")
-        except Exception as e:
-            logger.warning(f"LLM summarization failed for scene {scene_id}: {e}")
-            # Fallback to simple summary
-            summary = f"*{scene_name}* completed. {len(turns)} turns. {reason}"
 
         await db.scenes.update_one(
             {"id": scene_id},
             {
                 "$set": {
                     "status": "completed",
-                    "summary": summary
+                    "summary": scene_summary_placeholder(scene_name),
+                    "summary_status": "pending"
                 },
                 "$push": {
                     "changes": {
@@ -364,41 +363,32 @@ class TransitionService:
             }
         )
 
-        logger.info(f"Closed scene {scene_id}")
+        await summarization_service.enqueue_scene_summary(scene_id, reason, session_id)
+
+        logger.info(f"Closed scene {scene_id}, summary queued")
 
-    async def _close_chapter(self, chapter_id: str, reason: str):
-        """Mark a chapter as completed with LLM-generated summary."""
+    async def _close_chapter(self, chapter_id: str, reason: str, session_id: Optional[str] = None):
+        """
+        Mark a chapter as completed and queue its LLM summary.
+
+        The chapter gets a placeholder summary right away; the summary job
+        patches it and emits chapter_summary_ready when done.
+        """
         db = get_gamerecords_db()
 
-        # Get chapter with its scenes
-        chapter = await db.chapters.find_one({"id": chapter_id})
+        chapter = await db.chapters.find_one({"id": chapter_id}, {"name": 1})
         if not chapter:
             return
 
         chapter_name = chapter.get("name", "Unnamed Chapter")
-        scene_ids = chapter.get("scenes", [])
-        
-        # Fetch scene documents for summarization
-        scenes = []
-        if scene_ids:
-            cursor = db.scenes.find({"id": {"$in": scene_ids}}).sort("_id", 1)
-            scenes = await cursor.to_list(length=50)
-
-        # Generate LLM summary (async, but don't block on failure)
-        try:
-            summary = await llm_service.summarize_chapter(chapter_name, scenes)
-            logger.info(f"Generated LLM summary for chapter {chapter_id}")
-        except Exception as e:
-            logger.warning(f"LLM summarization failed for chapter {chapter_id}: {e}")
-            # Fallback to simple summary
-            summary = f"**{chapter_name}** completed. {len(scenes)} scenes. {reason}"
 
         await db.chapters.update_one(
             {"id": chapter_id},
             {
                 "$set": {
                     "status": "completed",
-                    "summary": summary
+                    "summary": chapter_summary_placeholder(chapter_name),
+                    "summary_status": "pending"
                 },
                 "$push": {
                     "changes": {
@@ -410,4 +400,6 @@ class TransitionService:
             }
         )
 
-        logger.info(f"Closed chapter {chapter_id}")
+        await summarization_service.enqueue_chapter_summary(chapter_id, reason, session_id)
+
+        logger.info(f"Closed chapter {chapter_id}, summary queued")
@@ -0,0 +1,313 @@
+"""
+Durable turn dispatch to n8n.
+
+Submitted turns are stored as jobs in the turn_jobs collection. A pool of
+workers claims them with a lease and posts the context bundle to the n8n
+DungeonMaster webhook, retrying with exponential backoff. The pool size bounds
+concurrency toward n8n.
+
+The v2 workflow answers the webhook after its last node, i.e. after the whole
+LLM run. A read timeout (or the connection dropping while waiting for that
+answer) therefore means the bundle was delivered and the result will arrive
+through the callback; retrying it would start the same turn again. Every other
+transport error (connect, write, pool, protocol or proxy errors) means n8n
+never got the whole request, so it is retried like a 5xx response.
+
+A reaper marks turns that stay in "processing" for too long (dispatch never
+succeeded, or n8n never called back) as failed and notifies the session, so
+no turn is stuck forever.
+"""
+import asyncio
+import logging
+import uuid
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional
+
+import httpx
+
+from ..config import (
+    N8N_DUNGEONMASTER_V2_WEBHOOK,
+    TURN_DISPATCH_WORKERS,
+    TURN_DISPATCH_MAX_ATTEMPTS,
+    TURN_DISPATCH_TIMEOUT,
+    TURN_DISPATCH_BACKOFF_BASE,
+    TURN_PROCESSING_TIMEOUT,
+    TURN_REAPER_INTERVAL,
+    JOB_POLL_INTERVAL
+)
+from ..database import get_gamerecords_db
+from ..metrics import record_turn_transition, track_upstream
+from .context_assembly import ContextBundle
+from .event_bus import event_bus
+from .job_queue import JobQueue
+from .tracing import TraceContext, turn_trace_service
+
+logger = logging.getLogger(__name__)
+
+
+TURN_DISPATCH_JOB = "turn_dispatch"
+
+# Upper bound for the exponential backoff between attempts (seconds)
+MAX_BACKOFF_SECONDS = 60.0
+
+
+class PermanentDispatchError(Exception):
+    """n8n rejected the request; retrying will not help."""
+    pass
+
+
+class TurnDispatchService:
+    """Queues turns for n8n and runs the dispatch worker pool and reaper."""
+
+    def __init__(self):
+        """Initialize the turn dispatch service."""
+        self.queue = JobQueue(
+            "turn_jobs",
+            lease_seconds=TURN_DISPATCH_TIMEOUT * 3,
+            max_attempts=TURN_DISPATCH_MAX_ATTEMPTS
+        )
+        self.webhook_url = N8N_DUNGEONMASTER_V2_WEBHOOK
+        self.num_workers = TURN_DISPATCH_WORKERS
+        self.dispatch_timeout = TURN_DISPATCH_TIMEOUT
+        self.backoff_base = TURN_DISPATCH_BACKOFF_BASE
+        self.processing_timeout = TURN_PROCESSING_TIMEOUT
+        self.reaper_interval = TURN_REAPER_INTERVAL
+        self.poll_interval = JOB_POLL_INTERVAL
+        self._wakeup = asyncio.Event()
+
+    # ============== Producer ==============
+
+    async def enqueue_turn(
+        self,
+        turn_id: str,
+        session_id: str,
+        context_bundle: ContextBundle,
+        submission_key: str
+    ) -> Dict[str, Any]:
+        """
+        Queue a turn's context bundle for dispatch to n8n.
+
+        At most one job is created per (turn, submission_key).
+        """
+        job = await self.queue.enqueue(TURN_DISPATCH_JOB, {
+            "turn_id": turn_id,
+            "session_id": session_id,
+            # mode='json' serializes datetime objects
+            "bundle": context_bundle.model_dump(mode='json')
+        }, dedup_key=f"{turn_id}:{submission_key}")
+        self._wakeup.set()
+        return job
+
+    # ============== Workers ==============
+
+    def start(self) -> List[asyncio.Task]:
+        """Start the dispatch workers and the reaper. Returns their tasks."""
+        tasks = [
+            asyncio.create_task(self.run_worker(f"dispatcher-{uuid.uuid4().hex[:8]}"))
+            for _ in range(self.num_workers)
+        ]
+        tasks.append(asyncio.create_task(self.run_reaper()))
+        logger.info(f"Started {self.num_workers} turn dispatch workers and reaper")
+        return tasks
+
+    async def run_worker(self, worker_id: str):
+        """Claim and dispatch turn jobs until cancelled."""
+        while True:
+            try:
+                job = await self.queue.claim(worker_id)
+            except Exception as e:
+                logger.error(f"Dispatch worker {worker_id} failed to claim job: {e}")
+                job = None
+
+            if job is None:
+                # Sleep until a new job is enqueued or the poll interval passes
+                self._wakeup.clear()
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout=self.poll_interval)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+
+            await self._process_job(job)
+
+    async def _process_job(self, job: Dict[str, Any]):
+        """Dispatch one job and record the outcome."""
+        payload = job.get("payload", {})
+        turn_id = payload.get("turn_id")
+        bundle = payload.get("bundle") or {}
+        trace = turn_trace_service.start(turn_id, TraceContext.parse(bundle.get("trace")))
+        if isinstance(job.get("available_at"), datetime):
+            trace.add_span(
+                "queue_wait", job["available_at"], datetime.utcnow(), attempt=job.get("attempts")
+            )
+
+        try:
+            if not await self._turn_is_processing(turn_id):
+                # Reaped, completed by a late callback, or deleted meanwhile
+                logger.info(f"Skipping dispatch of turn {turn_id}: no longer processing")
+                await self.queue.complete(job["id"], {"skipped": True})
+                return
+
+            with trace.span("dispatch", attempt=job.get("attempts")):
+                await self._dispatch(payload["bundle"])
+            await self.queue.complete(job["id"])
+            logger.info(f"Dispatched turn {turn_id} to n8n (attempt {job.get('attempts')})")
+
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            permanent = isinstance(e, PermanentDispatchError)
+            delay = min(self.backoff_base * 2 ** (job.get("attempts", 1) - 1), MAX_BACKOFF_SECONDS)
+            will_retry = await self.queue.fail(
+                job, str(e), retry_delay_seconds=delay, permanent=permanent
+            )
+            if not will_retry:
+                await self.fail_turn(
+                    turn_id,
+                    payload.get("session_id"),
+                    f"Could not dispatch turn to DungeonMaster AI: {e}"
+                )
+        finally:
+            await trace.flush()
+
+    async def _dispatch(self, bundle: Dict[str, Any]):
+        """
+        Post a context bundle to the n8n webhook.
+
+        Raises on failure; 4xx responses raise PermanentDispatchError. Returns
+        normally once n8n accepted the request, or once the whole request was
+        sent and n8n did not answer in time (read timeout).
+        """
+        headers = {"Content-Type": "application/json"}
+        trace = TraceContext.parse(bundle.get("trace"))
+        if trace:
+            headers["traceparent"] = trace.traceparent
+
+        with track_upstream("n8n", "dungeonmaster_v2") as call:
+            try:
+                async with httpx.AsyncClient(timeout=self.dispatch_timeout) as client:
+                    response = await client.post(
+                        self.webhook_url,
+                        json=bundle,
+                        headers=headers
+                    )
+            except (httpx.ReadTimeout, httpx.RemoteProtocolError) as e:
+                # Delivered; the workflow is running and will call back. If
+                # it never does, the reaper fails the turn. Any other
+                # transport error propagates and is retried.
+                call.status = "sent"
+                logger.info(f"n8n accepted turn {bundle.get('turn_id')} without answering ({type(e).__name__})")
+                return
+            call.status = response.status_code
+
+        if 400 <= response.status_code < 500:
+            raise PermanentDispatchError(
+                f"n8n webhook returned status {response.status_code}"
+            )
+        if response.status_code >= 500:
+            raise RuntimeError(f"n8n webhook returned status {response.status_code}")
+
+    async def _turn_is_processing(self, turn_id: str) -> bool:
+        db = get_gamerecords_db()
+        turn = await db.turns.find_one({"id": turn_id}, {"status": 1})
+        return bool(turn) and turn.get("status") == "processing"
+
+    # ============== Reaper ==============
+
+    async def run_reaper(self):
+        """Periodically fail turns stuck in processing until cancelled."""
+        while True:
+            try:
+                await self.reap_stuck_turns()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Turn reaper error: {e}")
+            await asyncio.sleep(self.reaper_interval)
+
+    async def reap_stuck_turns(self) -> int:
+        """
+        Mark turns processing longer than processing_timeout as failed.
+
+        Returns the number of turns reaped.
+        """
+        db = get_gamerecords_db()
+        cutoff = datetime.utcnow() - timedelta(seconds=self.processing_timeout)
+
+        stuck = await db.turns.find(
+            {"status": "processing", "processing_started_at": {"$lt": cutoff}},
+            {"id": 1, "session_id": 1}
+        ).to_list(length=100)
+
+        reaped = 0
+        for turn in stuck:
+            turn_id = turn["id"]
+            session_id = turn.get("session_id")
+            if not session_id:
+                # Turns submitted before session_id was stored on the turn
+                job = await self.queue.collection.find_one(
+                    {"payload.turn_id": turn_id},
+                    {"payload.session_id": 1},
+                    sort=[("created_at", -1)]
+                )
+                session_id = job.get("payload", {}).get("session_id") if job else None
+
+            if await self.fail_turn(
+                turn_id,
+                session_id,
+                f"Turn processing timed out after {int(self.processing_timeout)}s"
+            ):
+                reaped += 1
+
+        if reaped:
+            logger.warning(f"Reaper marked {reaped} stuck turns as failed")
+        return reaped
+
+    async def fail_turn(
+        self,
+        turn_id: str,
+        session_id: Optional[str],
+        error: str
+    ) -> bool:
+        """
+        Move a processing turn to failed and notify the session.
+
+        Conditional on the turn still processing, so a callback that completes
+        the turn concurrently wins. Returns True if the turn was failed.
+        """
+        db = get_gamerecords_db()
+
+        turn = await db.turns.find_one_and_update(
+            {"id": turn_id, "status": "processing"},
+            {
+                "$set": {"status": "failed", "error": error},
+                "$push": {
+                    "changes": {
+                        "by": "system",
+                        "at": datetime.utcnow(),
+                        "type": "failed"
+                    }
+                }
+            },
+            projection={"trace": 1, "processing_started_at": 1}
+        )
+        if not turn:
+            return False
+        record_turn_transition("processing", "failed")
+
+        trace = turn_trace_service.start(turn_id, TraceContext.parse(turn.get("trace")))
+        trace.end_turn(turn.get("processing_started_at"), "failed", error)
+        await trace.flush()
+
+        # Don't dispatch a turn that already failed
+        await self.queue.cancel({"payload.turn_id": turn_id})
+
+        logger.warning(f"Turn {turn_id} failed: {error}")
+
+        await event_bus.publish("turn_failed", session_id, {"turn_id": turn_id, "error": error})
+
+        return True
+
+
+# Singleton instance
+turn_dispatch_service = TurnDispatchService()
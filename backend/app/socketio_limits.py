@@ -0,0 +1,198 @@
+"""
+Rate limits and backpressure for Socket.IO traffic.
+
+Incoming events (everything clients relay to their table):
+- packets larger than SOCKETIO_MAX_EVENT_BYTES are dropped before decoding
+- relay handlers are wrapped with @rate_limited: a token bucket per client
+  sid and one per session; events over either limit are dropped and the
+  client is told (at most once per second)
+
+Outgoing packets: Engine.IO queues packets per client without bound. When a
+client's queue is longer than SOCKETIO_CLIENT_QUEUE_LIMIT, action draft
+events (STALE_EVENTS) are dropped and the client is sent resync_required
+once its queue has drained, so it reloads the drafts it missed. Past
+SOCKETIO_CLIENT_QUEUE_HARD_LIMIT the client is disconnected; it reconnects
+and reloads.
+
+Every drop is counted in socketio_events_rejected_total or
+socketio_packets_dropped_total.
+"""
+import functools
+import logging
+import time
+from typing import Dict, Optional, Set
+
+from . import metrics
+from .config import (
+    SOCKETIO_CLIENT_QUEUE_HARD_LIMIT,
+    SOCKETIO_CLIENT_QUEUE_LIMIT,
+    SOCKETIO_EVENT_BURST,
+    SOCKETIO_EVENT_RATE,
+    SOCKETIO_SESSION_EVENT_BURST,
+    SOCKETIO_SESSION_EVENT_RATE
+)
+
+logger = logging.getLogger(__name__)
+
+# Action draft state, which a lagging client reloads on resync_required, so
+# these may be dropped for it
+STALE_EVENTS = {
+    'action_drafts_batch',
+    'action_draft_created',
+    'action_draft_deleted',
+    'action_draft_reordered',
+}
+
+
+class TokenBucket:
+    """Allows `rate` events per second on average, bursts up to `burst`."""
+
+    def __init__(self, rate: float, burst: float):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = burst
+        self.updated = time.monotonic()
+
+    def take(self, cost: float = 1.0) -> bool:
+        """Take tokens for one event; False if the bucket is empty."""
+        now = time.monotonic()
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        if self.tokens < cost:
+            return False
+        self.tokens -= cost
+        return True
+
+
+class EventLimiter:
+    """Token buckets per client sid and per session."""
+
+    def __init__(self):
+        """Initialize the event limiter."""
+        self.sid_buckets: Dict[str, TokenBucket] = {}
+        self.session_buckets: Dict[str, TokenBucket] = {}
+        # Last "rate limited" notice per sid (monotonic seconds)
+        self.notified: Dict[str, float] = {}
+
+    def check(self, sid: str, session_id: Optional[str]) -> Optional[str]:
+        """
+        Count an event against the client's and the session's limits.
+
+        Returns:
+            None if allowed, else the exhausted limit ("sid" or "session")
+        """
+        bucket = self.sid_buckets.get(sid)
+        if bucket is None:
+            bucket = self.sid_buckets[sid] = TokenBucket(SOCKETIO_EVENT_RATE, SOCKETIO_EVENT_BURST)
+        if not bucket.take():
+            return "sid"
+        if session_id:
+            bucket = self.session_buckets.get(session_id)
+            if bucket is None:
+                if len(self.session_buckets) > 10000:
+                    self._prune_sessions()
+                bucket = self.session_buckets[session_id] = TokenBucket(
+                    SOCKETIO_SESSION_EVENT_RATE, SOCKETIO_SESSION_EVENT_BURST
+                )
+            if not bucket.take():
+                return "session"
+        return None
+
+    def should_notify(self, sid: str) -> bool:
+        """Whether to tell a client it is being limited (once per second)."""
+        now = time.monotonic()
+        if now - self.notified.get(sid, 0.0) < 1.0:
+            return False
+        self.notified[sid] = now
+        return True
+
+    def forget(self, sid: str):
+        """Drop the state of a disconnected client."""
+        self.sid_buckets.pop(sid, None)
+        self.notified.pop(sid, None)
+
+    def _prune_sessions(self):
+        """Drop session buckets that have refilled (sessions gone quiet)."""
+        now = time.monotonic()
+        for session_id, bucket in list(self.session_buckets.items()):
+            if bucket.tokens + (now - bucket.updated) * bucket.rate >= bucket.burst:
+                del self.session_buckets[session_id]
+
+
+# Singleton instance
+event_limiter = EventLimiter()
+
+
+def rate_limited(handler):
+    """
+    Apply the event limits to a Socket.IO handler taking (sid, data).
+
+    Payloads that are not objects are rejected as well.
+    """
+    event = handler.__name__
+
+    @functools.wraps(handler)
+    async def wrapper(sid, data=None):
+        if not isinstance(data, dict):
+            metrics.SOCKETIO_EVENTS_REJECTED.labels(event, "invalid").inc()
+            return
+        limit = event_limiter.check(sid, data.get('session_id'))
+        if limit:
+            metrics.SOCKETIO_EVENTS_REJECTED.labels(event, f"rate_{limit}").inc()
+            if event_limiter.should_notify(sid):
+                from .socketio_manager import sio
+                await sio.emit('rate_limited', {'event': event, 'limit': limit}, to=sid)
+            return
+        return await handler(sid, data)
+
+    return wrapper
+
+
+class OutgoingBackpressure:
+    """Decides per client whether an outgoing packet is queued."""
+
+    def __init__(self):
+        """Initialize outgoing backpressure tracking."""
+        # Engine.IO sids that had stale events dropped and need a resync
+        self.needs_resync: Set[str] = set()
+
+    def admit(self, eio_socket, eio_sid: str, event: str) -> str:
+        """
+        Check a client's outgoing queue before queueing a packet.
+
+        Args:
+            eio_socket: The client's Engine.IO socket (None if gone)
+            eio_sid: The client's Engine.IO sid
+            event: Event being sent
+
+        Returns:
+            "send", "drop" (superseded event, client lags) or "disconnect"
+        """
+        if eio_socket is None:
+            return "send"
+        queued = eio_socket.queue.qsize()
+        if queued >= SOCKETIO_CLIENT_QUEUE_HARD_LIMIT:
+            metrics.SOCKETIO_PACKETS_DROPPED.labels(event, "slow_client").inc()
+            return "disconnect"
+        if queued >= SOCKETIO_CLIENT_QUEUE_LIMIT and event in STALE_EVENTS:
+            metrics.SOCKETIO_PACKETS_DROPPED.labels(event, "backpressure").inc()
+            self.needs_resync.add(eio_sid)
+            return "drop"
+        return "send"
+
+    def take_resync(self, eio_socket, eio_sid: str) -> bool:
+        """True once a lagging client has drained and should reload its state."""
+        if eio_sid not in self.needs_resync:
+            return False
+        if eio_socket is not None and eio_socket.queue.qsize() >= SOCKETIO_CLIENT_QUEUE_LIMIT:
+            return False
+        self.needs_resync.discard(eio_sid)
+        return eio_socket is not None
+
+    def forget(self, eio_sid: str):
+        """Drop the state of a disconnected client."""
+        self.needs_resync.discard(eio_sid)
+
+
+# Singleton instance
+outgoing_backpressure = OutgoingBackpressure()
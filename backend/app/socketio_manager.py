@@ -1,27 +1,163 @@
 """
 Socket.io manager for real-time gameplay features.
 Handles player presence, action list updates, ready states, and chat.
+
+Runs on any number of backend workers: with SOCKETIO_MESSAGE_QUEUE set, room
+emits are published on Redis or RabbitMQ and delivered by whichever worker
+holds each client's socket, and presence is kept in a shared store (see
+services.presence) that every worker refreshes for its own clients.
+Incoming events are rate limited and slow clients are shed (see
+socketio_limits).
+
+Events emitted to a session room are numbered (`seq` in the payload) and
+logged, so a reconnecting client sends the last seq it saw with join_session
+and is sent only what it missed (see services.session_event_log).
 """
+import asyncio
+import logging
+from typing import Optional, Set
+from urllib.parse import urlsplit
+
 import socketio
-from typing import Dict, Set
+from fastapi.encoders import jsonable_encoder
+from pydantic import ValidationError
+from socketio import packet
+
+from . import metrics
+from .config import (
+    PRESENCE_HEARTBEAT_INTERVAL,
+    SOCKETIO_CHANNEL,
+    SOCKETIO_COMPRESSION_THRESHOLD,
+    SOCKETIO_MAX_EVENT_BYTES,
+    SOCKETIO_MESSAGE_QUEUE
+)
+from .socketio_limits import event_limiter, outgoing_backpressure, rate_limited
+from .socketio_serialization import (
+    AioPikaClientManager,
+    NegotiatedSerializerManager,
+    NegotiatedSerializerServer,
+    RedisClientManager
+)
+from .models import Session, Turn
+from .services.draft_batcher import action_draft_batcher
+from .services.event_bus import event_bus
+from .services.presence import presence_store
+from .services.session_event_log import UNLOGGED_EVENTS, session_event_log
+
+logger = logging.getLogger(__name__)
+
+
+def create_client_manager(url: str = SOCKETIO_MESSAGE_QUEUE) -> socketio.AsyncManager:
+    """
+    Client manager that delivers emits to clients, possibly on other workers.
+
+    Args:
+        url: Message queue URL; redis://, rediss:// or unix:// use Redis,
+            amqp:// or amqps:// use RabbitMQ, empty keeps everything in process
+
+    Returns:
+        A socketio client manager
+    """
+    if not url:
+        return NegotiatedSerializerManager()
+    scheme = urlsplit(url).scheme
+    if scheme in ("redis", "rediss", "unix"):
+        return RedisClientManager(url, channel=SOCKETIO_CHANNEL)
+    if scheme in ("amqp", "amqps"):
+        return AioPikaClientManager(url, channel=SOCKETIO_CHANNEL)
+    raise ValueError(f"Unsupported SOCKETIO_MESSAGE_QUEUE scheme: {scheme!r}")
+
+
+class InstrumentedAsyncServer(NegotiatedSerializerServer):
+    """
+    AsyncServer that counts emitted events per event name (JSON or msgpack per
+    client) and numbers and logs events emitted to session rooms.
+    """
+
+    async def emit(self, event, data=None, to=None, room=None, **kwargs):
+        metrics.SOCKETIO_EMITS.labels(event).inc()
+        target = to or room
+        if (isinstance(target, str) and target.startswith('session:') and isinstance(data, dict)
+                and event not in UNLOGGED_EVENTS):
+            skip_sid = kwargs.get('skip_sid')
+            data = await session_event_log.append(
+                target[len('session:'):], event, data,
+                sender=skip_sid if isinstance(skip_sid, str) else None
+            )
+        return await super().emit(event, data, to=to, room=room, **kwargs)
+
+    async def admit_packet(self, eio_sid, event):
+        """Apply outgoing backpressure (see socketio_limits)."""
+        eio_socket = self.eio.sockets.get(eio_sid)
+        decision = outgoing_backpressure.admit(eio_socket, eio_sid, event)
+        if decision == "disconnect":
+            logger.warning(f"Disconnecting slow Socket.IO client {eio_sid} ({eio_socket.queue.qsize()} packets queued)")
+            asyncio.create_task(self.eio.disconnect(eio_sid))
+            return False
+        if decision == "drop":
+            return False
+        if outgoing_backpressure.take_resync(eio_socket, eio_sid):
+            await self._send_packet(eio_sid, self.packet_class(
+                packet.EVENT, namespace='/', data=['resync_required', {'reason': 'backpressure'}]
+            ))
+        return True
+
+    async def _handle_eio_message(self, eio_sid, data):
+        if len(data) > SOCKETIO_MAX_EVENT_BYTES:
+            metrics.SOCKETIO_EVENTS_REJECTED.labels("unknown", "too_large").inc()
+            logger.warning(f"Dropped {len(data)} byte Socket.IO packet from {eio_sid}")
+            return
+        return await super()._handle_eio_message(eio_sid, data)
+
+    async def _handle_eio_disconnect(self, eio_sid, *args):
+        outgoing_backpressure.forget(eio_sid)
+        return await super()._handle_eio_disconnect(eio_sid, *args)
+
 
 # Create Socket.IO server
-sio = socketio.AsyncServer(
+sio = InstrumentedAsyncServer(
     async_mode='asgi',
+    client_manager=create_client_manager(),
+    # Deflate long-polling responses above the threshold; websocket frames are
+    # compressed by the ASGI server (uvicorn negotiates permessage-deflate)
+    http_compression=True,
+    compression_threshold=SOCKETIO_COMPRESSION_THRESHOLD,
     cors_allowed_origins='*',
     logger=True,
     engineio_logger=True
 )
 
-# Track active sessions and connected players
-# Structure: {session_id: {player_id: sid}}
-active_sessions: Dict[str, Dict[str, str]] = {}
+# Client sids connected to this worker
+connected_sids: Set[str] = set()
+
+
+def _local_session_count() -> int:
+    """Session rooms with at least one client on this worker."""
+    rooms = sio.manager.rooms.get('/', {})
+    return sum(1 for room, members in rooms.items() if room and room.startswith('session:') and members)
+
+
+metrics.SOCKETIO_ACTIVE_SESSIONS.set_function(_local_session_count)
+metrics.SOCKETIO_CONNECTED_SIDS.set_function(lambda: len(connected_sids))
+metrics.SOCKETIO_MSGPACK_CLIENTS.set_function(lambda: len(sio.msgpack_clients))
+
+
+async def run_presence_heartbeat():
+    """Keep the presence of this worker's clients alive (background task)."""
+    logger.info(f"Presence heartbeat started (every {PRESENCE_HEARTBEAT_INTERVAL}s)")
+    while True:
+        await asyncio.sleep(PRESENCE_HEARTBEAT_INTERVAL)
+        try:
+            await presence_store.heartbeat(connected_sids)
+        except Exception as e:
+            logger.error(f"Presence heartbeat failed: {e}")
 
 
 @sio.event
 async def connect(sid, environ):
     """Handle client connection."""
     print(f"Client connected: {sid}")
+    connected_sids.add(sid)
     await sio.emit('connected', {'sid': sid}, to=sid)
 
 
@@ -29,33 +165,31 @@ async def connect(sid, environ):
 async def disconnect(sid):
     """Handle client disconnection."""
     print(f"Client disconnected: {sid}")
+    connected_sids.discard(sid)
+    event_limiter.forget(sid)
 
-    # Remove from active sessions
-    for session_id, players in active_sessions.items():
-        for player_id, player_data in list(players.items()):
-            if isinstance(player_data, dict) and player_data.get('sid') == sid:
-                del players[player_id]
-                # Notify other players in session
-                await sio.emit('player_disconnected', {
-                    'player_id': player_id,
-                    'session_id': session_id
-                }, room=f"session:{session_id}")
-                break
-            elif player_data == sid:  # Legacy support
-                del players[player_id]
-                await sio.emit('player_disconnected', {
-                    'player_id': player_id,
-                    'session_id': session_id
-                }, room=f"session:{session_id}")
-                break
+    # Remove from presence; players with another tab still open stay online
+    for session_id, player_id in await presence_store.remove_sid(sid):
+        await sio.emit('player_disconnected', {
+            'player_id': player_id,
+            'session_id': session_id
+        }, room=f"session:{session_id}")
 
 
 @sio.event
+@rate_limited
 async def join_session(sid, data):
-    """Player joins a game session."""
+    """
+    Player joins a game session.
+
+    A reconnecting client sends `last_seq`, the last session event seq it
+    saw, and gets the events it missed in session_joined.missed_events, or
+    resync_required when they are no longer all logged.
+    """
     session_id = data.get('session_id')
     player_id = data.get('player_id')
     player_name = data.get('player_name')
+    last_seq = data.get('last_seq')
 
     if not session_id or not player_id:
         await sio.emit('error', {'message': 'Missing session_id or player_id'}, to=sid)
@@ -65,39 +199,49 @@ async def join_session(sid, data):
     await sio.enter_room(sid, f"session:{session_id}")
 
     # Track player in session with their info
-    if session_id not in active_sessions:
-        active_sessions[session_id] = {}
-    active_sessions[session_id][player_id] = {
-        'sid': sid,
-        'player_name': player_name,
-        'player_id': player_id
-    }
+    first_client = await presence_store.join(session_id, player_id, sid, player_name)
 
     # Build full player list for broadcast
     players_list = [
         {
-            'player_id': pid,
-            'player_name': pdata['player_name'],
+            'player_id': player['player_id'],
+            'player_name': player['player_name'],
             'online': True
         }
-        for pid, pdata in active_sessions[session_id].items()
+        for player in await presence_store.list_players(session_id)
     ]
 
-    # Notify other players
-    await sio.emit('player_joined', {
-        'player_id': player_id,
-        'player_name': player_name,
-        'session_id': session_id
-    }, room=f"session:{session_id}", skip_sid=sid)
+    # Notify other players (not again for another tab of the same player)
+    if first_client:
+        await sio.emit('player_joined', {
+            'player_id': player_id,
+            'player_name': player_name,
+            'session_id': session_id
+        }, room=f"session:{session_id}", skip_sid=sid)
+
+    # Events the client missed while disconnected
+    missed_events = []
+    if isinstance(last_seq, int) and not isinstance(last_seq, bool):
+        seq, missed = await session_event_log.since(session_id, last_seq)
+        metrics.SOCKETIO_REPLAYS.labels("gap" if missed is None else "replayed").inc()
+        missed_events = missed or []
+    else:
+        seq, missed = await session_event_log.current_seq(session_id), []
 
     # Send current session state to joining player
     await sio.emit('session_joined', {
         'session_id': session_id,
-        'players_online': players_list
+        'players_online': players_list,
+        'seq': seq,
+        'missed_events': missed_events
     }, to=sid)
 
+    if missed is None:
+        await sio.emit('resync_required', {'reason': 'replay_gap'}, to=sid)
+
 
 @sio.event
+@rate_limited
 async def leave_session(sid, data):
     """Player leaves a game session."""
     session_id = data.get('session_id')
@@ -107,20 +251,18 @@ async def leave_session(sid, data):
         # Leave session room
         await sio.leave_room(sid, f"session:{session_id}")
 
-        # Remove from tracking
-        if session_id in active_sessions and player_id in active_sessions[session_id]:
-            del active_sessions[session_id][player_id]
-
-        # Notify other players
-        await sio.emit('player_left', {
-            'player_id': player_id,
-            'session_id': session_id
-        }, room=f"session:{session_id}")
+        # Remove from tracking; notify other players once the last tab has left
+        if await presence_store.leave(session_id, player_id, sid):
+            await sio.emit('player_left', {
+                'player_id': player_id,
+                'session_id': session_id
+            }, room=f"session:{session_id}")
 
 
 # ============== ACTION LIST EVENTS ==============
 
 @sio.event
+@rate_limited
 async def action_draft_created(sid, data):
     """Broadcast new action draft to session."""
     session_id = data.get('session_id')
@@ -129,14 +271,16 @@ async def action_draft_created(sid, data):
 
 
 @sio.event
+@rate_limited
 async def action_draft_updated(sid, data):
-    """Broadcast action draft update to session."""
+    """Queue action draft update for the session's next action_drafts_batch."""
     session_id = data.get('session_id')
     if session_id:
-        await sio.emit('action_draft_updated', data, room=f"session:{session_id}", skip_sid=sid)
+        action_draft_batcher.queue_draft(session_id, data, sid)
 
 
 @sio.event
+@rate_limited
 async def action_draft_deleted(sid, data):
     """Broadcast action draft deletion to session."""
     session_id = data.get('session_id')
@@ -146,6 +290,7 @@ async def action_draft_deleted(sid, data):
 
 
 @sio.event
+@rate_limited
 async def action_draft_reordered(sid, data):
     """Broadcast action list reorder to session."""
     session_id = data.get('session_id')
@@ -157,69 +302,26 @@ async def action_draft_reordered(sid, data):
 # ============== READY STATE EVENTS ==============
 
 @sio.event
+@rate_limited
 async def ready_state_changed(sid, data):
-    """Broadcast ready state change to session."""
+    """Queue ready state change for the session's next action_drafts_batch."""
     session_id = data.get('session_id')
     player_id = data.get('player_id')
     character_id = data.get('character_id')
     ready = data.get('ready')
 
     if session_id:
-        await sio.emit('ready_state_changed', {
+        action_draft_batcher.queue_ready_state(session_id, {
             'player_id': player_id,
             'character_id': character_id,
             'ready': ready
-        }, room=f"session:{session_id}", skip_sid=sid)
-
-
-# ============== TURN SUBMISSION EVENTS ==============
-
-@sio.event
-async def turn_submitted(sid, data):
-    """Broadcast turn submission to session."""
-    session_id = data.get('session_id')
-    turn_id = data.get('turn_id')
-
-    if session_id and turn_id:
-        await sio.emit('turn_submitted', {
-            'turn_id': turn_id,
-            'status': 'ready_for_agents'
-        }, room=f"session:{session_id}")
-
-
-@sio.event
-async def turn_completed(sid, data):
-    """Broadcast turn completion (Keeper response) to session."""
-    session_id = data.get('session_id')
-    turn_id = data.get('turn_id')
-    reaction = data.get('reaction')
-
-    if session_id and turn_id:
-        await sio.emit('turn_completed', {
-            'turn_id': turn_id,
-            'reaction': reaction
-        }, room=f"session:{session_id}")
-
-
-# ============== MASTER TRANSFER EVENTS ==============
-
-@sio.event
-async def master_transferred(sid, data):
-    """Broadcast master transfer to session."""
-    session_id = data.get('session_id')
-    new_master_id = data.get('new_master_id')
-    new_master_name = data.get('new_master_name')
-
-    if session_id and new_master_id:
-        await sio.emit('master_transferred', {
-            'new_master_id': new_master_id,
-            'new_master_name': new_master_name
-        }, room=f"session:{session_id}")
+        }, sid)
 
 
 # ============== CHAT EVENTS ==============
 
 @sio.event
+@rate_limited
 async def realm_chat_message(sid, data):
     """Broadcast realm chat message to session."""
     session_id = data.get('session_id')
@@ -238,6 +340,7 @@ async def realm_chat_message(sid, data):
 
 
 @sio.event
+@rate_limited
 async def prophet_chat_message(sid, data):
     """Handle private Prophet chat messages (to AI, then back to player)."""
     player_id = data.get('player_id')
@@ -255,6 +358,7 @@ async def prophet_chat_message(sid, data):
 # ============== LATE JOINER EVENTS ==============
 
 @sio.event
+@rate_limited
 async def request_join_active_session(sid, data):
     """Player requests to join active session (needs master approval)."""
     session_id = data.get('session_id')
@@ -263,17 +367,18 @@ async def request_join_active_session(sid, data):
     master_player_id = data.get('master_player_id')
 
     if session_id and master_player_id:
-        # Send approval request to master
-        if session_id in active_sessions and master_player_id in active_sessions[session_id]:
-            master_sid = active_sessions[session_id][master_player_id]
+        # Send approval request to master (possibly connected to another worker)
+        master_sids = await presence_store.get_sids(session_id, master_player_id)
+        if master_sids:
             await sio.emit('join_request', {
                 'player_id': player_id,
                 'player_name': player_name,
                 'requesting_sid': sid
-            }, to=master_sid)
+            }, to=master_sids)
 
 
 @sio.event
+@rate_limited
 async def approve_join_request(sid, data):
     """Master approves late joiner."""
     session_id = data.get('session_id')
@@ -297,6 +402,7 @@ async def approve_join_request(sid, data):
 
 
 @sio.event
+@rate_limited
 async def reject_join_request(sid, data):
     """Master rejects late joiner."""
     requesting_sid = data.get('requesting_sid')
@@ -306,71 +412,170 @@ async def reject_join_request(sid, data):
         await sio.emit('join_rejected', {'reason': reason}, to=requesting_sid)
 
 
-# ============== TURN PROCESSING EVENTS (Phase 3 - Async Architecture) ==============
+# ============== DOMAIN EVENTS (see services.event_bus) ==============
+# Turn, scene, chapter and master changes are published by the REST routes and
+# services that make them and emitted here once, with the full state.
+
+def _model_payload(model, document: dict, kind: str) -> Optional[dict]:
+    """A document as its API model would serialize it (None if it does not validate)."""
+    try:
+        return jsonable_encoder(model(**document))
+    except ValidationError as e:
+        logger.warning(f"Sending {kind} {document.get('id')} without its document: {e}")
+        return None
+
 
-async def emit_turn_processing(session_id: str, turn_id: str):
+@event_bus.on('turn_processing')
+async def emit_turn_processing(session_id: Optional[str], event: dict):
     """
     Notify session that turn is being processed.
 
     Emitted when turn is submitted and enters processing state.
     """
+    if not session_id:
+        return
+    turn = event['turn']
     await sio.emit('turn_processing', {
-        'turn_id': turn_id,
-        'status': 'processing'
+        'turn_id': turn['id'],
+        'status': 'processing',
+        'turn': _model_payload(Turn, turn, 'turn')
     }, room=f"session:{session_id}")
 
 
-async def emit_turn_completed(session_id: str, turn_id: str, reaction: dict, scene_id: str):
+@event_bus.on('turn_completed')
+async def emit_turn_completed(session_id: Optional[str], event: dict):
     """
     Notify session that turn processing is complete.
 
-    Emitted when n8n callback delivers the narrative.
+    Emitted when the Keeper's reaction is stored (n8n callback or sync mode);
+    scene_id is the scene play continues in, after any transition.
     """
+    if not session_id:
+        return
+    turn = event['turn']
     await sio.emit('turn_completed', {
-        'turn_id': turn_id,
-        'reaction': reaction,
-        'scene_id': scene_id,
-        'status': 'completed'
+        'turn_id': turn['id'],
+        'reaction': turn.get('reaction'),
+        'scene_id': event.get('scene_id') or turn.get('scene_id'),
+        'status': 'completed',
+        'turn': _model_payload(Turn, turn, 'turn')
     }, room=f"session:{session_id}")
 
 
-async def emit_turn_failed(session_id: str, turn_id: str, error: str):
+@event_bus.on('turn_failed')
+async def emit_turn_failed(session_id: Optional[str], event: dict):
     """
     Notify session that turn processing failed.
 
     Emitted when an error occurs during processing.
     """
+    if not session_id:
+        return
     await sio.emit('turn_failed', {
-        'turn_id': turn_id,
-        'error': error,
+        'turn_id': event['turn_id'],
+        'error': event['error'],
         'status': 'failed'
     }, room=f"session:{session_id}")
 
 
-async def emit_scene_created(session_id: str, scene: dict):
+@event_bus.on('scene_created')
+async def emit_scene_created(session_id: Optional[str], event: dict):
     """
     Notify session that a new scene was created.
 
     Emitted when LLM detects a scene transition.
     """
+    if not session_id:
+        return
     await sio.emit('scene_created', {
-        'scene_id': scene.get('scene_id'),
-        'name': scene.get('name'),
-        'chapter_id': scene.get('chapter_id')
+        'scene_id': event.get('scene_id'),
+        'name': event.get('name'),
+        'chapter_id': event.get('chapter_id')
     }, room=f"session:{session_id}")
 
 
-async def emit_chapter_created(session_id: str, chapter: dict, scene: dict):
+@event_bus.on('chapter_created')
+async def emit_chapter_created(session_id: Optional[str], event: dict):
     """
     Notify session that a new chapter was created.
 
     Emitted when LLM detects a chapter transition.
     """
+    if not session_id:
+        return
     await sio.emit('chapter_created', {
-        'chapter_id': chapter.get('chapter_id'),
-        'chapter_name': chapter.get('name'),
-        'scene_id': scene.get('scene_id'),
-        'scene_name': scene.get('name')
+        'chapter_id': event.get('chapter_id'),
+        'chapter_name': event.get('name'),
+        'scene_id': event.get('scene_id'),
+        'scene_name': event.get('scene_name')
+    }, room=f"session:{session_id}")
+
+
+@event_bus.on('scene_summary_ready')
+async def emit_scene_summary_ready(session_id: Optional[str], event: dict):
+    """
+    Notify session that a closed scene's summary is available.
+
+    Emitted by the background summary worker.
+    """
+    if not session_id:
+        return
+    await sio.emit('scene_summary_ready', {
+        'scene_id': event['scene_id'],
+        'summary': event['summary']
+    }, room=f"session:{session_id}")
+
+
+@event_bus.on('chapter_summary_ready')
+async def emit_chapter_summary_ready(session_id: Optional[str], event: dict):
+    """
+    Notify session that a closed chapter's summary is available.
+
+    Emitted by the background summary worker.
+    """
+    if not session_id:
+        return
+    await sio.emit('chapter_summary_ready', {
+        'chapter_id': event['chapter_id'],
+        'summary': event['summary']
+    }, room=f"session:{session_id}")
+
+
+@event_bus.on('master_transferred')
+async def emit_master_transferred(session_id: Optional[str], event: dict):
+    """
+    Notify session that another player is now its master.
+
+    Emitted when PUT /sessions/{id}/master succeeds.
+    """
+    if not session_id:
+        return
+    session = event['session']
+    await sio.emit('master_transferred', {
+        'new_master_id': session.get('master_player_id'),
+        'new_master_name': event.get('new_master_name'),
+        'session': _model_payload(Session, session, 'session')
+    }, room=f"session:{session_id}")
+
+
+async def emit_action_drafts_batch(
+    session_id: str,
+    drafts: list,
+    ready_states: list,
+    deltas: list,
+    sources: dict
+):
+    """
+    Send a session's coalesced action draft, delta and ready state updates.
+
+    Emitted by the action draft batcher once per batch window.
+    """
+    await sio.emit('action_drafts_batch', {
+        'session_id': session_id,
+        'drafts': drafts,
+        'ready_states': ready_states,
+        'deltas': deltas,
+        'sources': sources
     }, room=f"session:{session_id}")
 
 
@@ -0,0 +1,145 @@
+"""
+Per-client Socket.IO packet serialization.
+
+Clients choose their serializer in the connection URL:
+
+    io(url, { parser: msgpackParser, query: { serializer: 'msgpack' } })
+
+(socket.io-msgpack-parser on the client). Those clients are sent and send
+msgpack packets; every other client keeps the default JSON packets. Without
+the msgpack package, or with SOCKETIO_MSGPACK_ENABLED off, everyone uses
+JSON.
+
+Room emits are encoded once per serializer in use among the recipients, not
+once per client. Before a packet is queued for a client the server's
+admit_packet() hook may drop it (see socketio_limits).
+"""
+import asyncio
+from typing import Set
+from urllib.parse import parse_qs
+
+import socketio
+from engineio import packet as eio_packet
+from socketio import packet
+
+from .config import SOCKETIO_MSGPACK_ENABLED
+
+try:
+    from socketio.msgpack_packet import MsgPackPacket
+except ImportError:  # msgpack not installed: JSON only
+    MsgPackPacket = None
+
+
+def wants_msgpack(environ: dict) -> bool:
+    """Whether a connecting client asked for msgpack (and the server offers it)."""
+    if MsgPackPacket is None or not SOCKETIO_MSGPACK_ENABLED:
+        return False
+    query = parse_qs(environ.get('QUERY_STRING', ''))
+    return query.get('serializer', [''])[0] == 'msgpack'
+
+
+class NegotiatedPacket(packet.Packet):
+    """
+    JSON packet that also decodes msgpack packets.
+
+    JSON clients send text messages (binary messages only follow a binary
+    event header and never reach decode), so binary data is msgpack.
+    """
+
+    def decode(self, encoded_packet):
+        if MsgPackPacket is not None and isinstance(encoded_packet, bytes):
+            decoded = MsgPackPacket(encoded_packet=encoded_packet)
+            self.packet_type = decoded.packet_type
+            self.data = decoded.data
+            self.id = decoded.id
+            self.namespace = decoded.namespace
+            return 0
+        return super().decode(encoded_packet)
+
+
+class NegotiatedSerializerServer(socketio.AsyncServer):
+    """AsyncServer that remembers which clients use msgpack."""
+
+    def __init__(self, *args, **kwargs):
+        kwargs.setdefault('serializer', NegotiatedPacket)
+        super().__init__(*args, **kwargs)
+        # Engine.IO sids of msgpack clients
+        self.msgpack_clients: Set[str] = set()
+
+    def packet_class_for(self, eio_sid: str):
+        """Packet class to encode packets for a client with."""
+        return MsgPackPacket if eio_sid in self.msgpack_clients else self.packet_class
+
+    async def admit_packet(self, eio_sid: str, event: str) -> bool:
+        """Whether to queue an event packet for a client (override to apply backpressure)."""
+        return True
+
+    async def _handle_eio_connect(self, eio_sid, environ):
+        if wants_msgpack(environ):
+            self.msgpack_clients.add(eio_sid)
+        return await super()._handle_eio_connect(eio_sid, environ)
+
+    async def _handle_eio_disconnect(self, eio_sid, *args):
+        self.msgpack_clients.discard(eio_sid)
+        return await super()._handle_eio_disconnect(eio_sid, *args)
+
+    async def _send_packet(self, eio_sid, pkt):
+        # Connect/ack/error packets are built as JSON packets
+        if eio_sid in self.msgpack_clients and not isinstance(pkt, MsgPackPacket):
+            pkt = MsgPackPacket(pkt.packet_type, data=pkt.data, namespace=pkt.namespace, id=pkt.id)
+        return await super()._send_packet(eio_sid, pkt)
+
+
+class NegotiatedSerializerManager(socketio.AsyncManager):
+    """
+    Client manager that encodes emits once per serializer.
+
+    Pub/sub managers deliver through this class's emit on every worker, so it
+    sits after them in the class hierarchy (see RedisClientManager).
+    """
+
+    async def emit(self, event, data, namespace, room=None, skip_sid=None,
+                   callback=None, to=None, **kwargs):
+        # Callbacks need a packet per client anyway
+        if callback is not None:
+            return await super().emit(event, data, namespace, room=room, skip_sid=skip_sid,
+                                      callback=callback, to=to, **kwargs)
+
+        room = to or room
+        if namespace not in self.rooms:
+            return
+        if isinstance(data, tuple):
+            data = list(data)
+        elif data is not None:
+            data = [data]
+        else:
+            data = []
+        if not isinstance(skip_sid, list):
+            skip_sid = [skip_sid]
+
+        encoded = {}
+        tasks = []
+        for sid, eio_sid in self.get_participants(namespace, room):
+            if sid in skip_sid or not await self.server.admit_packet(eio_sid, event):
+                continue
+            packet_class = self.server.packet_class_for(eio_sid)
+            eio_pkts = encoded.get(packet_class)
+            if eio_pkts is None:
+                encoded_packet = packet_class(packet.EVENT, namespace=namespace, data=[event] + data).encode()
+                if not isinstance(encoded_packet, list):
+                    encoded_packet = [encoded_packet]
+                eio_pkts = encoded[packet_class] = [
+                    eio_packet.Packet(eio_packet.MESSAGE, p) for p in encoded_packet
+                ]
+            for eio_pkt in eio_pkts:
+                tasks.append(asyncio.create_task(self.server._send_eio_packet(eio_sid, eio_pkt)))
+        if tasks:
+            await asyncio.wait(tasks)
+
+
+class RedisClientManager(socketio.AsyncRedisManager, NegotiatedSerializerManager):
+    """Redis pub/sub fan-out with per-serializer encoding."""
+
+
+class AioPikaClientManager(socketio.AsyncAioPikaManager, NegotiatedSerializerManager):
+    """RabbitMQ pub/sub fan-out with per-serializer encoding."""
@@ -0,0 +1,11 @@
+"""
+Benchmarks for backend hot paths.
+
+Run from the backend directory, e.g.:
+    python -m benchmarks.prompt_prefix --runs 5
+    python -m benchmarks.turn_pipeline --tables 20 --output pipeline.json
+    python -m benchmarks.hot_paths    # fails if slower than baselines/hot_paths.json
+
+benchmarks.fake_upstream provides a local stand-in for n8n and Ollama so the
+full turn pipeline can be exercised without GPUs or external services.
+"""
@@ -0,0 +1,258 @@
+"""
+Shared fixtures and statistics helpers for the benchmarks.
+
+Fixtures mirror the documents the app stores: full Call of Cthulhu character
+sheets (same layout as the frontend's CharacterSheet), realistic action texts
+and a complete realm -> campaign -> chapter -> scene -> session table.
+"""
+import json
+import random
+import statistics
+import uuid
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+
+# Base values of the 7th edition investigator skills
+BASE_SKILLS = {
+    "Accounting": 5, "Anthropology": 1, "Appraise": 5, "Archaeology": 1,
+    "Art/Craft": 5, "Charm": 15, "Climb": 20, "Credit Rating": 0,
+    "Cthulhu Mythos": 0, "Disguise": 5, "Dodge": 25, "Drive Auto": 20,
+    "Elec. Repair": 10, "Fast Talk": 5, "Fighting (Brawl)": 25,
+    "Firearms (Handgun)": 20, "Firearms (Rifle/Shotgun)": 25, "First Aid": 30,
+    "History": 5, "Intimidate": 15, "Jump": 20, "Language (Other)": 1,
+    "Language (Own)": 60, "Law": 5, "Library Use": 20, "Listen": 20,
+    "Locksmith": 1, "Mech. Repair": 10, "Medicine": 1, "Natural World": 10,
+    "Navigate": 10, "Occult": 5, "Op. Hv. Machine": 1, "Persuade": 10,
+    "Pilot": 1, "Psychoanalysis": 1, "Psychology": 10, "Ride": 5,
+    "Science": 1, "Sleight of Hand": 10, "Spot Hidden": 25, "Stealth": 20,
+    "Survival": 10, "Swim": 20, "Throw": 20, "Track": 10,
+}
+
+OCCUPATIONS = [
+    "Antiquarian", "Journalist", "Private Investigator", "Professor",
+    "Physician", "Police Detective", "Dilettante", "Electrical Engineer",
+]
+
+# (speak, act) pairs in the style players write; most trigger skill checks
+ACTION_TEXTS = [
+    ("Hold the light steady, I want to examine these markings.",
+     "carefully inspects the carvings on the altar"),
+    ("Did you hear that? Quiet, everyone.",
+     "presses an ear against the door to listen"),
+    ("These books must hold the answer.",
+     "searches the library shelves for anything on the Whateley family"),
+    ("I'm sure we can come to an arrangement, officer.",
+     "tries to persuade the constable to let them pass"),
+    ("Stay behind me.",
+     "draws a revolver and takes aim at the shape in the fog"),
+    ("I think I recognize this symbol from my studies.",
+     "tries to recall the occult treatise it came from"),
+    ("Wait here, I'll go around.",
+     "sneaks along the wall, keeping to the shadows"),
+    ("It's jammed. Give me a minute.",
+     "attempts to pick the lock on the cellar door with a hairpin"),
+    ("He's bleeding badly!",
+     "kneels down to bandage the wound and administer first aid"),
+    ("Grab the rope!",
+     "climbs down the well, lantern clenched between teeth, in darkness"),
+    ("",
+     "quietly pockets the strange idol while the others are distracted"),
+    ("We should go back to the inn and rest.",
+     "gathers the notes and blows out the candle"),
+]
+
+
+def character_sheet(name: str, rng: Optional[random.Random] = None) -> Dict[str, Any]:
+    """Build a complete character sheet with randomized values."""
+    rng = rng or random.Random()
+
+    def value(v: int) -> Dict[str, str]:
+        return {"reg": f"{v:02d}", "half": str(v // 2), "fifth": str(v // 5)}
+
+    characteristics = {
+        stat: value(rng.randrange(15, 90, 5))
+        for stat in ("STR", "CON", "DEX", "APP", "INT", "POW", "SIZ", "EDU")
+    }
+    skills = {
+        skill: value(min(base + rng.choice([0, 0, 0, 10, 20, 30, 40, 50]), 90))
+        for skill, base in BASE_SKILLS.items()
+    }
+    hp = rng.randint(8, 16)
+    sanity = rng.randrange(40, 85, 5)
+
+    return {
+        "investigator": {
+            "name": name,
+            "birthplace": "Arkham, Massachusetts",
+            "pronoun": "They/Them",
+            "occupation": rng.choice(OCCUPATIONS),
+            "residence": "Boston",
+            "age": str(rng.randint(21, 65)),
+        },
+        "characteristics": characteristics,
+        "hit_points": {"max": str(hp), "current": str(hp)},
+        "magic_points": {"max": "12", "current": "12"},
+        "luck": {"starting": "55", "current": "55"},
+        "sanity": {"starting": str(sanity), "current": str(sanity), "insane": str(sanity // 5), "max": "99"},
+        "status": {
+            "max_sanity": False, "temporary_insanity": False, "indefinite_insanity": False,
+            "major_wound": False, "unconscious": False, "dying": False,
+        },
+        "skills": skills,
+        "combat": {
+            "weapons": [
+                {"name": "Brawl", "skill": "Fighting (Brawl)", "damage": "1D3 + DB",
+                 "num_attacks": "1", "range": "-", "ammo": "-", "malf": "-"},
+                {"name": ".38 Revolver", "skill": "Firearms (Handgun)", "damage": "1D10",
+                 "num_attacks": "1", "range": "15 yards", "ammo": "6", "malf": "100"},
+            ],
+            "move": "8",
+            "build": "0",
+            "damage_bonus": "None",
+        },
+        "story": {
+            "my_story": "Came to Arkham after a letter from a dead friend.",
+            "backstory": {
+                "personal_description": "Tall, tired eyes, ink-stained fingers.",
+                "ideology_beliefs": "There is a rational explanation for everything.",
+                "significant_people": "A sister in Providence.",
+                "meaningful_locations": "Miskatonic University library.",
+                "treasured_possessions": "A pocket watch that stopped at 3:17.",
+                "traits": "Stubborn, curious.",
+                "injuries_scars": "",
+                "phobias_manias": "",
+                "arcane_tomes": "",
+                "encounters_with_strange_entities": "",
+            },
+        },
+        "gear_possessions": "Lantern, notebook, revolver, 12 rounds",
+        "wealth": {"spending_level": "10", "cash": "40", "assets": "2000"},
+        "relationships": "",
+    }
+
+
+def random_action(character_id: str, player_id: str, rng: Optional[random.Random] = None) -> Dict[str, Any]:
+    """Build one turn action from the action corpus."""
+    rng = rng or random.Random()
+    speak, act = rng.choice(ACTION_TEXTS)
+    return {
+        "actor_id": character_id,
+        "controller_owner": player_id,
+        "speak": speak,
+        "act": act,
+        "appearance": "tense",
+        "emotion": "wary",
+        "ooc": "",
+        "meta": {},
+    }
+
+
+async def seed_table(db, index: int, players: int, rng: Optional[random.Random] = None) -> Dict[str, Any]:
+    """
+    Insert a playable table: realm, campaign, chapter, active scene, session
+    and one character per player.
+
+    Returns the ids the benchmark needs.
+    """
+    rng = rng or random.Random(index)
+    suffix = uuid.uuid4().hex[:8]
+    now = datetime.utcnow()
+    meta = {"created_at": now, "created_by": "benchmark"}
+
+    realm_id = f"realm-{suffix}"
+    campaign_id = f"campaign-{suffix}"
+    chapter_id = f"chapter-{suffix}"
+    scene_id = f"scene-{suffix}"
+    session_id = f"session-{suffix}"
+    player_ids = [f"player-{suffix}-{i}" for i in range(players)]
+    character_ids = [f"char-{suffix}-{i}" for i in range(players)]
+
+    for i, character_id in enumerate(character_ids):
+        name = f"Investigator {index}-{i}"
+        document = {
+            "id": character_id,
+            "kind": "pc",
+            "realm_id": realm_id,
+            "name": name,
+            "owner": player_ids[i],
+            "created_by": player_ids[i],
+            "data": character_sheet(name, rng),
+            "meta": meta,
+            "changes": [],
+        }
+        # Context assembly reads entities, skill checks read characters
+        await db.entities.insert_one(dict(document))
+        await db.characters.insert_one(dict(document))
+
+    await db.realms.insert_one({
+        "id": realm_id, "kind": "realm", "name": f"Benchmark Realm {index}",
+        "description": "New England, 1925.", "meta": meta, "changes": [],
+    })
+    await db.campaigns.insert_one({
+        "id": campaign_id, "kind": "campaign", "realm_id": realm_id,
+        "name": f"Benchmark Campaign {index}", "description": "Something stirs beneath Arkham.",
+        "status": "active", "meta": meta, "changes": [],
+    })
+    await db.chapters.insert_one({
+        "id": chapter_id, "kind": "chapter", "campaign_id": campaign_id,
+        "name": "Chapter 1", "description": "Arrival.", "scenes": [scene_id],
+        "status": "active", "order": 1, "meta": meta, "changes": [],
+    })
+    await db.scenes.insert_one({
+        "id": scene_id, "kind": "scene", "chapter_id": chapter_id,
+        "name": "The Abandoned Library", "description": "Rows of dust-covered shelves stretch into darkness.",
+        "location": "Miskatonic University", "participants": character_ids, "npcs_present": [],
+        "turns": [], "status": "active", "order": 1, "meta": meta, "changes": [],
+    })
+    await db.sessions.insert_one({
+        "id": session_id, "kind": "session", "realm_id": realm_id, "campaign_id": campaign_id,
+        "session_number": 1, "master_player_id": player_ids[0],
+        "attendance": {"players_present": player_ids, "players_absent": []},
+        "meta": meta, "changes": [],
+    })
+
+    return {
+        "realm_id": realm_id,
+        "campaign_id": campaign_id,
+        "chapter_id": chapter_id,
+        "scene_id": scene_id,
+        "session_id": session_id,
+        "player_ids": player_ids,
+        "character_ids": character_ids,
+    }
+
+
+# ============== Statistics ==============
+
+def percentile(sorted_values: List[float], p: float) -> float:
+    """Percentile (0-100) of an already sorted list, linear interpolation."""
+    if not sorted_values:
+        return 0.0
+    k = (len(sorted_values) - 1) * p / 100
+    lower = int(k)
+    upper = min(lower + 1, len(sorted_values) - 1)
+    return sorted_values[lower] + (sorted_values[upper] - sorted_values[lower]) * (k - lower)
+
+
+def summarize_ms(samples: List[float]) -> Dict[str, float]:
+    """Count, mean and p50/p95/p99/max of durations given in seconds, in ms."""
+    values = sorted(s * 1000 for s in samples)
+    if not values:
+        return {"count": 0}
+    return {
+        "count": len(values),
+        "mean_ms": round(statistics.fmean(values), 3),
+        "p50_ms": round(percentile(values, 50), 3),
+        "p95_ms": round(percentile(values, 95), 3),
+        "p99_ms": round(percentile(values, 99), 3),
+        "max_ms": round(values[-1], 3),
+    }
+
+
+def write_json(result: Dict[str, Any], output: Optional[str]):
+    """Print a result and optionally save it for comparison between commits."""
+    print(json.dumps(result, indent=2))
+    if output:
+        with open(output, "w") as f:
+            json.dump(result, f, indent=2)
@@ -0,0 +1,388 @@
+"""
+Fake n8n and Ollama upstream for offline end-to-end load testing.
+
+A small FastAPI app implementing the upstream endpoints the backend calls:
+
+- POST /webhook/coc_dungeonmaster      legacy sync DungeonMaster ({"output": narrative})
+- POST /webhook/coc_dungeonmaster_v2   async DungeonMaster: POSTs a CallbackPayload to
+                                       the bundle's callback_url, then answers (like the
+                                       workflow's responseMode "lastNode"; "onReceived"
+                                       answers first)
+- POST /webhook/coc_prophet            Prophet Q&A ({"output": answer})
+- POST /api/chat                       Ollama chat, streaming (NDJSON) or not, text or JSON
+- POST /api/embeddings                 Ollama embeddings (deterministic per prompt)
+- GET  /stats                          request/failure/callback counters
+
+Latencies are drawn from configurable distributions, and failures can be
+injected per endpoint: HTTP 500s, failed callbacks, dropped callbacks and
+duplicated callbacks (to exercise the backend's idempotency).
+
+Usage (from backend/):
+    python -m benchmarks.fake_upstream --port 5678 --dm-latency lognormal:2:0.4
+    N8N_BASE_URL=http://localhost:5678 OLLAMA_URL=http://localhost:5678 uvicorn main:socket_app
+
+Latency specs: "fixed:S", "uniform:LOW:HIGH", "normal:MEAN:STDDEV",
+"lognormal:MEDIAN:SIGMA" (all in seconds).
+"""
+import argparse
+import asyncio
+import hashlib
+import json
+import logging
+import math
+import random
+import time
+from collections import Counter
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+import httpx
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+from pydantic import BaseModel
+
+logger = logging.getLogger(__name__)
+
+
+NARRATIVES = [
+    "The lantern gutters as a cold draught sweeps through the room. Somewhere below, "
+    "something heavy is dragged across stone.",
+    "Dust motes swirl in the pale light. The ledger falls open at a page marked with "
+    "a symbol none of you recognise, yet all of you fear.",
+    "The fog thickens until the pier vanishes behind you. A bell tolls once, far out "
+    "on the water, where no ship should be.",
+    "The chanting stops. In the silence you hear your own heartbeat, and beneath it, "
+    "another rhythm that is not quite human.",
+]
+
+ACTION_TEMPLATE = {
+    "speak": "We should not linger here.",
+    "act": "raises the lantern and studies the carvings on the wall",
+    "appearance": "pale, jaw clenched",
+    "emotion": "uneasy",
+    "ooc": "",
+}
+
+
+# ============== Configuration ==============
+
+class Latency:
+    """A latency distribution parsed from a spec like "lognormal:2:0.4"."""
+
+    def __init__(self, spec: str = "fixed:0"):
+        parts = spec.split(":")
+        self.kind = parts[0]
+        self.params = [float(p) for p in parts[1:]]
+        expected = {"fixed": 1, "uniform": 2, "normal": 2, "lognormal": 2}
+        if expected.get(self.kind) != len(self.params):
+            raise ValueError(f"Invalid latency spec '{spec}'")
+        self.spec = spec
+
+    def sample(self) -> float:
+        """Draw one latency in seconds (never negative)."""
+        if self.kind == "fixed":
+            value = self.params[0]
+        elif self.kind == "uniform":
+            value = random.uniform(*self.params)
+        elif self.kind == "normal":
+            value = random.gauss(*self.params)
+        else:
+            median, sigma = self.params
+            value = random.lognormvariate(math.log(median), sigma) if median > 0 else 0.0
+        return max(value, 0.0)
+
+
+class FakeUpstreamConfig(BaseModel):
+    """Behaviour of the fake upstream. Rates are probabilities in [0, 1]."""
+    # n8n
+    dm_latency: str = "lognormal:2:0.4"           # bundle received -> callback sent
+    dm_v2_response_mode: str = "lastNode"         # answer after the callback, or "onReceived"
+    dm_sync_latency: str = "lognormal:4:0.4"      # legacy sync webhook
+    prophet_latency: str = "lognormal:3:0.4"
+    webhook_error_rate: float = 0.0               # webhook answers HTTP 500
+    callback_error_rate: float = 0.0              # callback reports success=False
+    callback_drop_rate: float = 0.0               # callback never sent
+    callback_duplicate_rate: float = 0.0          # callback sent twice
+    scene_transition_rate: float = 0.1
+    chapter_transition_rate: float = 0.02
+    # Override scheme/host of the bundle's callback_url (e.g. http://localhost:8000)
+    callback_base_url: Optional[str] = None
+
+    # Ollama
+    ollama_first_token_latency: str = "lognormal:0.3:0.3"
+    ollama_tokens_per_second: float = 40.0
+    ollama_error_rate: float = 0.0
+    embedding_latency: str = "fixed:0.02"
+    embedding_dimensions: int = 768
+
+
+# ============== App ==============
+
+def create_app(
+    config: Optional[FakeUpstreamConfig] = None,
+    callback_client: Optional[httpx.AsyncClient] = None
+) -> FastAPI:
+    """
+    Build the fake upstream app.
+
+    Args:
+        config: Latency and failure settings (defaults if omitted)
+        callback_client: Client used for DungeonMaster callbacks. Pass one with
+            an ASGI transport to call back into an in-process backend.
+    """
+    config = config or FakeUpstreamConfig()
+    latencies = {
+        "dm": Latency(config.dm_latency),
+        "dm_sync": Latency(config.dm_sync_latency),
+        "prophet": Latency(config.prophet_latency),
+        "first_token": Latency(config.ollama_first_token_latency),
+        "embedding": Latency(config.embedding_latency),
+    }
+    stats: Counter = Counter()
+    pending_callbacks: set = set()
+
+    app = FastAPI(title="Fake n8n/Ollama upstream")
+    app.state.config = config
+    app.state.stats = stats
+    app.state.pending_callbacks = pending_callbacks
+
+    def chance(rate: float) -> bool:
+        return rate > 0 and random.random() < rate
+
+    def injected_error(endpoint: str, rate: float) -> Optional[JSONResponse]:
+        if chance(rate):
+            stats[f"{endpoint}.injected_errors"] += 1
+            return JSONResponse({"message": "Injected failure"}, status_code=500)
+        return None
+
+    # ---------- n8n ----------
+
+    @app.post("/webhook/coc_dungeonmaster_v2")
+    async def dungeonmaster_v2(request: Request):
+        stats["dm_v2.requests"] += 1
+        bundle = await request.json()
+        for field in ("turn_id", "callback_url", "context"):
+            if field not in bundle:
+                return JSONResponse({"message": f"Missing required field: {field}"}, status_code=400)
+
+        error = injected_error("dm_v2", config.webhook_error_rate)
+        if error:
+            return error
+
+        task = asyncio.create_task(_deliver_callback(bundle))
+        pending_callbacks.add(task)
+        task.add_done_callback(pending_callbacks.discard)
+        if config.dm_v2_response_mode == "onReceived":
+            return {"message": "Workflow was started"}
+        # Like n8n's "lastNode": the response is held until the workflow ends.
+        # Shielded so a client timing out does not cancel the workflow.
+        await asyncio.shield(task)
+        return {"message": "Workflow finished"}
+
+    async def _deliver_callback(bundle: Dict[str, Any]):
+        started_at = datetime.utcnow()
+        await asyncio.sleep(latencies["dm"].sample())
+        # Reported like a workflow timing its LLM node
+        spans = [{
+            "name": "llm",
+            "start": started_at.isoformat(),
+            "duration_ms": round((datetime.utcnow() - started_at).total_seconds() * 1000, 3),
+        }]
+
+        if chance(config.callback_drop_rate):
+            stats["callbacks.dropped"] += 1
+            return
+
+        url = bundle["callback_url"]
+        if config.callback_base_url:
+            path = url.split("/api/", 1)[-1]
+            url = f"{config.callback_base_url.rstrip('/')}/api/{path}"
+
+        payload = _callback_payload(bundle, spans)
+        copies = 2 if chance(config.callback_duplicate_rate) else 1
+        client = callback_client or httpx.AsyncClient(timeout=30.0)
+        try:
+            for _ in range(copies):
+                response = await client.post(url, json=payload)
+                stats[f"callbacks.status_{response.status_code}"] += 1
+        except httpx.HTTPError as e:
+            stats["callbacks.errors"] += 1
+            logger.warning(f"Callback for turn {bundle['turn_id']} failed: {e}")
+        finally:
+            if callback_client is None:
+                await client.aclose()
+
+    def _callback_payload(bundle: Dict[str, Any], spans: List[Dict[str, Any]]) -> Dict[str, Any]:
+        metadata = {
+            "idempotency_key": bundle.get("idempotency_key"),
+            "session_id": bundle.get("session_id"),
+            "trace": bundle.get("trace"),
+            "spans": spans,
+        }
+        if chance(config.callback_error_rate):
+            stats["callbacks.injected_errors"] += 1
+            return {
+                "turn_id": bundle["turn_id"],
+                "success": False,
+                "error": "Injected LLM failure",
+                "metadata": metadata,
+                "idempotency_key": bundle.get("idempotency_key"),
+            }
+
+        transition = {"type": "none", "reason": None, "suggested_name": None}
+        if chance(config.chapter_transition_rate):
+            transition = {"type": "chapter", "reason": "Injected", "suggested_name": "A New Chapter"}
+        elif chance(config.scene_transition_rate):
+            transition = {"type": "scene", "reason": "Injected", "suggested_name": "A New Scene"}
+        stats[f"callbacks.transition_{transition['type']}"] += 1
+
+        narrative = random.choice(NARRATIVES)
+        return {
+            "turn_id": bundle["turn_id"],
+            "success": True,
+            "result": {
+                "narrative": narrative,
+                "summary": narrative.split(". ")[0] + ".",
+                "transition": transition,
+            },
+            "error": None,
+            "metadata": metadata,
+            "idempotency_key": bundle.get("idempotency_key"),
+        }
+
+    @app.post("/webhook/coc_dungeonmaster")
+    async def dungeonmaster(request: Request):
+        stats["dm.requests"] += 1
+        await request.json()
+        await asyncio.sleep(latencies["dm_sync"].sample())
+        return injected_error("dm", config.webhook_error_rate) or {"output": random.choice(NARRATIVES)}
+
+    @app.post("/webhook/coc_prophet")
+    async def prophet(request: Request):
+        stats["prophet.requests"] += 1
+        body = await request.json()
+        await asyncio.sleep(latencies["prophet"].sample())
+        return injected_error("prophet", config.webhook_error_rate) or {
+            "output": f"The Prophet considers '{body.get('Prophet', '')}'. The stars are not yet right."
+        }
+
+    # ---------- Ollama ----------
+
+    @app.post("/api/chat")
+    async def chat(request: Request):
+        stats["ollama_chat.requests"] += 1
+        body = await request.json()
+        messages = body.get("messages", [])
+        model = body.get("model", "fake")
+
+        error = injected_error("ollama_chat", config.ollama_error_rate)
+        if error:
+            return error
+
+        if body.get("format") == "json":
+            content = json.dumps(ACTION_TEMPLATE)
+        else:
+            content = random.choice(NARRATIVES)
+        max_tokens = body.get("options", {}).get("num_predict")
+        tokens = _tokenize(content)[:max_tokens] if max_tokens else _tokenize(content)
+        prompt_tokens = sum(len(m.get("content", "")) for m in messages) // 4
+
+        first_token_delay = latencies["first_token"].sample()
+        token_delay = 1.0 / config.ollama_tokens_per_second if config.ollama_tokens_per_second else 0.0
+
+        def final_message(started: float) -> Dict[str, Any]:
+            total_ns = int((time.perf_counter() - started) * 1e9)
+            return {
+                "model": model,
+                "created_at": datetime.utcnow().isoformat() + "Z",
+                "done": True,
+                "total_duration": total_ns,
+                "prompt_eval_count": prompt_tokens,
+                "prompt_eval_duration": int(first_token_delay * 1e9),
+                "eval_count": len(tokens),
+                "eval_duration": max(total_ns - int(first_token_delay * 1e9), 0),
+            }
+
+        started = time.perf_counter()
+        if not body.get("stream", True):
+            await asyncio.sleep(first_token_delay + token_delay * len(tokens))
+            return {
+                **final_message(started),
+                "message": {"role": "assistant", "content": "".join(tokens)},
+            }
+
+        async def stream():
+            await asyncio.sleep(first_token_delay)
+            for token in tokens:
+                yield json.dumps({
+                    "model": model,
+                    "message": {"role": "assistant", "content": token},
+                    "done": False,
+                }) + "\n"
+                await asyncio.sleep(token_delay)
+            yield json.dumps({
+                **final_message(started),
+                "message": {"role": "assistant", "content": ""},
+            }) + "\n"
+
+        return StreamingResponse(stream(), media_type="application/x-ndjson")
+
+    @app.post("/api/embeddings")
+    async def embeddings(request: Request):
+        stats["ollama_embeddings.requests"] += 1
+        body = await request.json()
+        await asyncio.sleep(latencies["embedding"].sample())
+        error = injected_error("ollama_embeddings", config.ollama_error_rate)
+        if error:
+            return error
+        return {"embedding": _embed(body.get("prompt", ""), config.embedding_dimensions)}
+
+    # ---------- Introspection ----------
+
+    @app.get("/stats")
+    async def get_stats():
+        return {
+            "counters": dict(stats),
+            "pending_callbacks": len(pending_callbacks),
+            "config": config.model_dump(),
+        }
+
+    return app
+
+
+def _tokenize(text: str) -> List[str]:
+    """Split text into word-ish tokens that concatenate back to the original."""
+    tokens = []
+    start = 0
+    for i, char in enumerate(text):
+        if char == " " and i > start:
+            tokens.append(text[start:i])
+            start = i
+    tokens.append(text[start:])
+    return tokens
+
+
+def _embed(text: str, dimensions: int) -> List[float]:
+    """Deterministic unit vector derived from the text."""
+    rng = random.Random(hashlib.sha256(text.encode()).digest())
+    vector = [rng.gauss(0, 1) for _ in range(dimensions)]
+    norm = math.sqrt(sum(v * v for v in vector)) or 1.0
+    return [v / norm for v in vector]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--port", type=int, default=5678)
+    for name, field in FakeUpstreamConfig.model_fields.items():
+        parser.add_argument(
+            f"--{name.replace('_', '-')}",
+            type=type(field.default) if field.default is not None else str,
+            default=field.default
+        )
+    args = vars(parser.parse_args())
+    host, port = args.pop("host"), args.pop("port")
+
+    import uvicorn
+    logging.basicConfig(level=logging.INFO)
+    uvicorn.run(create_app(FakeUpstreamConfig(**args)), host=host, port=port)
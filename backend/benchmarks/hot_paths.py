@@ -0,0 +1,221 @@
+"""
+Microbenchmarks for the pure-CPU work done on every turn submit.
+
+Cases:
+- detect_skill_checks   SkillCheckService.detect_skill_checks over the action corpus
+- roll_skill_checks     SkillCheckService.roll_skill_checks for a batch of checks
+- fetch_characters      ContextAssemblyService._fetch_characters parsing full
+                        character sheets (documents served from memory, so only
+                        the parsing is measured, not the driver)
+- bundle_model_dump     ContextBundle.model_dump(mode='json') of a full bundle
+
+Each case reports the best and median time per call over several repeats.
+Results are compared against a baseline file; any case whose best time is
+more than --threshold slower fails the run (exit code 1). Baselines are
+machine-specific: regenerate with --update-baseline on the machine (or CI
+runner) that does the comparison.
+
+Usage (from backend/):
+    python -m benchmarks.hot_paths
+    python -m benchmarks.hot_paths --update-baseline
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import statistics
+import sys
+import time
+from typing import Any, Callable, Dict, List
+
+from app import database
+from app.services import ContextAssemblyService, SkillCheckService
+from app.services.context_assembly import (
+    ContextBundle,
+    ContextData,
+    RealmContext,
+    CampaignContext,
+    ChapterContext,
+    SceneContext,
+    TurnSummary,
+    SkillCheckContext,
+)
+from benchmarks.common import character_sheet, random_action, write_json
+
+
+DEFAULT_BASELINE = os.path.join(os.path.dirname(__file__), "baselines", "hot_paths.json")
+
+CHARACTERS = 8
+ACTIONS = 100
+REPEATS = 7
+
+
+class _MemoryCursor:
+    def __init__(self, docs: List[Dict[str, Any]]):
+        self.docs = docs
+
+    async def to_list(self, length: int = None) -> List[Dict[str, Any]]:
+        return self.docs[:length]
+
+
+class _MemoryCollection:
+    def __init__(self, docs: List[Dict[str, Any]]):
+        self.docs = docs
+
+    def find(self, *args, **kwargs) -> _MemoryCursor:
+        return _MemoryCursor(self.docs)
+
+
+class _MemoryClient:
+    """Serves preloaded entities so _fetch_characters runs without a database."""
+
+    def __init__(self, entities: List[Dict[str, Any]]):
+        self.db = type("MemoryDB", (), {"entities": _MemoryCollection(entities)})()
+
+    def get_default_database(self):
+        return self.db
+
+
+def _measure(func: Callable[[], Any], number: int) -> Dict[str, float]:
+    """Time `number` calls per repeat; return best and median per call (us)."""
+    per_call = []
+    for _ in range(REPEATS):
+        start = time.perf_counter()
+        for _ in range(number):
+            func()
+        per_call.append((time.perf_counter() - start) / number * 1e6)
+    return {
+        "number": number,
+        "best_us": round(min(per_call), 3),
+        "median_us": round(statistics.median(per_call), 3),
+    }
+
+
+def run_cases() -> Dict[str, Dict[str, float]]:
+    rng = random.Random(7)
+    loop = asyncio.new_event_loop()
+
+    # Character sheets as stored in the entities collection
+    entities = [
+        {
+            "id": f"char-{i}",
+            "kind": "pc",
+            "name": f"Investigator {i}",
+            "data": character_sheet(f"Investigator {i}", rng),
+        }
+        for i in range(CHARACTERS)
+    ]
+    context_service = ContextAssemblyService()
+    context_service.max_characters = CHARACTERS
+    database.gamerecords_client = _MemoryClient(entities)
+    character_ids = [e["id"] for e in entities]
+
+    def fetch_characters():
+        return loop.run_until_complete(context_service._fetch_characters(character_ids))
+
+    characters = fetch_characters()
+
+    skill_service = SkillCheckService()
+    actions = [
+        random_action(rng.choice(character_ids), "player", rng)
+        for _ in range(ACTIONS)
+    ]
+    detected = skill_service.detect_skill_checks(actions, characters)
+
+    def roll():
+        return loop.run_until_complete(skill_service.roll_skill_checks(detected, characters))
+
+    rolled = roll()
+
+    bundle = ContextBundle(
+        turn_id="turn-bench",
+        session_id="session-bench",
+        callback_url="http://backend:8000/api/v1/turns/internal/turn-bench/complete",
+        idempotency_key="bench",
+        context=ContextData(
+            realm=RealmContext(id="realm-1", name="New England", setting={"tone": "dread", "era": "1925"}),
+            campaign=CampaignContext(
+                id="campaign-1",
+                name="The Whateley Inheritance",
+                setting={"tone": "slow-burn horror", "goal": "Find the heir", "key_elements": ["Dunwich", "Necronomicon"]},
+                story_arc={"tagline": "Blood will out", "chapters": [f"Chapter {i}" for i in range(6)]},
+            ),
+            chapter=ChapterContext(id="chapter-1", name="Arrival", summary="The investigators reach Dunwich. " * 20),
+            scene=SceneContext(
+                id="scene-1",
+                name="The Abandoned Library",
+                location="Miskatonic University",
+                summary="Dust and whispers. " * 10,
+                participants=character_ids,
+                turn_count=12,
+            ),
+            previous_turns=[
+                TurnSummary(
+                    order=i,
+                    actions=actions[i * 4:(i + 1) * 4],
+                    reaction={"description": "The shadows lengthen. " * 30, "summary": "The shadows lengthen."},
+                )
+                for i in range(5)
+            ],
+            characters=characters,
+            skill_checks=[SkillCheckContext(**result.model_dump()) for result in rolled[:8]],
+        ),
+        actions=actions[:CHARACTERS],
+    )
+
+    try:
+        return {
+            "detect_skill_checks": _measure(
+                lambda: skill_service.detect_skill_checks(actions, characters), number=50
+            ),
+            "roll_skill_checks": _measure(roll, number=200),
+            "fetch_characters": _measure(fetch_characters, number=200),
+            "bundle_model_dump": _measure(lambda: bundle.model_dump(mode="json"), number=500),
+        }
+    finally:
+        loop.close()
+
+
+def compare(results: Dict[str, Dict[str, float]], baseline: Dict[str, Any], threshold: float) -> Dict[str, Any]:
+    """Compare best times against the baseline; returns per-case ratios and regressions."""
+    comparison = {}
+    regressions = []
+    for name, result in results.items():
+        base = baseline.get("cases", {}).get(name)
+        if not base:
+            continue
+        ratio = result["best_us"] / base["best_us"] if base["best_us"] else 1.0
+        comparison[name] = round(ratio, 3)
+        if ratio > 1 + threshold:
+            regressions.append(name)
+    return {"ratio_to_baseline": comparison, "regressions": regressions}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE, help="Baseline JSON file")
+    parser.add_argument("--threshold", type=float, default=0.25,
+                        help="Allowed slowdown vs. baseline before failing (0.25 = 25%%)")
+    parser.add_argument("--update-baseline", action="store_true", help="Write results as the new baseline")
+    parser.add_argument("--output", help="Write results as JSON to this file")
+    args = parser.parse_args()
+
+    result = {"benchmark": "hot_paths", "cases": run_cases()}
+
+    if args.update_baseline:
+        os.makedirs(os.path.dirname(args.baseline), exist_ok=True)
+        with open(args.baseline, "w") as f:
+            json.dump(result, f, indent=2)
+            f.write("\n")
+        write_json(result, args.output)
+        sys.exit(0)
+
+    if os.path.exists(args.baseline):
+        with open(args.baseline) as f:
+            result.update(compare(result["cases"], json.load(f), args.threshold))
+    write_json(result, args.output)
+
+    if result.get("regressions"):
+        print(f"Regressed beyond {args.threshold:.0%}: {', '.join(result['regressions'])}", file=sys.stderr)
+        sys.exit(1)
@@ -0,0 +1,123 @@
+"""
+Benchmark: Ollama prompt-prefix reuse for AI character actions.
+
+Calls LLMService._chat repeatedly for the same character with a changing scene
+and compares two layouts:
+
+- cached:  the real prompt (shared instructions + character profile + turn suffix)
+- control: the same prompt with a random nonce in front, which defeats Ollama's
+           prefix cache and forces full prompt evaluation on every call
+
+Ollama reports prompt_eval_count (tokens actually evaluated) and
+prompt_eval_duration (ns) per call. With prefix reuse, calls after the first
+only evaluate the variable suffix.
+
+Usage (from backend/):
+    OLLAMA_URL=http://localhost:11434 python -m benchmarks.prompt_prefix --runs 5
+"""
+import argparse
+import asyncio
+import json
+import statistics
+import uuid
+from typing import Any, Dict, List, Optional
+
+from app.services.llm import LLMService, CHARACTER_ACTION_SYSTEM_PROMPT
+
+
+CHARACTER_NAME = "Reginald Blackwood"
+CHARACTER_DATA = {
+    "ai_personality": "scholarly",
+    "occupation": "Antiquarian",
+    "backstory": "A retired professor of medieval history who lost his brother "
+                 "to an expedition in the Miskatonic valley.",
+    "skills": {
+        "Library Use": {"reg": "75"},
+        "History": {"reg": "70"},
+        "Occult": {"reg": "55"},
+        "Spot Hidden": {"reg": "45"},
+        "Language (Latin)": {"reg": "60"},
+    },
+}
+
+SCENES = [
+    {"name": "The Abandoned Library", "description": "Rows of dust-covered shelves stretch into darkness."},
+    {"name": "The Ritual Chamber", "description": "Strange symbols cover the walls of this circular room."},
+    {"name": "The Foggy Docks", "description": "Thick fog rolls off the water, obscuring the rotting pier."},
+    {"name": "The Cellar", "description": "Water drips from the vaulted ceiling onto uneven flagstones."},
+]
+
+
+def _messages(service: LLMService, scene: Dict[str, Any], nonce: str = "") -> List[Dict[str, str]]:
+    system_prompt = (
+        f"{CHARACTER_ACTION_SYSTEM_PROMPT}\n\n"
+        f"{service.build_character_profile(CHARACTER_NAME, CHARACTER_DATA)}"
+    )
+    if nonce:
+        system_prompt = f"[{nonce}]\n{system_prompt}"
+    actions = [{"character_name": "Ada", "act": f"holds up a lantern in {scene['name']}"}]
+    return [
+        {"role": "system", "content": system_prompt},
+        {"role": "user", "content": service.build_action_request(CHARACTER_NAME, scene, actions)},
+    ]
+
+
+async def _run_layout(service: LLMService, runs: int, bust_cache: bool) -> List[Dict[str, float]]:
+    samples = []
+    for i in range(runs):
+        scene = SCENES[i % len(SCENES)]
+        nonce = uuid.uuid4().hex if bust_cache else ""
+        data = await service._chat(_messages(service, scene, nonce), temperature=0.8, max_tokens=1)
+        if data is None:
+            raise RuntimeError(f"Ollama call failed ({service.url})")
+        samples.append({
+            "prompt_eval_count": data.get("prompt_eval_count", 0),
+            "prompt_eval_ms": data.get("prompt_eval_duration", 0) / 1e6,
+            "total_ms": data.get("total_duration", 0) / 1e6,
+        })
+    return samples
+
+
+def _summarize(samples: List[Dict[str, float]]) -> Dict[str, float]:
+    # The first call primes the cache; steady state is what players see
+    steady = samples[1:] or samples
+    return {
+        "first_prompt_eval_ms": samples[0]["prompt_eval_ms"],
+        "median_prompt_eval_ms": statistics.median(s["prompt_eval_ms"] for s in steady),
+        "median_prompt_eval_count": statistics.median(s["prompt_eval_count"] for s in steady),
+        "median_total_ms": statistics.median(s["total_ms"] for s in steady),
+    }
+
+
+async def main(runs: int, output: Optional[str] = None):
+    service = LLMService()
+    await service.warmup()
+
+    control = _summarize(await _run_layout(service, runs, bust_cache=True))
+    cached = _summarize(await _run_layout(service, runs, bust_cache=False))
+
+    speedup = (
+        control["median_prompt_eval_ms"] / cached["median_prompt_eval_ms"]
+        if cached["median_prompt_eval_ms"] else float("inf")
+    )
+    result = {
+        "model": service.model,
+        "keep_alive": service.keep_alive,
+        "runs": runs,
+        "control": control,
+        "cached": cached,
+        "prompt_eval_speedup": round(speedup, 2),
+    }
+
+    print(json.dumps(result, indent=2))
+    if output:
+        with open(output, "w") as f:
+            json.dump(result, f, indent=2)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--runs", type=int, default=5, help="Calls per layout")
+    parser.add_argument("--output", help="Write results as JSON to this file")
+    args = parser.parse_args()
+    asyncio.run(main(args.runs, args.output))
@@ -0,0 +1,337 @@
+"""
+Benchmark: end-to-end turn pipeline with per-stage latency breakdown.
+
+Drives N concurrent simulated tables through the real FastAPI app. Every round
+each table writes one action draft per player, creates and submits a turn,
+waits for the DungeonMaster callback (served by benchmarks.fake_upstream) and
+follows any scene/chapter transition into the next round.
+
+Everything runs in one process: HTTP requests to the backend and to the fake
+n8n/Ollama upstream are routed through ASGI transports, and the database is
+mongomock-motor unless --mongo-url points at a real MongoDB.
+
+Stages reported (p50/p95/p99 in ms):
+- draft_write       POST /action-drafts (server time)
+- submit            POST /turns/{id}/submit (server time)
+- assemble_context  ContextAssemblyService.assemble_context
+- skill_detect      SkillCheckService.detect_skill_checks
+- skill_roll        SkillCheckService.roll_skill_checks
+- dispatch          TurnDispatchService._dispatch (POST to the n8n webhook)
+- callback          POST /turns/internal/{id}/complete (server time)
+- emit              Socket.IO emits
+- turn_total        submit request -> turn_completed/turn_failed emitted
+
+Usage (from backend/):
+    python -m benchmarks.turn_pipeline --tables 20 --rounds 5 --output pipeline.json
+"""
+import argparse
+import asyncio
+import os
+import random
+import sys
+import time
+import uuid
+from collections import defaultdict
+from typing import Any, Dict, List, Optional
+
+# Configure the app for in-process routing before it is imported
+BACKEND_HOST = "backend"
+UPSTREAM_HOST = "fake-upstream"
+os.environ["USE_ASYNC_TURN_PROCESSING"] = "true"
+os.environ["OLLAMA_WARMUP_ON_STARTUP"] = "false"
+os.environ["BACKEND_BASE_URL"] = f"http://{BACKEND_HOST}"
+os.environ["N8N_BASE_URL"] = f"http://{UPSTREAM_HOST}"
+os.environ["OLLAMA_URL"] = f"http://{UPSTREAM_HOST}"
+
+import httpx
+
+import main
+from app import database, socketio_manager
+from app.indexes import ensure_indexes
+from app.services import ContextAssemblyService, SkillCheckService
+from app.services.summarization import summarization_service
+from app.services.turn_dispatch import turn_dispatch_service, TurnDispatchService
+from benchmarks.common import seed_table, random_action, summarize_ms, write_json
+from benchmarks.fake_upstream import create_app, FakeUpstreamConfig
+
+
+API = f"http://{BACKEND_HOST}/api/v1"
+
+
+class _RoutingTransport(httpx.AsyncBaseTransport):
+    """Send requests to in-process ASGI apps by host name."""
+
+    def __init__(self, routes: Dict[str, httpx.AsyncBaseTransport]):
+        self.routes = routes
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        transport = self.routes.get(request.url.host)
+        if transport is None:
+            raise httpx.ConnectError(f"No in-process route to {request.url.host}", request=request)
+        # ASGI transports ignore timeouts; apply the read timeout like a socket would
+        read_timeout = request.extensions.get("timeout", {}).get("read")
+        if read_timeout is None:
+            return await transport.handle_async_request(request)
+        try:
+            return await asyncio.wait_for(transport.handle_async_request(request), read_timeout)
+        except asyncio.TimeoutError:
+            raise httpx.ReadTimeout(f"In-process request to {request.url.host} timed out", request=request)
+
+
+class StageRecorder:
+    """Collects durations per stage and completion events per turn."""
+
+    def __init__(self):
+        self.samples: Dict[str, List[float]] = defaultdict(list)
+        self.outcomes: Dict[str, int] = defaultdict(int)
+        self.waiters: Dict[str, asyncio.Future] = {}
+
+    def record(self, stage: str, seconds: float):
+        self.samples[stage].append(seconds)
+
+    def timed(self, stage: str, func):
+        """Wrap a sync or async callable so each call is recorded."""
+        if asyncio.iscoroutinefunction(func):
+            async def wrapper(*args, **kwargs):
+                start = time.perf_counter()
+                try:
+                    return await func(*args, **kwargs)
+                finally:
+                    self.record(stage, time.perf_counter() - start)
+        else:
+            def wrapper(*args, **kwargs):
+                start = time.perf_counter()
+                try:
+                    return func(*args, **kwargs)
+                finally:
+                    self.record(stage, time.perf_counter() - start)
+        return wrapper
+
+    def expect(self, turn_id: str) -> asyncio.Future:
+        future = asyncio.get_running_loop().create_future()
+        self.waiters[turn_id] = future
+        return future
+
+    def resolve(self, event: str, data: Dict[str, Any]):
+        self.outcomes[event] += 1
+        future = self.waiters.pop(data.get("turn_id"), None)
+        if future and not future.done():
+            future.set_result((event, data))
+
+
+def _instrument(recorder: StageRecorder):
+    """Time the pipeline stages and capture completion events."""
+    ContextAssemblyService.assemble_context = recorder.timed(
+        "assemble_context", ContextAssemblyService.assemble_context
+    )
+    SkillCheckService.detect_skill_checks = recorder.timed(
+        "skill_detect", SkillCheckService.detect_skill_checks
+    )
+    SkillCheckService.roll_skill_checks = recorder.timed(
+        "skill_roll", SkillCheckService.roll_skill_checks
+    )
+    TurnDispatchService._dispatch = recorder.timed("dispatch", TurnDispatchService._dispatch)
+
+    emit = recorder.timed("emit", socketio_manager.sio.emit)
+
+    async def capturing_emit(event, data=None, *args, **kwargs):
+        await emit(event, data, *args, **kwargs)
+        if event in ("turn_completed", "turn_failed"):
+            recorder.resolve(event, data or {})
+
+    socketio_manager.sio.emit = capturing_emit
+
+    route_stages = {
+        "/api/v1/action-drafts": "draft_write",
+        "/submit": "submit",
+        "/complete": "callback",
+    }
+
+    @main.app.middleware("http")
+    async def time_routes(request, call_next):
+        start = time.perf_counter()
+        response = await call_next(request)
+        if request.method == "POST":
+            for suffix, stage in route_stages.items():
+                if request.url.path.endswith(suffix):
+                    recorder.record(stage, time.perf_counter() - start)
+        return response
+
+
+async def _connect(mongo_url: Optional[str]):
+    """Point the app at a real MongoDB or an in-memory mongomock-motor."""
+    if mongo_url:
+        database.MONGODB_GAMERECORDS_URL = mongo_url
+        await database.connect_to_mongo()
+        return
+
+    try:
+        from mongomock_motor import AsyncMongoMockClient
+    except ImportError:
+        sys.exit("mongomock-motor is not installed; pass --mongo-url or pip install mongomock-motor")
+
+    class MockClient(AsyncMongoMockClient):
+        def get_default_database(self, *args, **kwargs):
+            return self["call_of_cthulhu_gamerecords"]
+
+    database.gamerecords_client = MockClient()
+    database.system_client = MockClient()
+
+
+async def run_table(
+    client: httpx.AsyncClient,
+    recorder: StageRecorder,
+    table: Dict[str, Any],
+    rounds: int,
+    timeout: float,
+    rng: random.Random
+):
+    """Play rounds of turns at one table."""
+    session_id = table["session_id"]
+    scene_id = table["scene_id"]
+    order = 0
+
+    for _ in range(rounds):
+        actions = []
+        for i, (player_id, character_id) in enumerate(zip(table["player_ids"], table["character_ids"])):
+            action = random_action(character_id, player_id, rng)
+            response = await client.post(f"{API}/action-drafts", json={
+                "session_id": session_id,
+                "player_id": player_id,
+                "character_id": character_id,
+                "speak": action["speak"],
+                "act": action["act"],
+                "appearance": action["appearance"],
+                "emotion": action["emotion"],
+                "order": i,
+                "ready": True,
+            })
+            response.raise_for_status()
+            actions.append(action)
+
+        order += 1
+        response = await client.post(f"{API}/turns", json={
+            "scene_id": scene_id,
+            "session_id": session_id,
+            "order": order,
+            "actions": actions,
+            "created_by": table["player_ids"][0],
+        })
+        response.raise_for_status()
+        turn_id = response.json()["id"]
+
+        completion = recorder.expect(turn_id)
+        start = time.perf_counter()
+        response = await client.post(f"{API}/turns/{turn_id}/submit", json={
+            "session_id": session_id,
+            "idempotency_key": uuid.uuid4().hex,
+        })
+        response.raise_for_status()
+        await client.delete(f"{API}/action-drafts/session/{session_id}/clear")
+
+        try:
+            event, data = await asyncio.wait_for(completion, timeout=timeout)
+        except asyncio.TimeoutError:
+            recorder.waiters.pop(turn_id, None)
+            recorder.outcomes["timeout"] += 1
+            continue
+        recorder.record("turn_total", time.perf_counter() - start)
+
+        if event == "turn_completed" and data.get("scene_id") and data["scene_id"] != scene_id:
+            # Scene or chapter transition: continue in the new scene
+            scene_id = data["scene_id"]
+            order = 0
+
+
+async def main_async(args) -> Dict[str, Any]:
+    recorder = StageRecorder()
+    _instrument(recorder)
+    await _connect(args.mongo_url)
+
+    routing = _RoutingTransport({BACKEND_HOST: httpx.ASGITransport(app=main.app)})
+    # The app creates its own httpx clients; route them in-process too
+    original_client = httpx.AsyncClient
+
+    class RoutedAsyncClient(original_client):
+        def __init__(self, *a, **kw):
+            kw.setdefault("transport", routing)
+            super().__init__(*a, **kw)
+
+    httpx.AsyncClient = RoutedAsyncClient
+
+    upstream_config = FakeUpstreamConfig(
+        dm_latency=args.dm_latency,
+        dm_v2_response_mode=args.dm_v2_response_mode,
+        scene_transition_rate=args.scene_transition_rate,
+        chapter_transition_rate=args.chapter_transition_rate,
+        callback_duplicate_rate=args.callback_duplicate_rate,
+        callback_error_rate=args.callback_error_rate,
+    )
+    upstream = create_app(upstream_config)
+    routing.routes[UPSTREAM_HOST] = httpx.ASGITransport(app=upstream)
+
+    await ensure_indexes()
+    turn_dispatch_service.num_workers = args.workers
+    if args.dispatch_timeout:
+        turn_dispatch_service.dispatch_timeout = args.dispatch_timeout
+    turn_dispatch_service.poll_interval = 0.05
+    summarization_service.poll_interval = 0.05
+    tasks = turn_dispatch_service.start()
+    tasks.append(asyncio.create_task(summarization_service.run_worker()))
+
+    db = database.get_gamerecords_db()
+    rng = random.Random(args.seed)
+    tables = [await seed_table(db, i, args.players, rng) for i in range(args.tables)]
+
+    try:
+        async with original_client(transport=routing, timeout=60.0) as client:
+            start = time.perf_counter()
+            await asyncio.gather(*[
+                run_table(client, recorder, table, args.rounds, args.turn_timeout, random.Random(rng.random()))
+                for table in tables
+            ])
+            elapsed = time.perf_counter() - start
+    finally:
+        for task in tasks:
+            task.cancel()
+        httpx.AsyncClient = original_client
+
+    completed = len(recorder.samples["turn_total"])
+    return {
+        "benchmark": "turn_pipeline",
+        "mongo": "mongodb" if args.mongo_url else "mongomock",
+        "tables": args.tables,
+        "players_per_table": args.players,
+        "rounds": args.rounds,
+        "dispatch_workers": args.workers,
+        "upstream": upstream_config.model_dump(),
+        "elapsed_s": round(elapsed, 3),
+        "turns_completed": completed,
+        "throughput_turns_per_s": round(completed / elapsed, 3) if elapsed else 0.0,
+        "draft_writes_per_s": round(len(recorder.samples["draft_write"]) / elapsed, 3) if elapsed else 0.0,
+        "outcomes": dict(recorder.outcomes),
+        "upstream_counters": dict(upstream.state.stats),
+        "stages": {stage: summarize_ms(samples) for stage, samples in sorted(recorder.samples.items())},
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--tables", type=int, default=10, help="Concurrent tables")
+    parser.add_argument("--players", type=int, default=4, help="Players per table")
+    parser.add_argument("--rounds", type=int, default=5, help="Turns per table")
+    parser.add_argument("--workers", type=int, default=4, help="Turn dispatch workers")
+    parser.add_argument("--dm-latency", default="lognormal:0.5:0.4", help="Fake n8n latency spec")
+    parser.add_argument("--dm-v2-response-mode", default="lastNode", choices=["lastNode", "onReceived"],
+                        help="When the fake v2 webhook answers")
+    parser.add_argument("--dispatch-timeout", type=float, help="Override TURN_DISPATCH_TIMEOUT (seconds)")
+    parser.add_argument("--scene-transition-rate", type=float, default=0.1)
+    parser.add_argument("--chapter-transition-rate", type=float, default=0.02)
+    parser.add_argument("--callback-duplicate-rate", type=float, default=0.0)
+    parser.add_argument("--callback-error-rate", type=float, default=0.0)
+    parser.add_argument("--turn-timeout", type=float, default=60.0, help="Seconds to wait for a callback")
+    parser.add_argument("--mongo-url", help="Use this MongoDB instead of mongomock-motor")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--output", help="Write results as JSON to this file")
+    args = parser.parse_args()
+    write_json(asyncio.run(main_async(args)), args.output)
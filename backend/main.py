@@ -2,11 +2,24 @@
 Call of Cthulhu API - Game Management System
 Handles login flow, entity management, and session tracking.
 """
+import asyncio
+import logging
 from fastapi import FastAPI
+from fastapi.responses import PlainTextResponse
 from fastapi.middleware.cors import CORSMiddleware
 from contextlib import asynccontextmanager
 
+from app import metrics
+from app.config import OLLAMA_WARMUP_ON_STARTUP, PRESENCE_STORE, USE_ASYNC_TURN_PROCESSING
 from app.database import connect_to_mongo, close_mongo_connection
+from app.db_profiler import query_profiler
+from app.indexes import ensure_indexes
+from app.pagination import NEXT_CURSOR_HEADER
+from app.services.draft_batcher import action_draft_batcher
+from app.services.llm import llm_service
+from app.services.summarization import summarization_service
+from app.services.turn_dispatch import turn_dispatch_service
+from app.socketio_manager import run_presence_heartbeat
 from app.routes_players import router as players_router
 from app.routes_worlds import router as worlds_router
 from app.routes_realms import router as realms_router
@@ -19,6 +32,9 @@ from app.routes_turns import router as turns_router
 from app.routes_action_drafts import router as action_drafts_router
 from app.routes_npcs import router as npcs_router
 from app.routes_ai import router as ai_router
+from app.routes_admin import router as admin_router
+
+logger = logging.getLogger(__name__)
 
 
 @asynccontextmanager
@@ -26,8 +42,32 @@ async def lifespan(app: FastAPI):
     """Handle startup and shutdown events."""
     # Startup
     await connect_to_mongo()
+    # Create missing indexes from the registry (reported at /api/v1/admin/db/indexes)
+    try:
+        await ensure_indexes()
+    except Exception as e:
+        logger.error(f"Failed to create indexes: {e}")
+    warmup_task = None
+    if OLLAMA_WARMUP_ON_STARTUP:
+        # Load the model in the background - Ollama may still be starting
+        warmup_task = asyncio.create_task(llm_service.warmup())
+    background_tasks = [asyncio.create_task(summarization_service.run_worker())]
+    if query_profiler.enabled:
+        # Explains new query shapes for the slow-query log
+        background_tasks.append(asyncio.create_task(query_profiler.run_explainer()))
+    if PRESENCE_STORE == "mongo":
+        # Shared presence expires unless each worker refreshes its clients
+        background_tasks.append(asyncio.create_task(run_presence_heartbeat()))
+    if USE_ASYNC_TURN_PROCESSING:
+        background_tasks.extend(turn_dispatch_service.start())
     yield
     # Shutdown
+    if warmup_task and not warmup_task.done():
+        warmup_task.cancel()
+    for task in background_tasks:
+        task.cancel()
+    # Send action draft updates still waiting for their batch window
+    await action_draft_batcher.flush_all()
     await close_mongo_connection()
 
 
@@ -45,8 +85,12 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=[NEXT_CURSOR_HEADER],  # list pages (see app.pagination)
 )
 
+# Request count and latency per route
+app.middleware("http")(metrics.http_metrics_middleware)
+
 # Include routers
 app.include_router(players_router, prefix="/api/v1")
 app.include_router(worlds_router, prefix="/api/v1")
@@ -60,6 +104,7 @@ app.include_router(turns_router, prefix="/api/v1")
 app.include_router(action_drafts_router, prefix="/api/v1")
 app.include_router(npcs_router, prefix="/api/v1")
 app.include_router(ai_router, prefix="/api/v1")
+app.include_router(admin_router, prefix="/api/v1")
 
 
 @app.get("/")
@@ -78,6 +123,12 @@ async def health():
     return {"status": "healthy"}
 
 
+@app.get("/metrics", response_class=PlainTextResponse)
+async def get_metrics():
+    """Metrics in Prometheus text format."""
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
+
+
 # ============== Socket.IO Integration ==============
 
 from app.socketio_manager import get_socketio_app
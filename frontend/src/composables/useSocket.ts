@@ -3,19 +3,42 @@
  */
 import { ref, onMounted, onUnmounted } from 'vue'
 import { io, type Socket } from 'socket.io-client'
-import type { ActionDraft, ChatMessage, PlayerPresence } from '@/types/gameplay'
+import type { Session } from '@/services/api'
+import type {
+  ActionDraft,
+  ActionDraftsBatch,
+  ChatMessage,
+  PlayerPresence,
+  SessionEvent,
+  Turn
+} from '@/types/gameplay'
 
 const socket = ref<Socket | null>(null)
 const connected = ref(false)
 const playersOnline = ref<PlayerPresence[]>([])
 
+// Highest session event seq seen; sent with join_session on reconnect so the
+// server replays only the events missed meanwhile (null before the first join)
+let lastSeq: number | null = null
+// Seqs received live while a join_session is pending, not to be replayed again
+const liveSeqs = new Set<number>()
+let joinPending = false
+// Ids this client's socket had in the session: the server logs who sent each
+// relayed event, and a replay must not hand a client its own events back
+const ownSids = new Set<string>()
+
 export function useSocket() {
-  function connect(sessionId: string, playerId: string, playerName: string) {
+  // initialSeq: seq of the snapshot the caller loaded, so the first join
+  // replays the events emitted since
+  function connect(sessionId: string, playerId: string, playerName: string, initialSeq: number | null = null) {
     if (socket.value?.connected) {
       console.log('Socket already connected')
       return
     }
 
+    lastSeq = initialSeq
+    ownSids.clear()
+
     // Socket.io is at root, not /api/v1
     const apiUrl = import.meta.env.VITE_API_URL || 'http://localhost:8093/api/v1'
     const socketUrl = apiUrl.replace('/api/v1', '')
@@ -30,15 +53,25 @@ export function useSocket() {
     socket.value.on('connect', () => {
       console.log('Socket.io connected:', socket.value?.id)
       connected.value = true
+      if (socket.value?.id) ownSids.add(socket.value.id)
 
-      // Join session room
+      // Join session room (catching up from lastSeq after a reconnect)
+      joinPending = true
+      liveSeqs.clear()
       socket.value?.emit('join_session', {
         session_id: sessionId,
         player_id: playerId,
-        player_name: playerName
+        player_name: playerName,
+        last_seq: lastSeq
       })
     })
 
+    socket.value.onAny((_event: string, data: any) => {
+      if (typeof data?.seq !== 'number') return
+      if (joinPending) liveSeqs.add(data.seq)
+      lastSeq = Math.max(lastSeq ?? 0, data.seq)
+    })
+
     socket.value.on('disconnect', () => {
       console.log('Socket.io disconnected')
       connected.value = false
@@ -52,6 +85,17 @@ export function useSocket() {
     socket.value.on('session_joined', (data: any) => {
       console.log('Joined session:', data)
       playersOnline.value = data.players_online || []
+
+      // Replay missed events through the registered listeners
+      const missed: SessionEvent[] = data.missed_events || []
+      missed.forEach((entry) => {
+        if (liveSeqs.has(entry.seq)) return
+        if (entry.sender && ownSids.has(entry.sender)) return
+        socket.value?.listeners(entry.event).forEach((listener) => listener(entry.data))
+      })
+      lastSeq = Math.max(lastSeq ?? 0, data.seq ?? 0)
+      joinPending = false
+      liveSeqs.clear()
     })
 
     socket.value.on('player_joined', (data: any) => {
@@ -129,14 +173,6 @@ export function useSocket() {
     })
   }
 
-  // Turn submission events
-  function emitTurnSubmitted(sessionId: string, turnId: string) {
-    socket.value?.emit('turn_submitted', {
-      session_id: sessionId,
-      turn_id: turnId
-    })
-  }
-
   // Chat events
   function emitRealmChatMessage(message: ChatMessage, sessionId: string) {
     socket.value?.emit('realm_chat_message', {
@@ -161,8 +197,23 @@ export function useSocket() {
     socket.value?.on('action_draft_created', callback)
   }
 
-  function onActionDraftUpdated(callback: (data: ActionDraft) => void) {
-    socket.value?.on('action_draft_updated', callback)
+  // Draft updates and ready states arrive batched; entries sent by this client
+  // (under its current or an earlier socket id, for replayed batches) are skipped
+  function onActionDraftsBatch(callback: (data: ActionDraftsBatch) => void) {
+    socket.value?.on('action_drafts_batch', (data: ActionDraftsBatch) => {
+      const notOwn = (key: string) => !ownSids.has(data.sources[key])
+      callback({
+        ...data,
+        drafts: data.drafts.filter((draft) => notOwn(draft.id)),
+        ready_states: data.ready_states.filter((state) => notOwn(state.character_id))
+      })
+    })
+  }
+
+  // Sent when this client missed updates that cannot be replayed: draft updates
+  // while it lagged ('backpressure') or events while disconnected ('replay_gap')
+  function onResyncRequired(callback: (data: { reason: string }) => void) {
+    socket.value?.on('resync_required', callback)
   }
 
   function onActionDraftDeleted(callback: (data: { draft_id: string }) => void) {
@@ -173,18 +224,22 @@ export function useSocket() {
     socket.value?.on('action_draft_reordered', callback)
   }
 
-  function onReadyStateChanged(
-    callback: (data: { player_id: string; character_id: string; ready: boolean }) => void
+  // Turn lifecycle events are emitted by the server once per state change and
+  // carry the whole turn (turn is null if it could not be serialized)
+  function onTurnProcessing(
+    callback: (data: { turn_id: string; status: string; turn: Turn | null }) => void
   ) {
-    socket.value?.on('ready_state_changed', callback)
+    socket.value?.on('turn_processing', callback)
   }
 
-  function onTurnSubmitted(callback: (data: { turn_id: string; status: string }) => void) {
-    socket.value?.on('turn_submitted', callback)
+  function onTurnCompleted(
+    callback: (data: { turn_id: string; reaction: any; scene_id: string; turn: Turn | null }) => void
+  ) {
+    socket.value?.on('turn_completed', callback)
   }
 
-  function onTurnCompleted(callback: (data: { turn_id: string; reaction: any }) => void) {
-    socket.value?.on('turn_completed', callback)
+  function onTurnFailed(callback: (data: { turn_id: string; error: string }) => void) {
+    socket.value?.on('turn_failed', callback)
   }
 
   function onRealmChatMessage(callback: (data: ChatMessage) => void) {
@@ -196,7 +251,7 @@ export function useSocket() {
   }
 
   function onMasterTransferred(
-    callback: (data: { new_master_id: string; new_master_name: string }) => void
+    callback: (data: { new_master_id: string; new_master_name: string | null; session: Session | null }) => void
   ) {
     socket.value?.on('master_transferred', callback)
   }
@@ -212,16 +267,16 @@ export function useSocket() {
     emitActionDraftDeleted,
     emitActionDraftReordered,
     emitReadyStateChanged,
-    emitTurnSubmitted,
     emitRealmChatMessage,
   emitProphetChatMessage,
     onActionDraftCreated,
-    onActionDraftUpdated,
+    onActionDraftsBatch,
+    onResyncRequired,
     onActionDraftDeleted,
     onActionDraftReordered,
-    onReadyStateChanged,
-    onTurnSubmitted,
+    onTurnProcessing,
     onTurnCompleted,
+    onTurnFailed,
     onRealmChatMessage,
   onProphetChatResponse,
     onMasterTransferred
@@ -3,6 +3,8 @@
  * Uses native fetch API for HTTP requests.
  */
 
+import type { ActionDraft, Chapter, Scene, Turn } from '@/types/gameplay'
+
 const API_BASE_URL = import.meta.env.VITE_API_BASE_URL || 'http://localhost:8093/api/v1'
 
 // ============== TYPES ==============
@@ -225,6 +227,22 @@ export interface Session {
   changes: Array<{ by: string; at: string; type?: string }>
 }
 
+// Game view state of a session (GET /sessions/{id}/snapshot); changes are left empty
+export interface SessionSnapshot {
+  session: Session
+  campaign: Campaign | null
+  chapters: Chapter[]
+  current_chapter_id: string | null
+  scenes: Scene[]
+  current_scene_id: string | null
+  turns: Turn[]
+  action_drafts: ActionDraft[]
+  characters: Character[]
+  npcs: NPC[]
+  // Last session event reflected; send as last_seq with join_session
+  seq: number
+}
+
 // ============== HELPER FUNCTIONS ==============
 
 async function fetchJSON<T>(url: string, options?: RequestInit): Promise<T> {
@@ -441,7 +459,61 @@ export const aiAPI = {
     fetchJSON<GeneratedAction>('/ai/generate-action', {
       method: 'POST',
       body: JSON.stringify(data)
+    }),
+  /**
+   * Stream an AI action field by field (NDJSON).
+   * onField is called as soon as each field is complete; resolves with the full action.
+   */
+  generateActionStream: async (
+    data: {
+      character_id: string
+      scene_id: string
+      session_id: string
+      existing_actions?: any[]
+    },
+    onField: (field: keyof GeneratedAction | 'ooc', value: string) => void
+  ): Promise<GeneratedAction> => {
+    const response = await fetch(`${API_BASE_URL}/ai/generate-action/stream`, {
+      method: 'POST',
+      headers: { 'Content-Type': 'application/json' },
+      body: JSON.stringify(data)
     })
+
+    if (!response.ok || !response.body) {
+      const error = await response.text()
+      throw new Error(`API Error: ${response.status} - ${error}`)
+    }
+
+    const reader = response.body.getReader()
+    const decoder = new TextDecoder()
+    let buffer = ''
+    let action: GeneratedAction | null = null
+
+    while (true) {
+      const { done, value } = await reader.read()
+      if (done) break
+      buffer += decoder.decode(value, { stream: true })
+
+      const lines = buffer.split('\n')
+      buffer = lines.pop() || ''
+      for (const line of lines) {
+        if (!line.trim()) continue
+        const event = JSON.parse(line)
+        if (event.type === 'field') {
+          onField(event.field, event.value)
+        } else if (event.type === 'action') {
+          action = event.action
+        } else if (event.type === 'error') {
+          throw new Error(event.detail)
+        }
+      }
+    }
+
+    if (!action) {
+      throw new Error('AI action stream ended without a result')
+    }
+    return action
+  }
 }
 
 // ============== SESSIONS ==============
@@ -458,6 +530,8 @@ export const sessionsAPI = {
     return fetchJSON<Session | null>(`/sessions/latest?realm_id=${realmId}&campaign_id=${campaignId}`)
   },
   get: (id: string) => fetchJSON<Session>(`/sessions/${id}`),
+  // Revalidated with If-None-Match by the browser cache (the response has an ETag)
+  snapshot: (id: string) => fetchJSON<SessionSnapshot>(`/sessions/${id}/snapshot`),
   create: (data: {
     realm_id: string
     campaign_id: string
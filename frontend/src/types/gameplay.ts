@@ -14,9 +14,43 @@ export interface ActionDraft {
   ooc?: string
   order: number
   ready: boolean
+  version: number
   updated_at: string
 }
 
+export interface ReadyState {
+  player_id: string
+  character_id: string
+  ready: boolean
+}
+
+// Changed fields of a draft; turns version base_version - 1 into version
+export interface ActionDraftDelta {
+  draft_id: string
+  base_version: number
+  version: number
+  changes: Partial<ActionDraft>
+}
+
+// Coalesced draft and ready state updates of one session (server batch window)
+export interface ActionDraftsBatch {
+  session_id: string
+  drafts: ActionDraft[]
+  ready_states: ReadyState[]
+  deltas: ActionDraftDelta[]
+  // Socket id that sent each entry, by draft id or character id
+  sources: Record<string, string>
+}
+
+// Session room event replayed to a reconnecting client
+export interface SessionEvent {
+  seq: number
+  event: string
+  data: any
+  // Socket id of the client that sent the event (it was not sent to it)
+  sender?: string | null
+}
+
 export interface Action {
   actor_id: string
   speak?: string
@@ -35,10 +69,11 @@ export interface Turn {
   id: string
   kind: 'turn'
   scene_id: string
+  session_id?: string
   order: number
   actions: Action[]
   reaction?: Reaction
-  status: 'draft' | 'ready_for_agents' | 'processing' | 'completed'
+  status: 'draft' | 'ready_for_agents' | 'processing' | 'completed' | 'failed'
   meta: {
     created_at: string
     created_by: string